@@ -0,0 +1,72 @@
+# coding: utf-8
+"""
+Сравнение пропускной способности клиента до и после перехода на пул соединений.
+
+«До» - каждый запрос выполняется через модульный ``requests.post``, как это
+делал ``Client`` раньше, и открывает новое соединение (и TLS-сессию);
+«после» - запросы идут через ``Client`` с постоянной сессией.
+
+Запуск::
+
+    python -m benchmarks.bench_connection_pool [--requests N] [--no-tls]
+"""
+import argparse
+import os
+import time
+
+import requests
+
+from komtet_kassa_sdk.v2 import Check, Client, Intent
+from komtet_kassa_sdk.v2.client import json_encode
+
+from .stub_server import start_stub_server
+
+
+def make_check():
+    check = Check(1, Intent.SELL)
+    check.add_payment(100)
+    return check
+
+
+def bench_unpooled(url, count):
+    data = json_encode(dict(make_check()))
+    headers = {'Authorization': 'shop-id', 'Content-Type': 'application/json'}
+    started = time.time()
+    for _ in range(count):
+        requests.post(url=url + '/api/shop/v2/queues/1/task', headers=headers, data=data).json()
+    return count / (time.time() - started)
+
+
+def bench_pooled(url, count):
+    check = make_check()
+    with Client('shop-id', 'secret-key') as client:
+        client.set_host(url)
+        started = time.time()
+        for _ in range(count):
+            client.create_task(check, 1)
+        return count / (time.time() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Connection pool benchmark')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--no-tls', dest='tls', action='store_false')
+    args = parser.parse_args()
+
+    server = start_stub_server(tls=args.tls)
+    if server.cafile:
+        os.environ['REQUESTS_CA_BUNDLE'] = server.cafile
+    try:
+        before = bench_unpooled(server.url, args.requests)
+        after = bench_pooled(server.url, args.requests)
+    finally:
+        server.shutdown()
+
+    print('%s, %d requests' % (server.url, args.requests))
+    print('requests.post per call: %8.1f req/s' % before)
+    print('Client with pool:       %8.1f req/s' % after)
+    print('speedup:                %8.2fx' % (after / before))
+
+
+if __name__ == '__main__':
+    main()
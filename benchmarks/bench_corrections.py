@@ -0,0 +1,100 @@
+# coding: utf-8
+"""
+Корректировка 10 000 позиций: прежняя реализация ``correction_positions``
+(две копии позиции и три новых Decimal на каждую позицию) против новой
+``correction_positions`` и ``correct_positions`` на месте. Расхождение
+между price * quantity и total - у половины позиций.
+
+Запуск::
+
+    python -m benchmarks.bench_corrections
+"""
+import copy
+import decimal
+import random
+import timeit
+from decimal import Decimal
+
+from komtet_kassa_sdk.v2 import MeasureTypes, PaymentMethod, PaymentObject, Position
+from komtet_kassa_sdk.v2.lib.helpers import correct_positions, correction_positions, to_decimal
+
+
+POSITIONS = 10000
+REPEAT = 7
+
+
+def legacy_correction_positions(items):
+    def update_item(item, data):
+        item.update(data)
+        return item
+
+    new_items = []
+
+    for item in items:
+        quantity = decimal.Decimal(item['quantity'])
+        price = decimal.Decimal(item['price'])
+        total = decimal.Decimal(item['total'])
+
+        has_extra_position = (total != price * quantity) and quantity > 1
+        base_position_total = total
+
+        if has_extra_position:
+            quantity -= 1
+            base_position_total = to_decimal(price * quantity)
+            price = total - base_position_total
+
+            new_items.append(update_item(item.copy(), {
+                'price': price,
+                'quantity': 1,
+                'total': price
+            }))
+
+        new_items.append(update_item(item.copy(), {
+            'quantity': quantity,
+            'total': base_position_total
+        }))
+
+    return new_items
+
+
+def make_items(kind):
+    rnd = random.Random(1)
+    items = []
+    for idx in range(POSITIONS):
+        price = Decimal(rnd.randint(100, 100000)) / 100
+        quantity = rnd.randint(1, 5)
+        total = price * quantity + (Decimal('0.01') if idx % 2 else 0)
+        if kind == 'dict':
+            items.append({'name': 'Товар', 'price': price, 'quantity': quantity, 'total': total})
+        else:
+            items.append(Position(name='Товар', price=price, quantity=quantity, total=total,
+                                  measure=MeasureTypes.PIECE,
+                                  payment_method=PaymentMethod.FULL_PAYMENT,
+                                  payment_object=PaymentObject.PRODUCT))
+    return items
+
+
+def measure(func, items):
+    # Каждый запуск получает свежие позиции, копирование в замер не входит
+    best = None
+    for _ in range(REPEAT):
+        data = copy.deepcopy(items)
+        elapsed = timeit.timeit(lambda: func(data), number=1)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    variants = [('legacy', legacy_correction_positions),
+                ('correction_positions', correction_positions),
+                ('correct_positions', correct_positions)]
+    print('%-10s' % 'items' + ''.join('%24s' % name for name, _ in variants))
+    for kind in ('dict', 'Position'):
+        items = make_items(kind)
+        results = [measure(func, items) for _, func in variants]
+        print('%-10s' % kind + ''.join(
+            '%16.1f ms %5.2fx' % (result * 1000, results[0] / result) for result in results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# coding: utf-8
+"""
+Распределение скидки по позициям: ``apply_discount`` для каждого списка позиций
+против ``apply_discounts`` с расчетом в копейках (без NumPy и с NumPy).
+
+Запуск::
+
+    python -m benchmarks.bench_discounts
+"""
+import copy
+import random
+import timeit
+from decimal import Decimal
+
+from komtet_kassa_sdk.v2.lib import discount
+from komtet_kassa_sdk.v2.lib.discount import apply_discounts
+from komtet_kassa_sdk.v2.lib.helpers import apply_discount
+
+
+SCENARIOS = [
+    # (описание, количество чеков, позиций в чеке, вид сумм)
+    ('1 x 5000', 1, 5000, 'decimal'),
+    ('1000 x 20', 1000, 20, 'decimal'),
+    ('1000 x 20 int', 1000, 20, 'int'),
+]
+REPEAT = 7
+
+
+def make_baskets(checks, positions, kind):
+    rnd = random.Random(checks * positions)
+
+    def make_total():
+        if kind == 'decimal':
+            return Decimal(rnd.randint(100, 10 ** 6)) / 100
+        return rnd.randint(1, 10 ** 4)
+
+    discounts = [Decimal(rnd.randint(100, 10 ** 5)) / 100 if kind == 'decimal'
+                 else rnd.randint(1, 1000) for _ in range(checks)]
+    baskets = [[{'total': make_total()} for _ in range(positions)] for _ in range(checks)]
+    return discounts, baskets
+
+
+def measure(func, discounts, baskets):
+    # Каждый запуск получает свежие позиции, копирование в замер не входит
+    best = None
+    for _ in range(REPEAT):
+        data = copy.deepcopy(baskets)
+        elapsed = timeit.timeit(lambda: func(discounts, data), number=1)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def with_reference(discounts, baskets):
+    for value, items in zip(discounts, baskets):
+        apply_discount(value, items)
+
+
+def main():
+    variants = [('apply_discount', with_reference),
+                ('apply_discounts', lambda d, b: apply_discounts(d, b, use_numpy=False))]
+    if discount.numpy is not None:
+        variants.append(('+ numpy', lambda d, b: apply_discounts(d, b, use_numpy=True)))
+
+    print('%-16s' % 'checks x items' + ''.join('%18s' % name for name, _ in variants))
+    for name, checks, positions, kind in SCENARIOS:
+        discounts, baskets = make_baskets(checks, positions, kind)
+        results = [measure(func, discounts, baskets) for _, func in variants]
+        print('%-16s' % name + ''.join(
+            '%12.1f ms %3.1fx' % (result * 1000, results[0] / result) for result in results))
+
+
+if __name__ == '__main__':
+    main()
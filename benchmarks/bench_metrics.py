@@ -0,0 +1,67 @@
+# coding: utf-8
+"""
+Стоимость ``RequestMetrics``: запись события из одного и нескольких потоков,
+получение квантиля и вывод снимка в формате Prometheus.
+
+Запуск::
+
+    python -m benchmarks.bench_metrics
+"""
+import threading
+import timeit
+
+from komtet_kassa_sdk.v2 import RequestEvent, RequestMetrics
+
+
+EVENTS = 200000
+THREADS = [1, 4, 16]
+ROUTES = [('POST', '/api/shop/v2/queues/{qid}/task'),
+          ('POST', '/api/shop/v2/queues/{qid}/multi-tasks'),
+          ('GET', '/api/shop/v2/tasks/{task_id}'),
+          ('GET', '/api/shop/v2/orders'),
+          ('PUT', '/api/shop/v2/orders/{oid}'),
+          ('GET', '/api/shop/v2/employees')]
+
+
+def make_events(count):
+    events = []
+    for idx in range(count):
+        method, route = ROUTES[idx % len(ROUTES)]
+        event = RequestEvent(method, route)
+        event.send = 0.001 * (1 + idx % 997)
+        event.status = 200
+        events.append(event)
+    return events
+
+
+def record(metrics, events, threads):
+    def run(chunk):
+        for event in chunk:
+            metrics(event)
+
+    size = len(events) // threads
+    workers = [threading.Thread(target=run, args=(events[idx * size:(idx + 1) * size],))
+               for idx in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def main():
+    events = make_events(EVENTS)
+    print('%-8s %14s %14s %14s' % ('threads', 'record', 'quantile', 'render'))
+    for threads in THREADS:
+        metrics = RequestMetrics()
+        elapsed = min(timeit.repeat(lambda: record(metrics, events, threads), number=1,
+                                    repeat=5))
+        route = ROUTES[0][1]
+        quantile = min(timeit.repeat(lambda: metrics.quantile(route, 0.99), number=20,
+                                     repeat=5)) / 20
+        render = min(timeit.repeat(metrics.render, number=20, repeat=5)) / 20
+        print('%-8d %11.0f ns %11.2f ms %11.2f ms' % (
+            threads, elapsed / EVENTS * 1e9, quantile * 1000, render * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# coding: utf-8
+"""
+Сборка чека целиком с суммами ``Decimal`` и ``Money``: создание позиций
+(стоимость считается как цена x количество), сумма платежа, скидка
+на чек и сериализация тела запроса, как это делает ``Client.create_task``.
+Отдельно измеряются ``apply_discount`` и ``correction_positions``
+на 1000 позиций.
+
+Запуск::
+
+    python -m benchmarks.bench_money
+"""
+import copy
+import random
+import timeit
+from decimal import Decimal
+
+from komtet_kassa_sdk.v2 import (Check, Intent, MeasureTypes, Money, PaymentMethod,
+                                 PaymentObject, PaymentType, Position, TaxSystem, VatRate)
+from komtet_kassa_sdk.v2.lib.helpers import apply_discount, correction_positions
+from komtet_kassa_sdk.v2.serializers import get_default_serializer
+
+
+SIZES = [5, 50]
+NUMBER = 2000
+HELPER_ITEMS = 1000
+HELPER_NUMBER = 50
+
+
+def build_check(prices, quantities, discount, serializer):
+    check = Check('1', Intent.SELL)
+    check.set_company(payment_address='shop.ru', tax_system=TaxSystem.COMMON)
+    for idx, (price, quantity) in enumerate(zip(prices, quantities)):
+        check.add_position(Position(name='Товар %s' % idx, price=price, quantity=quantity,
+                                    measure=MeasureTypes.PIECE, vat=VatRate.RATE_20,
+                                    payment_method=PaymentMethod.FULL_PAYMENT,
+                                    payment_object=PaymentObject.PRODUCT))
+    check.apply_discount(discount)
+    check.add_payment(sum(position['total'] for position in check['positions']),
+                      PaymentType.CARD)
+    return serializer.dumps(check)
+
+
+def main():
+    print('%-10s %-8s %14s %14s %8s' % ('positions', 'exact', 'Decimal', 'Money', 'speedup'))
+    rnd = random.Random(1)
+    for size in SIZES:
+        kopecks = [rnd.randint(100, 100000) for _ in range(size)]
+        quantities = [rnd.randint(1, 5) for _ in range(size)]
+        variants = [
+            ([Decimal(value) / 100 for value in kopecks], Decimal('99.99')),
+            ([Money(value) for value in kopecks], Money(9999)),
+        ]
+        for exact in (False, True):
+            serializer = get_default_serializer(exact_decimal=exact)
+            results = [
+                NUMBER / min(timeit.repeat(
+                    lambda: build_check(prices, quantities, discount, serializer),
+                    number=NUMBER, repeat=7))
+                for prices, discount in variants]
+            print('%-10d %-8s %10.0f c/s %10.0f c/s %7.2fx' % (
+                size, exact, results[0], results[1], results[1] / results[0]))
+
+    print()
+    print('%-22s %12s %12s %8s' % ('helper', 'Decimal', 'Money', 'speedup'))
+    kopecks = [rnd.randint(100, 100000) for _ in range(HELPER_ITEMS)]
+    quantities = [Decimal(rnd.randint(1, 5000)) / 1000 for _ in range(HELPER_ITEMS)]
+    for name, func in [('apply_discount', lambda items, money: apply_discount(
+                            Money(99999) if money else Decimal('999.99'), items)),
+                       ('correction_positions', lambda items, money: correction_positions(items))]:
+        results = []
+        for money in (False, True):
+            make = Money if money else (lambda value: Decimal(value) / 100)
+            items = [{'price': make(value), 'quantity': quantity,
+                      'total': make(value) * quantity + make(1)}
+                     for value, quantity in zip(kopecks, quantities)]
+            best = None
+            for _ in range(HELPER_NUMBER):
+                data = copy.deepcopy(items)
+                elapsed = timeit.timeit(lambda: func(data, money), number=1)
+                best = elapsed if best is None else min(best, elapsed)
+            results.append(best)
+        print('%-22s %9.2f ms %9.2f ms %7.2fx' % (
+            name, results[0] * 1000, results[1] * 1000, results[0] / results[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# coding: utf-8
+"""
+Накладные расходы наблюдателя за запросами: ``Client.create_task`` без наблюдателя
+и с пустым наблюдателем, а также средняя длительность этапов запроса по данным
+``RequestEvent``. Запросы проходят через ``requests.Session`` до транспортного
+адаптера, который сразу возвращает ответ без обращения к сети.
+
+Запуск::
+
+    python -m benchmarks.bench_observer
+"""
+import json
+import timeit
+from decimal import Decimal
+
+import requests
+from requests.adapters import BaseAdapter
+
+try:
+    from unittest import mock
+except ImportError:  # Python 2
+    import mock
+
+from komtet_kassa_sdk.v2 import (Check, Client, Intent, MeasureTypes, PaymentMethod,
+                                 PaymentObject, PaymentType, Position, RequestEvent, TaxSystem,
+                                 VatRate)
+
+
+SIZES = [1, 20]
+NUMBER = 2000
+REPEAT = 7
+RESPONSE = json.dumps({'id': 1, 'external_id': '1', 'print_queue_id': 1,
+                       'state': 'new'}).encode('utf-8')
+
+
+class StubAdapter(BaseAdapter):
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'application/json'
+        response._content = RESPONSE
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class StubSession(requests.Session):
+    def __init__(self):
+        super(StubSession, self).__init__()
+        super(StubSession, self).mount('https://', StubAdapter())
+
+    def mount(self, prefix, adapter):
+        # Адаптеры клиента не подключаются: все запросы обрабатывает StubAdapter
+        pass
+
+
+def make_check(size):
+    check = Check('1', Intent.SELL)
+    check.set_company(payment_address='shop.ru', tax_system=TaxSystem.COMMON)
+    for idx in range(size):
+        check.add_position(Position(name='Товар %s' % idx, price=Decimal('10.50'), quantity=2,
+                                    measure=MeasureTypes.PIECE, vat=VatRate.RATE_20,
+                                    payment_method=PaymentMethod.FULL_PAYMENT,
+                                    payment_object=PaymentObject.PRODUCT))
+    check.add_payment(Decimal('21.00') * size, PaymentType.CARD)
+    return check
+
+
+def main():
+    events = []
+    variants = [('no observer', None), ('no-op observer', lambda event: None),
+                ('collecting', events.append)]
+    with mock.patch('komtet_kassa_sdk.v2.client.requests.Session', StubSession):
+        print('%-10s' % 'positions' + ''.join('%22s' % name for name, _ in variants))
+        for size in SIZES:
+            check = make_check(size)
+            results = []
+            for _, observer in variants:
+                client = Client('shop-id', 'secret-key').set_default_queue(1)
+                client.set_observer(observer)
+                client.create_task(check)
+                del events[:]
+                results.append(min(timeit.repeat(lambda: client.create_task(check),
+                                                 number=NUMBER, repeat=REPEAT)) / NUMBER)
+            print('%-10d' % size + ''.join(
+                '%12.1f us %+6.1f%%' % (result * 1e6, (result / results[0] - 1) * 100)
+                for result in results))
+
+            phases = ', '.join('%s %.1f us' % (name, sum(getattr(event, name) for event in events)
+                                               / len(events) * 1e6)
+                               for name in RequestEvent.PHASES)
+            print('%-10s %s' % ('', phases))
+
+
+if __name__ == '__main__':
+    main()
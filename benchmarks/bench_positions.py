@@ -0,0 +1,104 @@
+# coding: utf-8
+"""
+Память, занимаемая позициями чека с большой корзиной: прежняя ``Position``
+со словарем внутри и копией ``dict(position)`` в ``Check.add_position``
+против компактной ``Position`` со ``__slots__``, добавляемой без копирования.
+
+Запуск::
+
+    python -m benchmarks.bench_positions [--positions N] [--checks N]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from decimal import Decimal
+
+from komtet_kassa_sdk.v2 import (Check, Intent, MarkTypes, MeasureTypes, PaymentMethod,
+                                 PaymentObject, Position, VatRate)
+
+
+class LegacyPosition(object):
+    """Прежняя реализация позиции"""
+
+    def __init__(self, name, price, quantity, measure, payment_object, payment_method, total=None,
+                 user_data=None, excise=None, id=None, country_code=None, declaration_number=None,
+                 vat=VatRate.RATE_NO):
+        if total is None:
+            total = price * quantity
+
+        self.__data = {
+            'name': name,
+            'measure': measure,
+            'price': price,
+            'quantity': quantity,
+            'payment_object': payment_object,
+            'payment_method': payment_method,
+            'total': total,
+            'vat': VatRate.parse(vat)
+        }
+        if id is not None:
+            self.__data['id'] = id
+
+    def set_mark_code(self, type, code):
+        self.__data['mark_code'] = {type: code}
+
+    def __iter__(self):
+        for item in self.__data.items():
+            yield item
+
+
+class LegacyCheck(object):
+    def __init__(self, oid, intent):
+        self.__data = {'external_id': oid, 'intent': intent, 'positions': []}
+
+    def add_position(self, position):
+        self.__data['positions'].append(dict(position))
+
+
+def build(check_class, position_class, checks, positions):
+    price = Decimal('100.50')
+    result = []
+    for check_idx in range(checks):
+        check = check_class(check_idx, Intent.SELL)
+        for idx in range(positions):
+            position = position_class(id=idx, name='Товар', price=price, quantity=1,
+                                      measure=MeasureTypes.PIECE, vat=VatRate.RATE_20,
+                                      payment_method=PaymentMethod.FULL_PAYMENT,
+                                      payment_object=PaymentObject.PRODUCT)
+            if idx % 2:
+                position.set_mark_code(MarkTypes.EAN13, '4600000000000')
+            check.add_position(position)
+        result.append(check)
+    return result
+
+
+def measure(check_class, position_class, checks, positions):
+    gc.collect()
+    tracemalloc.start()
+    started = time.time()
+    result = build(check_class, position_class, checks, positions)
+    elapsed = time.time() - started
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Position memory benchmark')
+    parser.add_argument('--positions', type=int, default=500)
+    parser.add_argument('--checks', type=int, default=100)
+    args = parser.parse_args()
+
+    total = args.checks * args.positions
+    print('%d checks x %d positions:' % (args.checks, args.positions))
+    for name, check_class, position_class in [('dict + copy', LegacyCheck, LegacyPosition),
+                                              ('__slots__', Check, Position)]:
+        size, peak, elapsed = measure(check_class, position_class, args.checks, args.positions)
+        print('%-12s %7.1f MB (peak %7.1f MB) %5.0f bytes/position %6.2f s' % (
+            name, size / 1024.0 / 1024, peak / 1024.0 / 1024, float(size) / total, elapsed))
+
+
+if __name__ == '__main__':
+    main()
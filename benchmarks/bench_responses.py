@@ -0,0 +1,66 @@
+# coding: utf-8
+"""
+Память, занимаемая объектами ответа при хранении 1 000 000 ``TaskInfo``:
+прежний ``Response(**data)`` (копия словаря и ``__dict__`` у каждого объекта)
+против ``TaskInfo.from_dict(data)`` со ``__slots__`` без копирования.
+
+Запуск::
+
+    python -m benchmarks.bench_responses [--count N]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from komtet_kassa_sdk.v2 import TaskInfo
+
+
+class LegacyResponse(object):
+    """Прежняя реализация ответа"""
+
+    def __init__(self, **data):
+        self.__data = data
+
+    def __getattr__(self, name):
+        return self.__data[name]
+
+
+def make_payloads(count):
+    return [{
+        'id': idx,
+        'external_id': str(idx),
+        'state': 'done',
+        'error_description': None,
+        'fiscal_data': {'i': '111', 'fn': '2222222222222222', 'n': 4, 's': '6666.77'}
+    } for idx in range(count)]
+
+
+def measure(factory, payloads):
+    gc.collect()
+    tracemalloc.start()
+    started = time.time()
+    objects = [factory(payload) for payload in payloads]
+    elapsed = time.time() - started
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Response memory benchmark')
+    parser.add_argument('--count', type=int, default=1000000)
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.count)
+    print('%d objects, memory on top of parsed JSON:' % args.count)
+    for name, factory in [('Response(**data)', lambda data: LegacyResponse(**data)),
+                          ('TaskInfo.from_dict', TaskInfo.from_dict)]:
+        size, elapsed = measure(factory, payloads)
+        print('%-20s %8.1f MB %6.0f bytes/object %6.2f s' % (
+            name, size / 1024.0 / 1024, float(size) / args.count, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# coding: utf-8
+"""
+Время сериализации чека в зависимости от количества позиций для прежней
+функции ``json_encode`` и сериализаторов ``JSONSerializer``/``OrjsonSerializer``
+в режимах записи Decimal как float и точной записи (``exact_decimal=True``).
+
+Запуск::
+
+    python -m benchmarks.bench_serializers
+"""
+import timeit
+from decimal import Decimal
+
+from komtet_kassa_sdk.v2 import (Check, Intent, JSONSerializer, PaymentMethod, PaymentObject,
+                                 Position, VatRate)
+from komtet_kassa_sdk.v2.client import json_encode
+from komtet_kassa_sdk.v2.serializers import orjson
+
+
+SIZES = [1, 10, 100, 1000]
+
+
+def make_check(positions):
+    check = Check('ext-1', Intent.SELL)
+    check.set_client(email='client@client.ru', name='Иванов Иван')
+    check.set_company(payment_address='shop.ru', tax_system=0)
+    for idx in range(positions):
+        check.add_position(Position(name='Товар %s' % idx, price=Decimal('10.10'),
+                                    quantity=Decimal('1.5'), total=Decimal('15.15'),
+                                    measure=0, vat=VatRate.RATE_20,
+                                    payment_method=PaymentMethod.FULL_PAYMENT,
+                                    payment_object=PaymentObject.PRODUCT))
+    check.add_payment(Decimal('15.15') * positions)
+    return dict(check)
+
+
+def measure(func, data):
+    number = max(5, 20000 // len(data['positions']))
+    return min(timeit.repeat(lambda: func(data), number=number, repeat=3)) / number
+
+
+def main():
+    encoders = [
+        ('json_encode', lambda data: json_encode(data).encode('utf-8')),
+        ('json', JSONSerializer().dumps),
+        ('json exact', JSONSerializer(exact_decimal=True).dumps),
+    ]
+    if orjson is not None:
+        from komtet_kassa_sdk.v2 import OrjsonSerializer
+        encoders.append(('orjson', OrjsonSerializer().dumps))
+        encoders.append(('orjson exact', OrjsonSerializer(exact_decimal=True).dumps))
+
+    print('%10s' % 'positions' + ''.join('%16s' % name for name, _ in encoders))
+    for size in SIZES:
+        data = make_check(size)
+        print('%10d' % size + ''.join('%13.1f us' % (measure(func, data) * 1e6)
+                                      for _, func in encoders))
+
+
+if __name__ == '__main__':
+    main()
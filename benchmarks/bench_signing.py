@@ -0,0 +1,53 @@
+# coding: utf-8
+"""
+Подпись запроса: прежняя схема (``hmac.new`` на каждый запрос по склеенной
+и повторно закодированной строке) против копирования подготовленного HMAC
+с передачей частей запроса через ``update``.
+
+Запуск::
+
+    python -m benchmarks.bench_signing
+"""
+import hashlib
+import hmac
+import json
+import timeit
+
+from komtet_kassa_sdk.v2 import Client
+
+
+SIZES = [1024, 16 * 1024, 256 * 1024, 1024 * 1024, 5 * 1024 * 1024]
+URL = 'https://kassa.komtet.ru/api/shop/v2/queues/1/multi-tasks'
+
+
+def make_body(size):
+    body = json.dumps({'positions': ['Позиция'] * (size // 20)})
+    return body[:size]
+
+
+def legacy_sign(secret_key, method, url, body):
+    # Прежняя реализация: тело было строкой и кодировалось дважды -
+    # для подписи и для отправки
+    signature = hmac.new(secret_key, ''.join((method, url, body)).encode('utf-8'),
+                         hashlib.md5).hexdigest()
+    return signature, body.encode('utf-8')
+
+
+def main():
+    client = Client('shop-id', 'secret-key')
+    secret_key = b'secret-key'
+    print('%10s %14s %14s %8s' % ('body', 'legacy, us', 'prepared, us', 'speedup'))
+    for size in SIZES:
+        body = make_body(size)
+        body_bytes = body.encode('utf-8')
+        number = max(10, 2000000 // size)
+        legacy = min(timeit.repeat(lambda: legacy_sign(secret_key, 'POST', URL, body),
+                                   number=number, repeat=3)) / number
+        prepared = min(timeit.repeat(lambda: client._get_signature('POST', URL, body_bytes),
+                                     number=number, repeat=3)) / number
+        print('%9dK %14.1f %14.1f %7.2fx' % (
+            size // 1024, legacy * 1e6, prepared * 1e6, legacy / prepared))
+
+
+if __name__ == '__main__':
+    main()
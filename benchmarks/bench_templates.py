@@ -0,0 +1,66 @@
+# coding: utf-8
+"""
+Количество чеков в секунду, которые формируются через методы ``Check``
+(``set_company``, ``set_cashier``, ``set_client``, ``add_position``, ``add_payment``)
+и через ``CheckTemplate.create``, - без сериализации и вместе с ``dict(check)``
+и сериализацией тела запроса, как это делает ``Client.create_task``.
+
+Запуск::
+
+    python -m benchmarks.bench_templates
+"""
+import timeit
+from decimal import Decimal
+
+from komtet_kassa_sdk.v2 import (Check, CheckTemplate, Intent, MeasureTypes, PaymentMethod,
+                                 PaymentObject, PaymentType, Position, TaxSystem, VatRate)
+from komtet_kassa_sdk.v2.serializers import get_default_serializer
+
+
+SIZES = [1, 5, 20]
+NUMBER = 20000
+
+
+def build_check(oid, email, amounts):
+    check = Check(oid, Intent.SELL)
+    check.set_company(payment_address='shop.ru', tax_system=TaxSystem.COMMON, inn='5834041042')
+    check.set_cashier(name='Кассир', inn='8634330201')
+    check.set_client(email=email)
+    for idx, amount in enumerate(amounts):
+        check.add_position(Position(name='Товар %s' % idx, price=amount, quantity=1,
+                                    measure=MeasureTypes.PIECE, vat=VatRate.RATE_20,
+                                    payment_method=PaymentMethod.FULL_PAYMENT,
+                                    payment_object=PaymentObject.PRODUCT))
+    check.add_payment(sum(amounts), PaymentType.CARD)
+    return check
+
+
+def main():
+    serializer = get_default_serializer()
+    print('Serializer: %s' % serializer.name)
+    print('%-10s %-10s %14s %14s %8s' % ('positions', 'mode', 'builder', 'template', 'speedup'))
+    for size in SIZES:
+        amounts = [Decimal('100.50')] * size
+        template = CheckTemplate(build_check('proto', 'proto@shop.ru', amounts))
+        changes = [{'price': amount, 'total': amount} for amount in amounts]
+        total = sum(amounts)
+
+        def with_builder():
+            return build_check('1', 'client@client.ru', amounts)
+
+        def with_template():
+            return template.create('1', client={'email': 'client@client.ru'},
+                                   positions=changes, payments=[total])
+
+        assert dict(with_builder()) == dict(with_template())
+
+        for mode, wrap in [('build', lambda make: make),
+                           ('serialize', lambda make: lambda: serializer.dumps(dict(make())))]:
+            results = [NUMBER / min(timeit.repeat(wrap(make), number=NUMBER, repeat=3))
+                       for make in (with_builder, with_template)]
+            print('%-10d %-10s %10.0f c/s %10.0f c/s %7.1fx' % (
+                size, mode, results[0], results[1], results[1] / results[0]))
+
+
+if __name__ == '__main__':
+    main()
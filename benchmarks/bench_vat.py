@@ -0,0 +1,29 @@
+# coding: utf-8
+"""
+Разбор ставки НДС: прежний ``VatRate.parse`` (преобразования и цепочка
+сравнений на каждый вызов) против поиска в таблице, собранной при импорте.
+
+Запуск::
+
+    python -m benchmarks.bench_vat
+"""
+import timeit
+
+from komtet_kassa_sdk.v2 import VatRate
+
+
+NUMBER = 200000
+INPUTS = ['20', VatRate.RATE_NO, 20, 0.2, 20.0, '20%', '0.20', '20/120', 20.7]
+
+
+def main():
+    print('%-10s %14s %14s %8s' % ('rate', 'legacy', 'parse', 'speedup'))
+    for rate in INPUTS:
+        results = [min(timeit.repeat(lambda: func(rate), number=NUMBER, repeat=7)) / NUMBER
+                   for func in (VatRate._parse, VatRate.parse)]
+        print('%-10r %11.0f ns %11.0f ns %7.1fx' % (
+            rate, results[0] * 1e9, results[1] * 1e9, results[0] / results[1]))
+
+
+if __name__ == '__main__':
+    main()
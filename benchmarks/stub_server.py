@@ -0,0 +1,108 @@
+# coding: utf-8
+"""
+Простейший локальный HTTP(S)-сервер, имитирующий ответы API КОМТЕТ Кассы.
+
+Сервер отвечает фиксированным JSON на любой запрос (на постановку
+нескольких задач - задачей для каждого чека) и поддерживает keep-alive
+(HTTP/1.1), что позволяет сравнивать клиент с пулом соединений и клиент,
+открывающий новое соединение на каждый запрос.
+"""
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+TASK_RESPONSE = json.dumps({
+    'id': 1,
+    'external_id': '1',
+    'print_queue_id': 1,
+    'state': 'new'
+}).encode('utf-8')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        response = TASK_RESPONSE
+        if self.path.endswith('/multi-tasks'):
+            response = json.dumps({
+                str(idx): {'id': idx, 'external_id': check['external_id'],
+                           'print_queue_id': 1, 'state': 'new'}
+                for idx, check in enumerate(json.loads(body.decode('utf-8')))
+            }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    scheme = 'http'
+
+    @property
+    def url(self):
+        return '%s://%s:%s' % ((self.scheme,) + self.server_address[:2])
+
+
+def make_self_signed_cert(directory, host='127.0.0.1'):
+    """
+    Выпускает самоподписанный сертификат для ``host`` с помощью утилиты openssl.
+
+    :returns: пути к сертификату и ключу
+    """
+    cert = os.path.join(directory, 'cert.pem')
+    key = os.path.join(directory, 'key.pem')
+    subprocess.check_call([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+        '-subj', '/CN=%s' % host, '-addext', 'subjectAltName=IP:%s' % host,
+        '-keyout', key, '-out', cert
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return cert, key
+
+
+def start_stub_server(host='127.0.0.1', port=0, tls=False):
+    """
+    Запускает сервер в фоновом потоке и возвращает его экземпляр.
+
+    При ``tls=True`` сервер работает по HTTPS с самоподписанным сертификатом,
+    путь к которому доступен в атрибуте ``cafile`` сервера.
+
+    :param str host: Адрес
+    :param int port: Порт (0 - выбрать свободный)
+    :param bool tls: Использовать HTTPS
+    """
+    server = StubServer((host, port), StubHandler)
+    server.cafile = None
+    if tls:
+        cert, key = make_self_signed_cert(tempfile.mkdtemp(), host)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        server.scheme = 'https'
+        server.cafile = cert
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
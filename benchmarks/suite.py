@@ -0,0 +1,228 @@
+# coding: utf-8
+"""
+Сводный набор бенчмарков SDK: построение чеков, вспомогательные функции,
+сериализация, подпись и полный цикл запросов клиента к локальному
+серверу-заглушке (``benchmarks/stub_server.py``).
+
+Для каждого сценария выводится количество операций в секунду (лучший
+из нескольких замеров) и память: пик за одну операцию и объем, занятый
+ее результатом. Данные сценариев строятся из фиксированного зерна
+случайных чисел, поэтому запуски воспроизводимы.
+
+Запуск::
+
+    python -m benchmarks [--filter ПОДСТРОКА] [--min-time СЕК] [--repeat N] [--json ФАЙЛ]
+"""
+import argparse
+import collections
+import gc
+import json
+import platform
+import random
+import timeit
+import tracemalloc
+from decimal import Decimal
+
+from komtet_kassa_sdk.v2 import (Check, Client, Intent, MeasureTypes, PaymentMethod,
+                                 PaymentObject, PaymentType, Position, TaxSystem, VatRate)
+from komtet_kassa_sdk.v2.client import json_encode
+from komtet_kassa_sdk.v2.lib.helpers import apply_discount, correction_positions
+from komtet_kassa_sdk.v2.serializers import get_default_serializer
+
+from .stub_server import start_stub_server
+
+
+Scenario = collections.namedtuple('Scenario', 'group name setup')
+
+SCENARIOS = []
+
+
+def scenario(group, name):
+    """Регистрирует функцию, которая готовит данные и возвращает измеряемую операцию"""
+    def register(setup):
+        SCENARIOS.append(Scenario(group, name, setup))
+        return setup
+    return register
+
+
+class Environment(object):
+    """Общие ресурсы сценариев: сервер-заглушка запускается при первом обращении"""
+
+    def __init__(self):
+        self.__server = None
+
+    @property
+    def url(self):
+        if self.__server is None:
+            self.__server = start_stub_server()
+        return self.__server.url
+
+    def close(self):
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+
+
+def make_prices(count, seed=1):
+    rnd = random.Random(seed)
+    return [(Decimal(rnd.randint(100, 100000)) / 100, rnd.randint(1, 5)) for _ in range(count)]
+
+
+def build_check(prices, oid='1'):
+    check = Check(oid, Intent.SELL)
+    check.set_company(payment_address='shop.ru', tax_system=TaxSystem.COMMON)
+    check.set_client(email='client@client.ru')
+    for idx, (price, quantity) in enumerate(prices):
+        check.add_position(Position(name='Товар %s' % idx, price=price, quantity=quantity,
+                                    measure=MeasureTypes.PIECE, vat=VatRate.RATE_20,
+                                    payment_method=PaymentMethod.FULL_PAYMENT,
+                                    payment_object=PaymentObject.PRODUCT))
+    check.add_payment(sum(price * quantity for price, quantity in prices), PaymentType.CARD)
+    return check
+
+
+def make_items(count):
+    return [{'price': price, 'quantity': quantity, 'total': price * quantity + Decimal('0.01')}
+            for price, quantity in make_prices(count)]
+
+
+def add_build_scenario(count):
+    @scenario('build', 'Check + Position x %d' % count)
+    def setup(env):
+        prices = make_prices(count)
+        return lambda: build_check(prices)
+
+
+for _count in [1, 10, 100, 1000, 10000]:
+    add_build_scenario(_count)
+
+
+@scenario('helpers', 'apply_discount x 100 (с копированием позиций)')
+def setup_apply_discount(env):
+    items = make_items(100)
+    return lambda: apply_discount(Decimal('99.99'), [dict(item) for item in items])
+
+
+@scenario('helpers', 'correction_positions x 100')
+def setup_correction_positions(env):
+    items = make_items(100)
+    return lambda: correction_positions(items)
+
+
+@scenario('helpers', 'VatRate.parse x 10')
+def setup_vat_parse(env):
+    rates = ['20', 20, 0.2, '20%', '20/120', 'no', 10, '10/110', 0.1, '0']
+
+    def parse():
+        for rate in rates:
+            VatRate.parse(rate)
+    return parse
+
+
+@scenario('encode', 'json_encode, 100 позиций')
+def setup_json_encode(env):
+    check = build_check(make_prices(100))
+    return lambda: json_encode(check)
+
+
+@scenario('encode', 'сериализатор по умолчанию, 100 позиций')
+def setup_serializer(env):
+    check = build_check(make_prices(100))
+    serializer = get_default_serializer()
+    return lambda: serializer.dumps(check)
+
+
+@scenario('encode', 'подпись, 100 позиций')
+def setup_signature(env):
+    client = Client('shop-id', 'secret-key')
+    body = get_default_serializer().dumps(build_check(make_prices(100)))
+    url = client._get_url('/api/shop/v2/queues/1/task')
+    return lambda: client._get_signature('POST', url, body)
+
+
+@scenario('client', 'create_task, 10 позиций')
+def setup_create_task(env):
+    client = Client('shop-id', 'secret-key').set_host(env.url)
+    check = build_check(make_prices(10))
+    return lambda: client.create_task(check, 1)
+
+
+@scenario('client', 'create_tasks, 100 чеков по 10 позиций')
+def setup_create_tasks(env):
+    client = Client('shop-id', 'secret-key').set_host(env.url)
+    checks = [build_check(make_prices(10, seed), str(seed)) for seed in range(100)]
+    return lambda: client.create_tasks(checks, 1)
+
+
+def measure_speed(func, min_time, repeat):
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return number / min(timer.repeat(repeat=repeat, number=number))
+
+
+def measure_memory(func):
+    # Пик - наибольший объем памяти, выделенной во время операции;
+    # результат - память, которую занимает возвращенный объект
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak, retained
+
+
+def format_size(size):
+    if size < 1024:
+        return '%d B' % size
+    if size < 1024 * 1024:
+        return '%.1f KiB' % (size / 1024.0)
+    return '%.1f MiB' % (size / 1024.0 / 1024.0)
+
+
+def run(scenarios, min_time, repeat):
+    env = Environment()
+    results = []
+    try:
+        for item in scenarios:
+            func = item.setup(env)
+            func()
+            ops = measure_speed(func, min_time, repeat)
+            peak, retained = measure_memory(func)
+            result = {'group': item.group, 'name': item.name, 'ops_per_sec': ops,
+                      'peak_bytes': peak, 'retained_bytes': retained}
+            results.append(result)
+            print('%-8s %-46s %12.1f %12s %12s' % (
+                item.group, item.name, ops, format_size(peak), format_size(retained)))
+    finally:
+        env.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Komtet Kassa SDK benchmarks')
+    parser.add_argument('--filter', default='', help='Run scenarios containing this substring')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='Minimal duration of one measurement, sec')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of measurements')
+    parser.add_argument('--json', help='Save results to JSON file')
+    args = parser.parse_args()
+
+    scenarios = [item for item in SCENARIOS
+                 if args.filter.lower() in ('%s %s' % (item.group, item.name)).lower()]
+    print('Python %s, %s' % (platform.python_version(), platform.platform()))
+    print('%-8s %-46s %12s %12s %12s' % ('group', 'scenario', 'ops/sec', 'peak', 'result'))
+    results = run(scenarios, args.min_time, args.repeat)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fp:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(),
+                       'results': results}, fp, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
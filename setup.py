@@ -32,6 +32,12 @@ setup(
     zip_safe=False,
     test_suite='tests',
     install_requires=[
-        'requests'
-    ]
+        'requests',
+        'futures; python_version < "3"'
+    ],
+    extras_require={
+        'async': ['aiohttp'],
+        'fast': ['orjson'],
+        'numpy': ['numpy']
+    }
 )
@@ -0,0 +1,530 @@
+# coding: utf-8
+"""
+Локальная замена API КОМТЕТ Кассы для нагрузочного тестирования интеграции.
+
+Сервер реализует маршруты v1 и v2, которые использует ``Client``: очереди,
+постановка одной и нескольких задач, информация о задаче, заказы и сотрудники
+(создание, изменение, просмотр, удаление и постраничный список). Запросы
+проверяются по заголовкам ``Authorization`` и ``X-HMAC-Signature``, задачи
+со временем переходят из состояния ``new`` в ``processing`` и затем в ``done``
+или ``error``. Задержку ответов, долю ошибок и ограничение частоты запросов
+можно настроить.
+
+Сервер запускается в фоновом потоке текущего процесса::
+
+    with FakeServer(shops={'shop-id': 'secret-key'}, latency='lognormal:0.05,0.5') as server:
+        client = Client('shop-id', 'secret-key').set_host(server.url)
+
+в отдельном процессе (``FakeServerProcess`` с теми же параметрами) или из командной строки::
+
+    python -m komtet_kassa_sdk.fake_server --port 8080 --shop shop-id:secret-key \\
+        --latency uniform:0.01,0.1 --error-rate 0.01 --rate-limit 100
+"""
+import argparse
+import hashlib
+import hmac
+import itertools
+import json
+import math
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlsplit
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlsplit
+
+from .v2.ratelimit import RateLimiter
+
+
+DEFAULT_SHOPS = {'shop-id': 'secret-key'}
+
+DEFAULT_PROCESSING_TIME = 1.0
+
+
+def constant_latency(seconds):
+    """Задержка ответа ``seconds`` секунд"""
+    return lambda rnd: seconds
+
+
+def uniform_latency(low, high):
+    """Задержка ответа, равномерно распределенная от ``low`` до ``high`` секунд"""
+    return lambda rnd: rnd.uniform(low, high)
+
+
+def lognormal_latency(median, sigma):
+    """
+    Логнормально распределенная задержка ответа с медианой ``median`` секунд:
+    большинство ответов быстрые, но встречаются длинные "хвосты"
+    """
+    return lambda rnd: rnd.lognormvariate(math.log(median), sigma)
+
+
+_LATENCIES = {
+    'const': constant_latency,
+    'uniform': uniform_latency,
+    'lognormal': lognormal_latency,
+}
+
+
+def parse_latency(spec):
+    """
+    Возвращает распределение задержки по его описанию: число секунд,
+    ``const:0.05``, ``uniform:0.01,0.1`` или ``lognormal:0.05,0.5`` (медиана и sigma)
+
+    :param str|float|callable spec: Описание или функция ``latency(rnd) -> сек``
+    """
+    if spec is None:
+        return None
+    if callable(spec):
+        return spec
+    if isinstance(spec, (int, float)):
+        return constant_latency(spec)
+    name, _, args = spec.partition(':')
+    if not args:
+        return constant_latency(float(name))
+    if name not in _LATENCIES:
+        raise ValueError('Unknown latency distribution: %s' % name)
+    return _LATENCIES[name](*[float(arg) for arg in args.split(',')])
+
+
+class _RequestError(Exception):
+    def __init__(self, status, message):
+        super(_RequestError, self).__init__(message)
+        self.status = status
+
+
+class _Store(object):
+    # Данные сервера: задачи, заказы и сотрудники. Изменяются только под блокировкой lock
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.tasks = {}
+        self.task_ids = {}
+        self.orders = {}
+        self.employees = {}
+
+
+class FakeServer(object):
+    """
+    Локальная замена API КОМТЕТ Кассы.
+
+    :param dict shops: Магазины и их секретные ключи: ``{shop_id: secret_key}``
+    :param str host: Адрес
+    :param int port: Порт (0 - выбрать свободный)
+    :param latency: Задержка ответа: число секунд, описание распределения
+                    (см. ``parse_latency``) или функция ``latency(rnd) -> сек``
+    :param float error_rate: Доля запросов, на которые сервер отвечает ошибкой ``error_status``
+    :param int error_status: Код ответа для ошибок, добавляемых с частотой ``error_rate``
+    :param float rate_limit: Максимальное количество запросов в секунду; на запросы сверх
+                             ограничения сервер отвечает кодом 429 с заголовком ``Retry-After``
+    :param float processing_time: Время от постановки задачи до ее завершения, сек
+    :param float task_error_rate: Доля задач, завершающихся состоянием ``error``
+    :param bool verify_signature: Проверять заголовок ``X-HMAC-Signature``
+    :param int seed: Зерно генератора случайных чисел для воспроизводимых запусков
+    """
+
+    def __init__(self, shops=None, host='127.0.0.1', port=0, latency=None, error_rate=0.0,
+                 error_status=503, rate_limit=None, processing_time=DEFAULT_PROCESSING_TIME,
+                 task_error_rate=0.0, verify_signature=True, seed=None):
+        self.shops = dict(DEFAULT_SHOPS if shops is None else shops)
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.processing_time = processing_time
+        self.task_error_rate = task_error_rate
+        self.verify_signature = verify_signature
+        self.random = random.Random(seed)
+        self.__store = _Store()
+        self.__stats_lock = threading.Lock()
+        self.__statuses = {}
+        self.__server = _HTTPServer((host, port), _Handler)
+        self.__server.fake = self
+        self.__thread = None
+
+    @property
+    def url(self):
+        """Адрес сервера для ``Client.set_host``"""
+        return 'http://%s:%s' % self.__server.server_address[:2]
+
+    def start(self):
+        """Запускает сервер в фоновом потоке"""
+        self.__thread = threading.Thread(target=self.__server.serve_forever,
+                                         kwargs={'poll_interval': 0.05})
+        self.__thread.daemon = True
+        self.__thread.start()
+        return self
+
+    def serve_forever(self):
+        """Обрабатывает запросы в текущем потоке до вызова ``stop``"""
+        self.__server.serve_forever()
+
+    def stop(self):
+        """Останавливает сервер и закрывает сокет"""
+        if self.__thread is not None:
+            self.__server.shutdown()
+            self.__thread.join()
+            self.__thread = None
+        self.__server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def get_stats(self):
+        """
+        Количество ответов сервера по кодам: ``{200: 1000, 429: 12, 503: 5}``
+        """
+        with self.__stats_lock:
+            return dict(self.__statuses)
+
+    def handle(self, method, url, headers, body):
+        """
+        Обрабатывает запрос
+
+        :param str method: HTTP-метод
+        :param str url: Полный URL запроса (используется при проверке подписи)
+        :param headers: Заголовки запроса
+        :param bytes body: Тело запроса
+        :return: кортеж ``(status, headers, data)``, где ``data`` - объект для JSON или None
+        """
+        status, response_headers, data = self.__handle(method, url, headers, body)
+        with self.__stats_lock:
+            self.__statuses[status] = self.__statuses.get(status, 0) + 1
+        return status, response_headers, data
+
+    def __handle(self, method, url, headers, body):
+        if self.rate_limiter is not None and not self.rate_limiter.acquire(timeout=0):
+            retry_after = max(int(math.ceil(1 / self.rate_limiter.rate)), 1)
+            return 429, {'Retry-After': str(retry_after)}, {'error': 'Too many requests'}
+
+        if self.latency is not None:
+            time.sleep(max(self.latency(self.random), 0))
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            return self.error_status, {}, {'error': 'Injected error'}
+
+        shop_id = headers.get('Authorization')
+        if shop_id not in self.shops:
+            return 401, {}, {'error': 'Unknown shop'}
+        if self.verify_signature:
+            signature = hmac.new(self.shops[shop_id].encode('utf-8'),
+                                 method.encode('ascii') + url.encode('utf-8') + body,
+                                 hashlib.md5).hexdigest()
+            if not hmac.compare_digest(signature, headers.get('X-HMAC-Signature') or ''):
+                return 401, {}, {'error': 'Invalid signature'}
+
+        parts = urlsplit(url)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        try:
+            data = json.loads(body.decode('utf-8')) if body else None
+        except ValueError:
+            return 400, {}, {'error': 'Invalid JSON'}
+
+        for route_method, pattern, handler in _ROUTES:
+            match = pattern.match(parts.path)
+            if match and route_method == method:
+                try:
+                    with self.__store.lock:
+                        status, result = handler(self, self.__store, shop_id, data, query,
+                                                 **match.groupdict())
+                except _RequestError as exc:
+                    return exc.status, {}, {'error': str(exc)}
+                return status, {}, result
+        return 404, {}, {'error': 'Not found'}
+
+    def _add_task(self, store, shop_id, check):
+        if not isinstance(check, dict) or 'external_id' not in check:
+            raise _RequestError(422, 'external_id is required')
+        # Повторная постановка чека с тем же external_id возвращает существующую задачу
+        key = (shop_id, str(check['external_id']))
+        task_id = store.task_ids.get(key)
+        if task_id is None:
+            task_id = store.task_ids[key] = next(store.ids)
+            store.tasks[task_id] = {
+                'id': task_id,
+                'external_id': check['external_id'],
+                'created_at': time.time(),
+                'failed': self.random.random() < self.task_error_rate,
+                'total': sum(_to_float(payment.get('sum'))
+                             for payment in check.get('payments') or []),
+            }
+        return self._get_task_info(store, task_id)
+
+    def _get_task_info(self, store, task_id):
+        task = store.tasks.get(task_id)
+        if task is None:
+            raise _RequestError(404, 'Task not found')
+        elapsed = time.time() - task['created_at']
+        result = {'id': task['id'], 'external_id': task['external_id'], 'print_queue_id': 1,
+                  'error_description': None, 'fiscal_data': None}
+        if elapsed < self.processing_time / 2:
+            result['state'] = 'new'
+        elif elapsed < self.processing_time:
+            result['state'] = 'processing'
+        elif task['failed']:
+            result['state'] = 'error'
+            result['error_description'] = 'Fiscalization failed'
+        else:
+            result['state'] = 'done'
+            result['fiscal_data'] = {
+                'i': str(task['id']),
+                'fn': '9999078900001341',
+                'fp': str(1000000000 + task['id']),
+                't': time.strftime('%Y%m%dT%H%M', time.localtime(
+                    task['created_at'] + self.processing_time)),
+                's': '%.2f' % task['total'],
+            }
+        return result
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _get_int(query, name, default):
+    try:
+        return int(query.get(name, default))
+    except ValueError:
+        raise _RequestError(400, 'Invalid %s' % name)
+
+
+def _paginate(items, query, key):
+    start = _get_int(query, 'start', 0)
+    limit = _get_int(query, 'limit', 10)
+    return 200, {key: items[start:start + limit], 'meta': {'total': len(items)}}
+
+
+def _get_queue(server, store, shop_id, data, query, qid):
+    return 200, {'id': qid, 'state': 'active'}
+
+
+def _create_task(server, store, shop_id, data, query, qid):
+    return 200, server._add_task(store, shop_id, data)
+
+
+def _create_tasks(server, store, shop_id, data, query, qid):
+    if not isinstance(data, list):
+        raise _RequestError(422, 'List of checks is required')
+    tasks = [server._add_task(store, shop_id, check) for check in data]
+    return 200, {str(task['external_id']): task for task in tasks}
+
+
+def _get_task(server, store, shop_id, data, query, task_id):
+    try:
+        task_id = int(task_id)
+    except ValueError:
+        raise _RequestError(404, 'Task not found')
+    return 200, server._get_task_info(store, task_id)
+
+
+def _list_orders(server, store, shop_id, data, query):
+    orders = [order for _, order in sorted(store.orders.items())
+              if ('courier_id' not in query
+                  or str(order.get('courier_id')) == query['courier_id'])
+              and ('date_start' not in query
+                   or str(order.get('date_start') or '') >= query['date_start'])]
+    return _paginate(orders, query, 'orders')
+
+
+def _list_employees(server, store, shop_id, data, query):
+    employees = [employee for _, employee in sorted(store.employees.items())
+                 if 'type' not in query or employee.get('type') == query['type']]
+    return _paginate(employees, query, 'account_employees')
+
+
+def _create_item(name, defaults):
+    def create(server, store, shop_id, data, query):
+        if not isinstance(data, dict):
+            raise _RequestError(422, 'Object is required')
+        item = dict(defaults, **data)
+        item['id'] = next(store.ids)
+        getattr(store, name)[item['id']] = item
+        return 200, item
+    return create
+
+
+def _get_item(name):
+    def get(server, store, shop_id, data, query, item_id):
+        items = getattr(store, name)
+        try:
+            return 200, items[int(item_id)]
+        except (KeyError, ValueError):
+            raise _RequestError(404, 'Not found')
+    return get
+
+
+def _update_item(name):
+    def update(server, store, shop_id, data, query, item_id):
+        status, item = _get_item(name)(server, store, shop_id, data, query, item_id)
+        if not isinstance(data, dict):
+            raise _RequestError(422, 'Object is required')
+        item.update(data)
+        item['id'] = int(item_id)
+        return status, item
+    return update
+
+
+def _delete_item(name):
+    def delete(server, store, shop_id, data, query, item_id):
+        _get_item(name)(server, store, shop_id, data, query, item_id)
+        del getattr(store, name)[int(item_id)]
+        return 204, None
+    return delete
+
+
+_PREFIX = r'^/api/shop/v[12]'
+
+_ROUTES = [(method, re.compile(_PREFIX + path + '$'), handler) for method, path, handler in [
+    ('GET', r'/queues/(?P<qid>[^/]+)', _get_queue),
+    ('POST', r'/queues/(?P<qid>[^/]+)/task', _create_task),
+    ('POST', r'/queues/(?P<qid>[^/]+)/multi-tasks', _create_tasks),
+    ('GET', r'/tasks/(?P<task_id>[^/]+)', _get_task),
+    ('GET', r'/orders', _list_orders),
+    ('POST', r'/orders', _create_item('orders', {'state': 'new'})),
+    ('GET', r'/orders/(?P<item_id>[^/]+)', _get_item('orders')),
+    ('PUT', r'/orders/(?P<item_id>[^/]+)', _update_item('orders')),
+    ('DELETE', r'/orders/(?P<item_id>[^/]+)', _delete_item('orders')),
+    ('GET', r'/employees', _list_employees),
+    ('POST', r'/employees', _create_item('employees', {})),
+    ('GET', r'/employees/(?P<item_id>[^/]+)', _get_item('employees')),
+    ('PUT', r'/employees/(?P<item_id>[^/]+)', _update_item('employees')),
+    ('DELETE', r'/employees/(?P<item_id>[^/]+)', _delete_item('employees')),
+]]
+
+
+class _HTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        url = 'http://%s%s' % (self.headers.get('Host'), self.path)
+        status, headers, data = self.server.fake.handle(self.command, url, self.headers, body)
+
+        content = b'' if data is None else json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if data is not None:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeServerProcess(object):
+    """
+    Запускает ``FakeServer`` в отдельном процессе, чтобы сервер не делил
+    GIL с тестируемым кодом. Параметры те же, что у ``FakeServer``, кроме
+    ``latency``: допускается только число или описание распределения.
+    """
+
+    def __init__(self, shops=None, host='127.0.0.1', port=0, latency=None, error_rate=0.0,
+                 error_status=503, rate_limit=None, processing_time=DEFAULT_PROCESSING_TIME,
+                 task_error_rate=0.0, verify_signature=True, seed=None):
+        args = ['--host', host, '--port', str(port), '--error-rate', str(error_rate),
+                '--error-status', str(error_status), '--processing-time', str(processing_time),
+                '--task-error-rate', str(task_error_rate)]
+        for shop_id, secret_key in (DEFAULT_SHOPS if shops is None else shops).items():
+            args.extend(['--shop', '%s:%s' % (shop_id, secret_key)])
+        if latency is not None:
+            args.extend(['--latency', str(latency)])
+        if rate_limit:
+            args.extend(['--rate-limit', str(rate_limit)])
+        if not verify_signature:
+            args.append('--no-verify')
+        if seed is not None:
+            args.extend(['--seed', str(seed)])
+        self.args = args
+        self.url = None
+        self.__process = None
+
+    def start(self):
+        """Запускает процесс и ожидает, пока сервер начнет принимать запросы"""
+        self.__process = subprocess.Popen(
+            [sys.executable, '-m', 'komtet_kassa_sdk.fake_server'] + self.args,
+            stdout=subprocess.PIPE, universal_newlines=True)
+        line = self.__process.stdout.readline()
+        if not line.startswith('http'):
+            self.stop()
+            raise RuntimeError('Fake server failed to start')
+        self.url = line.strip()
+        return self
+
+    def stop(self):
+        """Завершает процесс сервера"""
+        if self.__process is not None:
+            self.__process.terminate()
+            self.__process.wait()
+            self.__process.stdout.close()
+            self.__process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fake KOMTET Kassa API server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--shop', action='append', metavar='SHOP_ID:SECRET_KEY',
+                        help='Shop credentials (default: shop-id:secret-key)')
+    parser.add_argument('--latency', help='Response latency: 0.05, const:0.05, '
+                                          'uniform:0.01,0.1 or lognormal:0.05,0.5')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--rate-limit', type=float, help='Maximum requests per second')
+    parser.add_argument('--processing-time', type=float, default=DEFAULT_PROCESSING_TIME)
+    parser.add_argument('--task-error-rate', type=float, default=0.0)
+    parser.add_argument('--no-verify', dest='verify_signature', action='store_false')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    shops = dict(shop.split(':', 1) for shop in args.shop) if args.shop else None
+    server = FakeServer(shops=shops, host=args.host, port=args.port, latency=args.latency,
+                        error_rate=args.error_rate, error_status=args.error_status,
+                        rate_limit=args.rate_limit, processing_time=args.processing_time,
+                        task_error_rate=args.task_error_rate,
+                        verify_signature=args.verify_signature, seed=args.seed)
+    print(server.url)
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
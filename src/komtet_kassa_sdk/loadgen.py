@@ -0,0 +1,556 @@
+# coding: utf-8
+"""
+Генератор нагрузки для оценки пропускной способности интеграции с КОМТЕТ Кассой.
+
+Потоки генератора выполняют через ``Client`` (v1 или v2) смесь операций
+``create_task``, ``create_tasks``, ``get_task_info``, ``create_order`` и ``get_orders``
+в заданных пропорциях: с заданной частотой (открытая модель нагрузки) или
+непрерывно заданным количеством потоков (закрытая модель). Каждые ``interval``
+секунд выводятся достигнутая частота операций, квантили длительности и количество
+ошибок, по окончании - сводка по каждой операции.
+
+Операции ставят задачи на фискализацию и создают заказы, поэтому нагрузку следует
+подавать на тестовый магазин или на локальную замену API (``--fake-server``)::
+
+    python -m komtet_kassa_sdk.loadgen --fake-server --rate 200 --duration 60 \\
+        --mix create_task=5,create_tasks=1,get_task_info=3,create_order=1,get_orders=1
+
+    python -m komtet_kassa_sdk.loadgen --shop SHOP_ID --secret SECRET_KEY --queue QUEUE_ID \\
+        --api v1 --concurrency 16 --json result.json
+"""
+from __future__ import print_function
+
+import argparse
+import bisect
+import collections
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from decimal import Decimal
+
+from . import v1, v2
+from .fake_server import FakeServerProcess
+from .v2.client import DEFAULT_HOST
+from .v2.metrics import LatencyHistogram
+from .v2.timing import perf_counter
+
+
+OPERATIONS = ('create_task', 'create_tasks', 'get_task_info', 'create_order', 'get_orders')
+
+DEFAULT_MIX = 'create_task=5,create_tasks=1,get_task_info=3,create_order=1,get_orders=1'
+DEFAULT_CONCURRENCY = 8
+DEFAULT_DURATION = 60
+DEFAULT_INTERVAL = 5
+DEFAULT_POSITIONS = 5
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_FAKE_LATENCY = 'lognormal:0.02,0.5'
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Количество идентификаторов поставленных задач, из которых выбираются задачи для get_task_info
+_TASK_IDS_LIMIT = 10000
+
+
+def parse_mix(spec):
+    """
+    Разбирает описание смеси операций ``create_task=5,get_task_info=3`` в словарь
+    ``{операция: вес}``. Вес, не указанный после имени операции, равен 1;
+    операции, которых нет в описании, не выполняются.
+
+    :param str spec: Описание смеси
+    :rtype: dict
+    """
+    mix = {}
+    for item in spec.split(','):
+        name, separator, weight = item.strip().partition('=')
+        if name not in OPERATIONS:
+            raise ValueError('Unknown operation: %s' % name)
+        try:
+            weight = float(weight) if separator else 1.0
+        except ValueError:
+            raise ValueError('Invalid weight of %s: %s' % (name, weight))
+        if weight < 0:
+            raise ValueError('Weight of %s must not be negative' % name)
+        mix[name] = weight
+    if not sum(mix.values()) > 0:
+        raise ValueError('Mix must contain an operation with positive weight')
+    return mix
+
+
+def get_error_type(error):
+    """Вид ошибки для сводки: имя исключения и код ответа, например ``HTTPError 503``"""
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is None:
+        return type(error).__name__
+    return '%s %s' % (type(error).__name__, status)
+
+
+class Workload(object):
+    """
+    Операции нагрузки: формирует чеки и заказы и выполняет запросы клиента.
+    Один экземпляр используется всеми потоками генератора.
+
+    Номера операций (``external_id``) уникальны в пределах запуска и содержат
+    идентификатор процесса и время запуска, поэтому повторный запуск не совпадает
+    с задачами предыдущих. Для ``get_task_info`` выбирается одна из задач,
+    поставленных во время запуска; пока таких задач нет, вместо запроса
+    информации ставится новая задача.
+
+    :param str api: Версия API клиента: ``v1`` или ``v2``
+    :param int positions: Количество позиций в чеке и заказе
+    :param int batch_size: Количество чеков в запросе ``create_tasks``
+    """
+
+    def __init__(self, api='v2', positions=DEFAULT_POSITIONS, batch_size=DEFAULT_BATCH_SIZE):
+        if api not in ('v1', 'v2'):
+            raise ValueError('Unknown API version: %s' % api)
+        self.api = api
+        self.positions = positions
+        self.batch_size = batch_size
+        self.__prefix = 'loadgen-%d-%d' % (os.getpid(), int(time.time()))
+        self.__ids = itertools.count(1)
+        # Очередь ограниченной длины: после заполнения ее длина не уменьшается,
+        # поэтому потоки читают элементы без блокировки
+        self.__task_ids = collections.deque(maxlen=_TASK_IDS_LIMIT)
+
+    def create_client(self, shop_id, secret_key, host=None, qid=None):
+        """
+        Создает клиента той версии API, с которой работает нагрузка
+
+        :param str shop_id: Идентификатор магазина
+        :param str secret_key: Секретный ключ
+        :param str host: Хост в формате ``scheme://hostname.com``
+        :param int qid: Идентификатор очереди
+        """
+        module = v1 if self.api == 'v1' else v2
+        client = module.Client(shop_id, secret_key)
+        if host:
+            client.set_host(host)
+        if qid is not None:
+            client.set_default_queue(qid)
+        return client
+
+    def resolve(self, operation):
+        """Возвращает операцию, которая будет выполнена вместо ``operation``"""
+        if operation == 'get_task_info' and not self.__task_ids:
+            return 'create_task'
+        return operation
+
+    def execute(self, client, operation, rnd):
+        """
+        Выполняет операцию
+
+        :param client: Клиент ``v1.Client`` или ``v2.Client``
+        :param str operation: Операция, возвращенная ``resolve``
+        :param random.Random rnd: Генератор случайных чисел потока
+        """
+        if operation == 'create_task':
+            task = client.create_task(self.__build_check(rnd))
+            self.__task_ids.append(task.id)
+        elif operation == 'create_tasks':
+            tasks = client.create_tasks([self.__build_check(rnd)
+                                         for _ in range(self.batch_size)])
+            self.__task_ids.extend(task.id for task in tasks)
+        elif operation == 'get_task_info':
+            client.get_task_info(self.__task_ids[rnd.randrange(len(self.__task_ids))])
+        elif operation == 'create_order':
+            client.create_order(self.__build_order(rnd))
+        elif operation == 'get_orders':
+            client.get_orders(limit=str(rnd.randint(1, 20)))
+        else:
+            raise ValueError('Unknown operation: %s' % operation)
+
+    def __next_id(self):
+        return '%s-%d' % (self.__prefix, next(self.__ids))
+
+    def __make_prices(self, rnd):
+        return [(Decimal(rnd.randint(100, 100000)) / 100, rnd.randint(1, 5))
+                for _ in range(self.positions)]
+
+    def __build_check(self, rnd):
+        prices = self.__make_prices(rnd)
+        total = sum(price * quantity for price, quantity in prices)
+        if self.api == 'v1':
+            check = v1.Check(self.__next_id(), 'client@client.ru', v1.Intent.SELL,
+                             v1.TaxSystem.COMMON)
+            for idx, (price, quantity) in enumerate(prices):
+                check.add_position('Товар %s' % idx, price, quantity, vat=v1.VatRate.RATE_20)
+            check.add_payment(total)
+            return check
+
+        check = v2.Check(self.__next_id(), v2.Intent.SELL)
+        check.set_company(payment_address='shop.ru', tax_system=v2.TaxSystem.COMMON)
+        check.set_client(email='client@client.ru')
+        for idx, (price, quantity) in enumerate(prices):
+            check.add_position(v2.Position(name='Товар %s' % idx, price=price, quantity=quantity,
+                                           measure=v2.MeasureTypes.PIECE, vat=v2.VatRate.RATE_20,
+                                           payment_method=v2.PaymentMethod.FULL_PAYMENT,
+                                           payment_object=v2.PaymentObject.PRODUCT))
+        check.add_payment(total, v2.PaymentType.CARD)
+        return check
+
+    def __build_order(self, rnd):
+        prices = self.__make_prices(rnd)
+        if self.api == 'v1':
+            order = v1.Order(self.__next_id(), v1.TaxSystem.COMMON, state='new')
+            order.set_client('Москва', '+79990000000', 'client@client.ru', 'Иванов Иван')
+            for idx, (price, quantity) in enumerate(prices):
+                order.add_position(str(idx), 'Товар %s' % idx, price, quantity,
+                                   vat=v1.VatRate.RATE_20)
+            return order
+
+        order = v2.Order(self.__next_id(), state='new')
+        order.set_company(payment_address='shop.ru', tax_system=v2.TaxSystem.COMMON)
+        order.set_client('Москва', '+79990000000', 'client@client.ru', 'Иванов Иван')
+        for idx, (price, quantity) in enumerate(prices):
+            order.add_item(v2.OrderItem(name='Товар %s' % idx, price=price, quantity=quantity,
+                                        measure=v2.MeasureTypes.PIECE, id=idx,
+                                        vat=v2.VatRate.RATE_20))
+        return order
+
+
+class OperationStats(object):
+    """
+    Измерения одной операции: гистограмма длительностей ``histogram``
+    (``LatencyHistogram``, в том числе неудачных операций), количество ошибок
+    ``errors`` и их виды ``error_types``: ``{'HTTPError 503': 2}``
+    """
+
+    __slots__ = ('histogram', 'errors', 'error_types')
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.errors = 0
+        self.error_types = {}
+
+    def record(self, seconds, error=None):
+        self.histogram.record(seconds)
+        if error is not None:
+            self.errors += 1
+            error_type = get_error_type(error)
+            self.error_types[error_type] = self.error_types.get(error_type, 0) + 1
+
+    def merge(self, other):
+        """
+        :param OperationStats other: Измерения
+        """
+        self.histogram.merge(other.histogram)
+        self.errors += other.errors
+        for error_type, count in other.error_types.items():
+            self.error_types[error_type] = self.error_types.get(error_type, 0) + count
+        return self
+
+    def summarize(self, elapsed):
+        """
+        Возвращает сводку измерений: количество операций ``count``, ошибок ``errors``,
+        частоту операций в секунду ``throughput``, среднюю ``mean``, квантили
+        ``p50``, ``p95``, ``p99`` и наибольшую ``max`` длительность, сек
+        (None, если операций не было), и виды ошибок ``error_types``
+
+        :param float elapsed: Время, за которое выполнены операции, сек
+        :rtype: dict
+        """
+        count = self.histogram.count
+        result = {
+            'count': count,
+            'errors': self.errors,
+            'throughput': count / elapsed if elapsed > 0 else 0.0,
+            'mean': self.histogram.sum / count if count else None,
+            'max': self.histogram.quantile(1),
+            'error_types': dict(self.error_types),
+        }
+        for q in QUANTILES:
+            result['p%g' % (q * 100)] = self.histogram.quantile(q)
+        return result
+
+
+class _Recorder(object):
+    # Измерения текущего интервала по операциям. Потоки записывают их под блокировкой:
+    # запись занимает микросекунды, а запрос к API - миллисекунды
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.interval = {}
+        self.total = {}
+
+    def record(self, operation, seconds, error=None):
+        with self.lock:
+            stats = self.interval.get(operation)
+            if stats is None:
+                stats = self.interval[operation] = OperationStats()
+            stats.record(seconds, error)
+
+    def take_interval(self):
+        with self.lock:
+            interval, self.interval = self.interval, {}
+        for operation, stats in interval.items():
+            self.total.setdefault(operation, OperationStats()).merge(stats)
+        return interval
+
+
+def _summarize(operations, elapsed):
+    total = OperationStats()
+    for stats in operations.values():
+        total.merge(stats)
+    return {
+        'operations': {operation: stats.summarize(elapsed)
+                       for operation, stats in operations.items()},
+        'total': total.summarize(elapsed),
+    }
+
+
+class LoadGenerator(object):
+    """
+    Подает нагрузку смесью операций ``Workload``.
+
+    При заданной частоте ``rate`` операции запускаются по общему расписанию
+    с равными промежутками независимо от длительности ответов (открытая модель).
+    Длительность операции отсчитывается от запланированного времени запуска:
+    если потоков не хватает, ожидание свободного потока входит в длительность,
+    а достигнутая частота оказывается ниже целевой. Без ``rate`` каждый поток
+    выполняет операции одну за другой (закрытая модель), и частота
+    определяется длительностью ответов.
+
+    Каждый поток создает собственного клиента, как обработчик в пуле воркеров.
+
+    :param Workload workload: Операции нагрузки
+    :param client_factory: Функция без аргументов, создающая клиента
+    :param dict mix: Веса операций ``{операция: вес}`` (см. ``parse_mix``)
+    :param float rate: Целевая частота операций в секунду (None - закрытая модель)
+    :param int concurrency: Количество потоков
+    :param int seed: Зерно генератора случайных чисел для воспроизводимой смеси операций
+    """
+
+    def __init__(self, workload, client_factory, mix, rate=None,
+                 concurrency=DEFAULT_CONCURRENCY, seed=None):
+        if rate is not None and rate <= 0:
+            raise ValueError('rate must be positive')
+        if concurrency < 1:
+            raise ValueError('concurrency must be positive')
+        self.workload = workload
+        self.client_factory = client_factory
+        self.rate = rate
+        self.concurrency = concurrency
+        self.seed = seed
+        self.__operations = []
+        self.__weights = []
+        weight = 0
+        for operation in OPERATIONS:
+            if mix.get(operation, 0) > 0:
+                weight += mix[operation]
+                self.__operations.append(operation)
+                self.__weights.append(weight)
+        if not self.__operations:
+            raise ValueError('Mix must contain an operation with positive weight')
+        self.__schedule_lock = threading.Lock()
+        self.__next_start = None
+        self.__recorder = None
+
+    def run(self, duration, interval=DEFAULT_INTERVAL, report=None):
+        """
+        Подает нагрузку ``duration`` секунд и дожидается завершения начатых операций.
+
+        Возвращает результат запуска: длительность ``duration``, сводки интервалов
+        ``intervals`` (время начала ``start`` и окончания ``end`` от начала запуска,
+        ``operations`` и ``total``), сводки по операциям ``operations`` и по всем
+        операциям ``total`` (см. ``OperationStats.summarize``).
+
+        :param float duration: Длительность нагрузки, сек
+        :param float interval: Длительность интервала отчета, сек
+        :param report: Функция, которая получает сводку каждого интервала
+        :rtype: dict
+        """
+        self.__recorder = _Recorder()
+        started = self.__next_start = perf_counter()
+        deadline = started + duration
+        threads = [threading.Thread(target=self.__work, args=(index, deadline))
+                   for index in range(self.concurrency)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        intervals = []
+        last = started
+        next_report = started + interval
+        while True:
+            alive = [thread for thread in threads if thread.is_alive()]
+            if alive:
+                # Последний интервал продолжается до завершения начатых операций,
+                # остаток нагрузки короче половины интервала присоединяется к нему
+                final = deadline - next_report < interval / 2.0
+                alive[0].join(None if final else max(next_report - perf_counter(), 0))
+                if final or perf_counter() < next_report:
+                    continue
+
+            now = perf_counter()
+            result = _summarize(self.__recorder.take_interval(), now - last)
+            result['start'], result['end'] = last - started, now - started
+            intervals.append(result)
+            if report is not None:
+                report(result)
+            last = now
+            next_report += interval
+            if not alive:
+                break
+
+        result = _summarize(self.__recorder.total, last - started)
+        result['duration'] = last - started
+        result['intervals'] = intervals
+        return result
+
+    def __choose(self, rnd):
+        position = bisect.bisect(self.__weights, rnd.random() * self.__weights[-1])
+        return self.__operations[min(position, len(self.__operations) - 1)]
+
+    def __work(self, index, deadline):
+        rnd = random.Random(None if self.seed is None else self.seed + index)
+        client = self.client_factory()
+        try:
+            while True:
+                if self.rate is None:
+                    started = perf_counter()
+                    if started >= deadline:
+                        break
+                else:
+                    with self.__schedule_lock:
+                        started = self.__next_start
+                        self.__next_start += 1.0 / self.rate
+                    if started >= deadline:
+                        break
+                    delay = started - perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                operation = self.workload.resolve(self.__choose(rnd))
+                error = None
+                try:
+                    self.workload.execute(client, operation, rnd)
+                except Exception as exc:
+                    error = exc
+                self.__recorder.record(operation, perf_counter() - started, error)
+        finally:
+            close = getattr(client, 'close', None)
+            if close is not None:
+                close()
+
+
+_ROW = '%-14s %9s %9s %8s %9s %9s %9s %9s'
+
+
+def _format_ms(value):
+    return '-' if value is None else '%.1f' % (value * 1000)
+
+
+def _format_row(name, summary):
+    return _ROW % (name, summary['count'], '%.1f' % summary['throughput'], summary['errors'],
+                   _format_ms(summary['p50']), _format_ms(summary['p95']),
+                   _format_ms(summary['p99']), _format_ms(summary['max']))
+
+
+def format_header(name='time, s'):
+    return _ROW % (name, 'ops', 'ops/s', 'errors', 'p50, ms', 'p95, ms', 'p99, ms', 'max, ms')
+
+
+def format_interval(result):
+    """Строка отчета об интервале"""
+    return _format_row('%.1f' % result['end'], result['total'])
+
+
+def format_summary(result):
+    """Сводка запуска по операциям и видам ошибок"""
+    lines = ['', 'Summary for %.1f s' % result['duration'], format_header('operation')]
+    for operation in OPERATIONS:
+        if operation in result['operations']:
+            lines.append(_format_row(operation, result['operations'][operation]))
+    lines.append(_format_row('total', result['total']))
+    error_types = result['total']['error_types']
+    if error_types:
+        lines.extend(['', 'Errors:'])
+        for error_type, count in sorted(error_types.items(), key=lambda item: -item[1]):
+            lines.append('  %-30s %d' % (error_type, count))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='KOMTET Kassa load generator')
+    parser.add_argument('--api', choices=['v1', 'v2'], default='v2', help='Client version')
+    parser.add_argument('--host', help='API host (default: KOMTET Kassa)')
+    parser.add_argument('--shop', help='Shop ID')
+    parser.add_argument('--secret', help='Secret key')
+    parser.add_argument('--queue', help='Queue ID')
+    parser.add_argument('--fake-server', action='store_true',
+                        help='Run load against a local fake server in a subprocess')
+    parser.add_argument('--fake-latency', default=DEFAULT_FAKE_LATENCY,
+                        help='Fake server latency: 0.05, uniform:0.01,0.1 or lognormal:0.05,0.5')
+    parser.add_argument('--fake-error-rate', type=float, default=0.0,
+                        help='Share of fake server responses with status 503')
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help='Operation weights (default: %(default)s)')
+    parser.add_argument('--rate', type=float,
+                        help='Target operations per second (default: as fast as threads allow)')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Number of worker threads')
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION,
+                        help='Load duration, sec')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help='Report interval, sec')
+    parser.add_argument('--positions', type=int, default=DEFAULT_POSITIONS,
+                        help='Positions per check and order')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='Checks per create_tasks request')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--json', help='Save results to JSON file')
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.fake_server:
+        shop_id, secret_key = args.shop or 'shop-id', args.secret or 'secret-key'
+        qid = args.queue or '1'
+    elif not (args.shop and args.secret and args.queue):
+        parser.error('--shop, --secret and --queue are required without --fake-server')
+    else:
+        shop_id, secret_key, qid = args.shop, args.secret, args.queue
+
+    server = None
+    host = args.host
+    if args.fake_server:
+        server = FakeServerProcess(shops={shop_id: secret_key}, latency=args.fake_latency,
+                                   error_rate=args.fake_error_rate, seed=args.seed).start()
+        host = server.url
+    try:
+        workload = Workload(args.api, positions=args.positions, batch_size=args.batch_size)
+        generator = LoadGenerator(
+            workload, lambda: workload.create_client(shop_id, secret_key, host, qid), mix,
+            rate=args.rate, concurrency=args.concurrency, seed=args.seed)
+        print('%s against %s: %s, %s' % (
+            args.api, host or DEFAULT_HOST, args.mix,
+            '%g ops/s' % args.rate if args.rate else '%d threads' % args.concurrency))
+        print(format_header())
+
+        def report(interval):
+            print(format_interval(interval))
+            sys.stdout.flush()
+
+        result = generator.run(args.duration, args.interval, report)
+    finally:
+        if server is not None:
+            server.stop()
+    print(format_summary(result))
+
+    if args.json:
+        result['config'] = {'api': args.api, 'host': host, 'mix': mix, 'rate': args.rate,
+                            'concurrency': args.concurrency, 'duration': args.duration,
+                            'positions': args.positions, 'batch_size': args.batch_size}
+        with open(args.json, 'w') as fp:
+            json.dump(result, fp, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,36 +1,72 @@
+import sys
+
 from .agent import Agent, AgentType
 from .check import (Check, CorrectionCheck, CorrectionType, Intent, MarkTypes,
                     MeasureTypes, PaymentMethod, PaymentObject, PaymentType,
                     Position, TaxSystem, VatRate, TimeZone, PlannedStatus)
-from .client import Client, EmployeeInfo, OrderInfo, Task, TaskInfo
+from .circuit import CircuitBreaker, CircuitOpenError, CircuitState
+from .client import BulkResult, Client, EmployeeInfo, OrderInfo, Task, TaskInfo
 from .employee import Employee, EmployeeType
+from .lib.money import Money
+from .metrics import LatencyHistogram, RequestMetrics, RouteMetrics
 from .order import Order, OrderItem
+from .outbox import Outbox, OutboxState
+from .ratelimit import FileRateLimiter, RateLimiter
+from .retry import RetryPolicy
+from .serializers import JSONSerializer, OrjsonSerializer
+from .template import CheckTemplate, TemplateCheck
+from .timing import RequestEvent
+from .tracker import TaskTracker
 
 
 __all__ = [
     'Agent',
     'AgentType',
+    'BulkResult',
     'Check',
+    'CheckTemplate',
+    'CircuitBreaker',
+    'CircuitOpenError',
+    'CircuitState',
     'Client',
     'CorrectionCheck',
     'CorrectionType',
     'Employee',
     'EmployeeInfo',
     'EmployeeType',
+    'FileRateLimiter',
     'Intent',
+    'JSONSerializer',
+    'LatencyHistogram',
     'MarkTypes',
     'MeasureTypes',
+    'Money',
     'PaymentMethod',
     'PaymentObject',
     'PaymentType',
     'Position',
+    'RateLimiter',
+    'RequestEvent',
+    'RequestMetrics',
+    'RetryPolicy',
+    'RouteMetrics',
     'Order',
     'OrderInfo',
     'OrderItem',
+    'OrjsonSerializer',
+    'Outbox',
+    'OutboxState',
     'Task',
     'TaskInfo',
+    'TaskTracker',
+    'TemplateCheck',
     'TaxSystem',
     'VatRate',
     'TimeZone',
     'PlannedStatus'
 ]
+
+
+if sys.version_info >= (3, 5):
+    from .async_client import AsyncClient  # noqa: F401
+    __all__.append('AsyncClient')
@@ -0,0 +1,219 @@
+# coding: utf-8
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .client import (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, BaseClient, EmployeeInfo,
+                     OrderInfo, Task, TaskInfo)
+
+
+DEFAULT_POOL_LIMIT = 100
+
+
+class AsyncClient(BaseClient):
+    """
+    Асинхронный клиент для asyncio-приложений.
+
+    Повторяет основные методы ``Client`` (задачи, заказы, сотрудники) в виде
+    корутин, а также ``set_timeout``, ``set_serializer``, ``set_host``
+    и ``set_default_queue``. Постраничного обхода (``iter_orders``,
+    ``iter_employees``), пакетной постановки ``create_tasks_bulk``, повторов,
+    ограничения частоты, предохранителя и наблюдателя у асинхронного клиента нет.
+
+    Запросы выполняются через одну ``aiohttp.ClientSession`` с собственным пулом
+    соединений, которую следует закрыть методом ``close`` (или использовать клиент
+    как асинхронный контекстный менеджер). Требуется пакет ``aiohttp``.
+
+    При ответе с ошибкой методы возбуждают ``aiohttp.ClientResponseError``,
+    при истечении тайм-аута - ``asyncio.TimeoutError``.
+
+    :param str shop_id: Идентификатор магазина
+    :param str secret_key: Секретный ключ
+    :param int pool_limit: Максимальное количество одновременных соединений (0 - без ограничения)
+    :param int pool_limit_per_host: Максимальное количество соединений с одним хостом
+                                    (0 - без ограничения)
+    :param bool keep_alive: Переиспользовать соединения между запросами
+    """
+
+    def __init__(self, shop_id, secret_key, pool_limit=DEFAULT_POOL_LIMIT, pool_limit_per_host=0,
+                 keep_alive=True):
+        if aiohttp is None:
+            raise ImportError('AsyncClient requires aiohttp: pip install komtet_kassa_sdk[async]')
+        super(AsyncClient, self).__init__(shop_id, secret_key)
+        self.__pool_limit = pool_limit
+        self.__pool_limit_per_host = pool_limit_per_host
+        self.__keep_alive = keep_alive
+        self.__session = None
+        self.set_timeout()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """
+        Закрывает HTTP-сессию и все соединения пула.
+        """
+        session, self.__session = self.__session, None
+        if session is not None:
+            await session.close()
+
+    def set_timeout(self, connect=DEFAULT_CONNECT_TIMEOUT, read=DEFAULT_READ_TIMEOUT):
+        """
+        Устанавливает тайм-ауты запросов, по умолчанию те же, что у ``Client``.
+
+        :param float connect: Тайм-аут установки соединения, сек (None - без ограничения)
+        :param float read: Тайм-аут ожидания ответа, сек (None - без ограничения)
+        """
+        self.__timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect, sock_read=read)
+        return self
+
+    async def is_queue_active(self, qid=None):
+        """
+        Является ли очередь активной
+
+        :param int qid: Идентификатор очереди
+        """
+        qid = self._handle_queue_id(qid)
+        result = await self.__request('GET', '/api/shop/v2/queues/%s' % qid)
+        return result.get('state') == 'active'
+
+    async def create_task(self, check, qid=None):
+        """
+        Постановка задачи в очередь на фискализацию
+
+        :param Check check: Экземпляр чека
+        :param int qid: Идентификатор очереди
+        """
+        qid = self._handle_queue_id(qid)
+        result = await self.__request('POST', '/api/shop/v2/queues/%s/task' % qid, check)
+        return Task.from_dict(result)
+
+    async def create_tasks(self, checks, qid=None):
+        """
+        Постановка множества задач в очередь на фискализацию
+
+        :param list check: Список экземпляров чека
+        :param int qid: Идентификатор очереди
+        """
+        qid = self._handle_queue_id(qid)
+        result = await self.__request('POST', '/api/shop/v2/queues/%s/multi-tasks' % qid,
+                                      list(checks))
+        return [Task.from_dict(value) for value in result.values()]
+
+    async def get_task_info(self, task_id):
+        """
+        Возвращает информацию о поставленной на фискализацию задаче
+
+        :param str|int task_id: ID задачи
+        """
+        result = await self.__request('GET', '/api/shop/v2/tasks/%s' % task_id)
+        return TaskInfo.from_dict(result)
+
+    async def get_orders(self, start='0', limit='10', courier_id=None, date_start=None):
+        """
+        Возвращает информацию о заказах
+        :param string courier_id: Индетификатор курьера
+        :param string date_start: Дата и время доставки (с)
+        :param string start: Начинать вывод заказов с start
+        :param string limit: Ограничить вывод заказов на limit элементов
+        """
+        return await self.__request('GET', self._get_orders_path(start, limit, courier_id,
+                                                                 date_start))
+
+    async def create_order(self, order):
+        """
+        Создание заказа на доставку
+
+        :param Order order: Экземпляр заказа
+        """
+        result = await self.__request('POST', '/api/shop/v2/orders', order)
+        return OrderInfo.from_dict(result)
+
+    async def update_order(self, oid, order):
+        """
+        Обновление заказа на доставку
+        :param int oid: Идентификатор заказа
+        :param Order order: Экземпляр заказа
+        """
+        result = await self.__request('PUT', '/api/shop/v2/orders/%s' % oid, order)
+        return OrderInfo.from_dict(result)
+
+    async def get_order_info(self, oid):
+        """
+        Просмотр информации о заказе
+        :param int oid: Идентификатор заказа
+        """
+        result = await self.__request('GET', '/api/shop/v2/orders/%s' % oid)
+        return OrderInfo.from_dict(result)
+
+    async def delete_order(self, oid):
+        """
+        Удаление заказа
+        :param int oid: Идентификатор заказа
+        """
+        await self.__request('DELETE', '/api/shop/v2/orders/%s' % oid, parse=False)
+        return True
+
+    async def get_employees(self, type=None, start='0', limit='10'):
+        """
+        Возвращает информацию о курьерах
+        :param EmployeeType type: Тип сотрудника
+        :param string start: Начинать вывод сотрудников с start
+        :param string limit: Ограничить вывод сотрудников на limit элементов
+        """
+        return await self.__request('GET', self._get_employees_path(type, start, limit))
+
+    async def create_employee(self, employee):
+        """
+        Создание сотрудника
+        :param Employee employee: Экземпляр сотрудника
+        """
+        result = await self.__request('POST', '/api/shop/v2/employees', dict(employee))
+        return EmployeeInfo.from_dict(result)
+
+    async def update_employee(self, eid, employee):
+        """
+        Обновление информации о сотруднике
+        :param int eid: Идентификатор сотрудника
+        :param Employee employee: Экземпляр сотрудника
+        """
+        result = await self.__request('PUT', '/api/shop/v2/employees/%s' % eid, dict(employee))
+        return EmployeeInfo.from_dict(result)
+
+    async def get_employee_info(self, eid):
+        """
+        Просмотр информации о сотруднике
+        :param int eid: Идентификатор сотрудника
+        """
+        result = await self.__request('GET', '/api/shop/v2/employees/%s' % eid)
+        return EmployeeInfo.from_dict(result)
+
+    async def delete_employee(self, eid):
+        """
+        Удаление сотрудника
+        :param int eid: Идентификатор сотрудника
+        """
+        await self.__request('DELETE', '/api/shop/v2/employees/%s' % eid, parse=False)
+        return True
+
+    def __get_session(self):
+        # Сессия создается при первом запросе, т.к. должна быть привязана
+        # к работающему циклу событий
+        if self.__session is None:
+            connector = aiohttp.TCPConnector(limit=self.__pool_limit,
+                                             limit_per_host=self.__pool_limit_per_host,
+                                             force_close=not self.__keep_alive)
+            self.__session = aiohttp.ClientSession(connector=connector)
+        return self.__session
+
+    async def __request(self, method, path, data=None, parse=True):
+        url, headers, data = self._prepare_request(method, path, data)
+        async with self.__get_session().request(method, url, headers=headers, data=data,
+                                                timeout=self.__timeout) as rep:
+            rep.raise_for_status()
+            if parse:
+                return await rep.json(content_type=None)
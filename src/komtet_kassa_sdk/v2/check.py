@@ -1,5 +1,7 @@
 # coding: utf-8
-from komtet_kassa_sdk.v2.lib.helpers import apply_discount, correction_positions
+from komtet_kassa_sdk.v2.lib.discount import apply_discounts
+from komtet_kassa_sdk.v2.lib.helpers import correct_positions
+from komtet_kassa_sdk.v2.lib.item import BaseItem, get_field_kinds, get_item_dicts, own_items
 
 
 class MarkTypes(object):
@@ -105,6 +107,29 @@ class VatRate(object):
 
     @classmethod
     def parse(cls, rate):
+        """
+        Ставка НДС по любой допустимой записи: '20', 20, 0.2, '20%', '20/120' и т.д.
+
+        Все записи известных ставок собираются в таблицу при импорте модуля, поэтому
+        обычно разбор - это поиск в словаре. Прочие дробные значения разбираются
+        полностью, а результат запоминается (не более ``_VAT_RATES_LIMIT`` значений).
+
+        :param str|int|float rate: Ставка
+        :rtype: str
+        """
+        spellings = _VAT_RATES.get(type(rate))
+        if spellings is not None:
+            result = spellings.get(rate)
+            if result is not None:
+                return result
+
+        result = cls._parse(rate)
+        if spellings is not None and type(rate) is float and len(spellings) < _VAT_RATES_LIMIT:
+            spellings[rate] = result
+        return result
+
+    @classmethod
+    def _parse(cls, rate):
         if isinstance(rate, str) and '.' in rate:
             rate = float(rate)
 
@@ -139,6 +164,38 @@ class VatRate(object):
         return cls.rates
 
 
+_VAT_RATES_LIMIT = 1024
+
+
+def _get_vat_rates():
+    # Таблица {тип: {запись: ставка}}. Тип входит в ключ, чтобы True, Decimal('20.0')
+    # и подклассы str разбирались как раньше, а не совпадали с 1, 20 и '20'
+    spellings = {str: set(), int: set(), float: set()}
+    for rate in VatRate.get_rates():
+        spellings[str].update([rate, rate + '%'])
+        if rate.isdigit():
+            number = int(rate)
+            spellings[int].add(number)
+            spellings[float].update([float(number), number / 100.0])
+            spellings[str].update(['%d.0' % number, '%.2f' % (number / 100.0),
+                                   '%r' % (number / 100.0)])
+    for rate in ['5/105', '7/107', '10/110', '20/120', '22/122']:
+        spellings[str].update([rate, rate + '%'])
+
+    rates = {}
+    for kind, values in spellings.items():
+        rates[kind] = {}
+        for value in values:
+            try:
+                rates[kind][value] = VatRate._parse(value)
+            except ValueError:
+                pass
+    return rates
+
+
+_VAT_RATES = _get_vat_rates()
+
+
 class MeasureTypes(object):
     PIECE = 0
     GRAMM = 10
@@ -422,14 +479,24 @@ class Check(object):
             'payments': [],
             'positions': []
         }
+        # Позиции, скопированные чеком перед изменением, см. own_items
+        self.__owned = {}
 
     def __iter__(self):
-        for item in self.__data.items():
-            yield item
+        # Позиции хранятся объектами, dict(check) по-прежнему содержит словари
+        for key, value in self.__data.items():
+            if key == 'positions':
+                value = get_item_dicts(value)
+            yield key, value
 
     def __getitem__(self, item):
         return self.__data[item]
 
+    def _asdict(self):
+        # Данные без копирования: сериализаторы записывают их напрямую,
+        # позиции материализуются только при записи
+        return self.__data
+
     def set_print(self, value):
         """
         :param bool value: Печатать бумажный чек или нет
@@ -439,7 +506,7 @@ class Check(object):
 
     def add_payment(self, amount, method=PaymentType.CARD):
         """
-        :param int|float amount: Сумма платежа
+        :param int|float|Money amount: Сумма платежа
         :param str method: Метод оплаты
         """
         self.__data['payments'].append({'sum': amount,
@@ -566,9 +633,13 @@ class Check(object):
 
     def add_position(self, position):
         """
+        Позиция добавляется без копирования. ``apply_discount`` и
+        ``apply_correction_positions`` перед первым изменением заменяют ее копией,
+        поэтому исходная позиция и другие чеки с ней не изменяются.
+
         :param Position position: Экземпляр позиции
         """
-        self.__data['positions'].append(dict(position))
+        self.__data['positions'].append(position)
 
     def set_callback_url(self, url):
         """
@@ -581,15 +652,28 @@ class Check(object):
 
     def apply_discount(self, discount):
         """
-        :param int|float discount: сумма скидки
+        :param int|float|Money discount: сумма скидки
         """
-        apply_discount(discount, self.__data['positions'])
+        positions = self.__data['positions']
+        self.__owned = own_items(positions, self.__owned)
+        apply_discounts([discount], [positions])
 
     def apply_correction_positions(self):
         """
         Кооректировка позиций с расхождениями между price * quantity и total
+
+        Позиции корректируются на месте, см. ``correct_positions``; позиции,
+        добавленные извне или несколько раз, предварительно заменяются копиями
+
+        :return: индексы разделенных позиций
+        :rtype: list
         """
-        self.__data['positions'] = correction_positions(self.__data['positions'])
+        positions = self.__data['positions']
+        self.__owned = own_items(positions, self.__owned)
+        split = correct_positions(positions)
+        # Выделенные позиции - новые копии, они также принадлежат чеку
+        self.__owned = dict((id(item), item) for item in positions)
+        return split
 
     def set_internet(self, value):
         """Признак применения ККТ при осуществлении расчета в безналичном порядке в сети «Интернет»
@@ -645,12 +729,20 @@ class CorrectionCheck(object):
         }
 
     def __iter__(self):
-        for item in self.__data.items():
-            yield item
+        # Позиции хранятся объектами, dict(check) по-прежнему содержит словари
+        for key, value in self.__data.items():
+            if key == 'positions':
+                value = get_item_dicts(value)
+            yield key, value
 
     def __getitem__(self, item):
         return self.__data[item]
 
+    def _asdict(self):
+        # Данные без копирования: сериализаторы записывают их напрямую,
+        # позиции материализуются только при записи
+        return self.__data
+
     def set_print(self, value):
         """
         :param bool value: Печатать бумажный чек или нет
@@ -767,7 +859,7 @@ class CorrectionCheck(object):
 
     def add_payment(self, amount, method=PaymentType.CARD):
         """
-        :param int|float amount: Сумма платежа
+        :param int|float|Money amount: Сумма платежа
         :param str method: Метод оплаты
         """
         self.__data['payments'].append({'sum': amount,
@@ -828,7 +920,7 @@ class CorrectionCheck(object):
         """
         :param Position position: Экземпляр позиции
         """
-        self.__data['positions'].append(dict(position))
+        self.__data['positions'].append(position)
 
     def set_internet(self, value):
         """Признак применения ККТ при осуществлении расчета в безналичном порядке в сети «Интернет»
@@ -845,77 +937,78 @@ class CorrectionCheck(object):
         return self
 
 
-class Position(object):
+class Position(BaseItem):
     """
         :param str name: Наименование позиции
-        :param int|float price: Цена позиции в чеке
+        :param int|float|Money price: Цена позиции в чеке
         :param int|float quantity: Количество единиц
         :param str measure: Единица измерения
         :param str payment_method: Cпособ рассчета
         :param str payment_subject: Признак рассчета
-        :param int|float total: Общая стоимость позиции
+        :param int|float|Money total: Общая стоимость позиции
         :param str user_data: Дополнительный реквизит предмета расчета
-        :param int|float excise: Сумма акциза
+        :param int|float|Money excise: Сумма акциза
         :param str id: Идентификатор позиции в магазине
         :param str country_code: Цифровой код страны происхождения товара
         :param str declaration_number: Номер таможенной декларации
         :param str vat: Налоговая ставка
     """
 
+    _fields = ('name', 'measure', 'price', 'quantity', 'payment_object', 'payment_method',
+               'total', 'vat', 'id')
+    _required = 8
+    _extra_fields = ('mark_code', 'mark_quantity', 'planned_status')
+    _kinds = get_field_kinds(_fields, _required, _extra_fields)
+    __slots__ = _fields + _extra_fields
+
     def __init__(self, name, price, quantity, measure, payment_object, payment_method, total=None,
                  user_data=None, excise=None, id=None, country_code=None, declaration_number=None,
                  vat=VatRate.RATE_NO):
+        super(Position, self).__init__()
         if total is None:
             total = price * quantity
 
-        self.__data = {
-            'name': name,
-            'measure': measure,
-            'price': price,
-            'quantity': quantity,
-            'payment_object': payment_object,
-            'payment_method': payment_method,
-            'total': total,
-            'vat': VatRate.parse(vat)
-        }
-
-        if measure is not None:
-            self.__data['measure'] = measure
-
-        if id is not None:
-            self.__data['id'] = id
+        self.name = name
+        self.measure = measure
+        self.price = price
+        self.quantity = quantity
+        self.payment_object = payment_object
+        self.payment_method = payment_method
+        self.total = total
+        self.vat = VatRate.parse(vat)
+        self.id = id
 
         if excise is not None:
-            self.__data['excise'] = excise
+            self['excise'] = excise
 
         if country_code is not None:
-            self.__data['country_code'] = country_code
+            self['country_code'] = country_code
 
         if user_data is not None:
-            self.__data['user_data'] = user_data
+            self['user_data'] = user_data
 
         if declaration_number is not None:
-            self.__data['declaration_number'] = declaration_number
+            self['declaration_number'] = declaration_number
 
     def set_agent(self, agent):
         """
         :param Agent agent: агент на позицию
         """
-        self.__data.update(dict(agent))
+        self.update(agent)
 
     def set_mark_code(self, type, code):
         """ Установка кода маркировки
         :param str type: Тип маркировки
         :param str code: Код маркировки
         """
-        self.__data['mark_code'] = {type: code}
+        self['mark_code'] = {type: code}
 
     def set_mark_quantity(self, numerator, denominator):
         """ Установка дробного количества маркированного товара
         :param int numerator: Числитель дробной части предмета расчета
         :param int denominator: Знаменатель дробной части предмета расчета
         """
-        self.__data['mark_quantity'] = {
+        self['mark_quantity'] = {
             'numerator': numerator,
             'denominator': denominator
         }
@@ -924,7 +1017,7 @@ class Position(object):
         """
         :param bool value: Признак использования объемно-сортового учета (ОСУ)
         """
-        self.__data['wholesale'] = bool(value)
+        self['wholesale'] = bool(value)
 
     def add_sectoral_item_props(self, federal_id, date, number, value):
         """ Установка данных об отраслевой принадлежности
@@ -933,10 +1026,10 @@ class Position(object):
         :param str number: Номер нормативного акта федерального органа исполнительной власти
         :param str value: Состав значений
         """
-        if not self.__data.get('sectoral_item_props'):
-            self.__data['sectoral_item_props'] = []
+        if not self.get('sectoral_item_props'):
+            self['sectoral_item_props'] = []
 
-        self.__data['sectoral_item_props'].append({
+        self['sectoral_item_props'].append({
             'federal_id': federal_id,
             'date': date,
             'number': number,
@@ -947,8 +1040,4 @@ class Position(object):
         """Установка планируемого статуса товара
         :param int planned_status: Планируемый статус товара
         """
-        self.__data['planned_status'] = planned_status
-
-    def __iter__(self):
-        for item in self.__data.items():
-            yield item
+        self['planned_status'] = planned_status
@@ -0,0 +1,178 @@
+# coding: utf-8
+import logging
+import threading
+import time
+
+import requests
+
+
+logger = logging.getLogger(__name__)
+
+monotonic = getattr(time, 'monotonic', time.time)
+
+
+class CircuitState(object):
+    """Состояния предохранителя"""
+
+    CLOSED = 'closed'
+    """Запросы выполняются"""
+
+    OPEN = 'open'
+    """Запросы отклоняются без обращения к серверу"""
+
+    HALF_OPEN = 'half_open'
+    """Выполняются пробные запросы"""
+
+
+class CircuitOpenError(requests.RequestException):
+    """Запрос отклонен разомкнутым предохранителем"""
+
+
+class CircuitBreaker(object):
+    """
+    Предохранитель (circuit breaker) для запросов к серверу.
+
+    После ``failure_threshold`` неудачных запросов подряд (сетевая ошибка,
+    тайм-аут или ответ с кодом 5xx) предохранитель размыкается, и следующие
+    запросы в течение ``recovery_timeout`` секунд сразу завершаются
+    исключением ``CircuitOpenError``. Затем выполняется до ``half_open_max_calls``
+    пробных запросов: при успехе предохранитель замыкается, при ошибке -
+    снова размыкается.
+
+    Один предохранитель можно использовать в нескольких клиентах и потоках.
+
+    :param int failure_threshold: Количество неудачных запросов подряд для размыкания
+    :param float recovery_timeout: Время до пробных запросов после размыкания, сек
+    :param int half_open_max_calls: Максимальное количество одновременных пробных запросов
+    :param callable on_state_change: Обработчик смены состояния,
+                                     ``on_state_change(breaker, old_state, new_state)``
+    """
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0, half_open_max_calls=1,
+                 on_state_change=None):
+        if failure_threshold < 1:
+            raise ValueError('failure_threshold must be positive')
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.on_state_change = on_state_change
+        self.__state = CircuitState.CLOSED
+        self.__failures = 0
+        self.__opened_at = None
+        self.__probes = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def state(self):
+        """Текущее состояние, ``CircuitState``"""
+        with self.__lock:
+            if self.__state == CircuitState.OPEN and self.__retry_in() <= 0:
+                return CircuitState.HALF_OPEN
+            return self.__state
+
+    @property
+    def failure_count(self):
+        """Количество неудачных запросов подряд"""
+        return self.__failures
+
+    def get_status(self):
+        """
+        Возвращает состояние предохранителя для мониторинга:
+        ``{'state': ..., 'failures': ..., 'retry_in': ...}``, где ``retry_in`` -
+        время до пробных запросов в секундах (``None``, если предохранитель не разомкнут)
+        """
+        with self.__lock:
+            retry_in = None
+            state = self.__state
+            if state == CircuitState.OPEN:
+                retry_in = self.__retry_in()
+                if retry_in <= 0:
+                    state, retry_in = CircuitState.HALF_OPEN, None
+            return {'state': state, 'failures': self.__failures, 'retry_in': retry_in}
+
+    def reset(self):
+        """Замыкает предохранитель"""
+        with self.__lock:
+            self.__failures = 0
+            transition = self.__set_state(CircuitState.CLOSED)
+        self.__notify(transition)
+
+    def call(self, send):
+        """
+        Выполняет запрос через предохранитель
+
+        :param callable send: Функция, отправляющая запрос и возвращающая ответ
+        :return: ответ сервера
+        """
+        self.before_request()
+        try:
+            response = send()
+        except requests.RequestException:
+            self.record_failure()
+            raise
+        except Exception:
+            # Ошибка не связана с сервером, но пробный запрос нужно освободить
+            self.record_success()
+            raise
+        if response.status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+        return response
+
+    def before_request(self):
+        """
+        Проверяет, можно ли выполнить запрос
+
+        :raises CircuitOpenError: если предохранитель разомкнут
+        """
+        transition = None
+        with self.__lock:
+            if self.__state == CircuitState.OPEN:
+                retry_in = self.__retry_in()
+                if retry_in > 0:
+                    raise CircuitOpenError('Circuit is open, retry in %.1f s' % retry_in)
+                transition = self.__set_state(CircuitState.HALF_OPEN)
+
+            if self.__state == CircuitState.HALF_OPEN:
+                if self.__probes >= self.half_open_max_calls:
+                    raise CircuitOpenError('Circuit is half-open, probe request in progress')
+                self.__probes += 1
+        self.__notify(transition)
+
+    def record_success(self):
+        """Учитывает успешный запрос"""
+        with self.__lock:
+            self.__failures = 0
+            transition = None
+            if self.__state == CircuitState.HALF_OPEN:
+                transition = self.__set_state(CircuitState.CLOSED)
+        self.__notify(transition)
+
+    def record_failure(self):
+        """Учитывает неудачный запрос"""
+        with self.__lock:
+            self.__failures += 1
+            transition = None
+            if (self.__state == CircuitState.HALF_OPEN or
+                    self.__failures >= self.failure_threshold):
+                transition = self.__set_state(CircuitState.OPEN)
+                self.__opened_at = monotonic()
+        self.__notify(transition)
+
+    def __retry_in(self):
+        return self.__opened_at + self.recovery_timeout - monotonic()
+
+    def __set_state(self, state):
+        old_state, self.__state = self.__state, state
+        self.__probes = 0
+        if old_state != state:
+            return old_state, state
+
+    def __notify(self, transition):
+        if transition is None:
+            return
+        old_state, new_state = transition
+        logger.warning('Circuit breaker state changed: %s -> %s', old_state, new_state)
+        if self.on_state_change is not None:
+            self.on_state_change(self, old_state, new_state)
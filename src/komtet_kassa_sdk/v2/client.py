@@ -4,17 +4,41 @@ import functools
 import hashlib
 import hmac
 import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from .lib.money import Money
+from .serializers import get_default_serializer
+from .timing import RequestEvent, perf_counter
+
+
+logger = logging.getLogger(__name__)
 
 
 DEFAULT_HOST = 'https://kassa.komtet.ru'
 
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 30.0
+
+DEFAULT_BULK_CHUNK_SIZE = 100
+DEFAULT_BULK_MAX_WORKERS = 4
+
+DEFAULT_PAGE_SIZE = 100
+
 
 class JSONEncoder(json.JSONEncoder):
     def default(self, obj):
-        if isinstance(obj, decimal.Decimal):
+        if isinstance(obj, (decimal.Decimal, Money)):
             return float(obj)
+        if hasattr(obj, '_asdict'):
+            return obj._asdict()
         return super(JSONEncoder, self).default(obj)
 
 
@@ -22,12 +46,40 @@ json_encode = functools.partial(json.dumps, cls=JSONEncoder)
 
 
 class Response(object):
+    """
+    Ответ сервера.
+
+    Хранит разобранный JSON-объект без копирования и возвращает его поля
+    как атрибуты по мере обращения к ним.
+    """
+
+    __slots__ = ('__data',)
 
     def __init__(self, **data):
         self.__data = data
 
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Создает ответ поверх словаря без его копирования
+
+        :param dict data: Разобранный JSON-объект
+        """
+        response = cls.__new__(cls)
+        response.__data = data
+        return response
+
     def __getattr__(self, name):
-        return self.__data[name]
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self.__data[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__,
+                           ', '.join('%s=%r' % item for item in self.__data.items()))
 
     def _asdict(self):
         return self.__data
@@ -37,11 +89,112 @@ class Response(object):
             yield item
 
 
-Task = TaskInfo = OrderInfo = EmployeeInfo = Response
+class Field(object):
+    """
+    Поле ответа сервера. Значение читается из ответа при каждом обращении;
+    если поле в ответе отсутствует, возвращается ``None``.
+    """
+
+    def __init__(self, name, doc=None):
+        self.name = name
+        self.__doc__ = doc
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance._asdict().get(self.name)
+
+
+class TaskInfo(Response):
+    """Информация о задаче на фискализацию"""
+
+    __slots__ = ()
+
+    id = Field('id', 'Идентификатор задачи')
+    external_id = Field('external_id', 'Идентификатор операции в магазине')
+    state = Field('state', 'Состояние задачи')
+    error_description = Field('error_description', 'Описание ошибки, если state == "error"')
+    fiscal_data = Field('fiscal_data', 'Фискальные данные')
 
 
-class Client(object):
+class Task(TaskInfo):
+    """Задача, поставленная в очередь на фискализацию"""
+
+    __slots__ = ()
+
+    print_queue_id = Field('print_queue_id', 'Идентификатор очереди')
+
+
+class OrderInfo(Response):
+    """Информация о заказе"""
+
+    __slots__ = ()
+
+    id = Field('id', 'Идентификатор заказа')
+    external_id = Field('external_id', 'Номер заказа в магазине')
+    task_id = Field('task_id', 'Идентификатор задачи на фискализацию')
+    state = Field('state', 'Статус заказа')
+    amount = Field('amount', 'Сумма заказа')
+    prepayment = Field('prepayment', 'Предоплата')
+    payment_type = Field('payment_type', 'Тип платежа')
+    is_paid = Field('is_paid', 'Заказ оплачен')
+    is_pay_to_courier = Field('is_pay_to_courier', 'Оплата курьеру')
+    client_name = Field('client_name', 'Имя получателя')
+    client_address = Field('client_address', 'Адрес доставки')
+    client_email = Field('client_email', 'Email получателя')
+    client_phone = Field('client_phone', 'Телефон получателя')
+    date_start = Field('date_start', 'Начальное время доставки')
+    date_end = Field('date_end', 'Конечное время доставки')
+    description = Field('description', 'Комментарий к заказу')
+    courier = Field('courier', 'Курьер')
+    items = Field('items', 'Позиции заказа')
+
+
+class EmployeeInfo(Response):
+    """Информация о сотруднике"""
+
+    __slots__ = ()
+
+    id = Field('id', 'Идентификатор сотрудника')
+    type = Field('type', 'Тип сотрудника')
+    name = Field('name', 'ФИО сотрудника')
+    email = Field('email', 'Email сотрудника')
+    phone = Field('phone', 'Телефон сотрудника')
+    inn = Field('inn', 'ИНН сотрудника')
+    payment_address = Field('payment_address', 'Адрес места расчета')
+    is_manager = Field('is_manager', 'Разрешено редактировать и создавать заказы')
+    is_can_assign_order = Field('is_can_assign_order', 'Разрешено выбирать свободные заказы')
+    is_app_fast_basket = Field('is_app_fast_basket', 'Переход в корзину сразу после выбора товара')
+
+
+class BulkResult(dict):
     """
+    Результат пакетной постановки задач: отображение ``external_id`` чека
+    на созданную задачу ``Task`` либо на исключение, из-за которого
+    задача не была создана.
+    """
+
+    @property
+    def tasks(self):
+        """Успешно созданные задачи: ``{external_id: Task}``"""
+        return {key: value for key, value in self.items() if not isinstance(value, Exception)}
+
+    @property
+    def errors(self):
+        """Ошибки постановки: ``{external_id: Exception}``"""
+        return {key: value for key, value in self.items() if isinstance(value, Exception)}
+
+    @property
+    def ok(self):
+        """Все задачи созданы успешно"""
+        return not self.errors
+
+
+class BaseClient(object):
+    """
+    Общая часть синхронного и асинхронного клиентов: адрес сервера,
+    очередь по умолчанию, построение URL, сериализация и подпись запросов.
+
     :param str shop_id: Идентификатор магазина
     :param str secret_key: Секретный ключ
     """
@@ -49,8 +202,9 @@ class Client(object):
     def __init__(self, shop_id, secret_key):
         self.__host = DEFAULT_HOST
         self.__shop_id = shop_id
-        self.__secret_key = secret_key.encode('utf-8')
+        self.__hmac = hmac.new(secret_key.encode('utf-8'), digestmod=hashlib.md5)
         self.__default_queue = None
+        self.__serializer = get_default_serializer()
 
     def set_host(self, host):
         """
@@ -72,16 +226,247 @@ class Client(object):
         self.__default_queue = qid
         return self
 
+    def set_serializer(self, serializer):
+        """
+        Устанавливает сериализатор тела запроса.
+
+        По умолчанию используется ``OrjsonSerializer``, если установлен
+        пакет orjson, иначе ``JSONSerializer``.
+
+        Чеки и заказы передаются в сериализатор без копирования, как объекты
+        ``Check``, ``CorrectionCheck`` и ``Order``; данные для записи возвращает
+        их метод ``_asdict()``.
+
+        :param serializer: Объект с методом ``dumps(obj) -> bytes``
+        """
+        self.__serializer = serializer
+        return self
+
+    def _handle_queue_id(self, qid):
+        if qid is None:
+            if self.__default_queue is None:
+                raise ValueError('Queue ID is not specified')
+            qid = self.__default_queue
+        return qid
+
+    def _get_url(self, path):
+        return '{}/{}'.format(self.__host, path.strip('/'))
+
+    def _get_signature(self, method, url, body=None):
+        # Подпись вычисляется копированием заранее подготовленного HMAC с ключом
+        # магазина и последовательной передачей частей запроса без их склеивания
+        signature = self.__hmac.copy()
+        signature.update(method.encode('ascii'))
+        signature.update(url.encode('utf-8'))
+        if body:
+            signature.update(body)
+        return signature.hexdigest()
+
+    def _prepare_request(self, method, path, data=None, event=None):
+        """
+        Формирует URL, заголовки и тело запроса.
+
+        Тело сериализуется в байты один раз: эти же байты подписываются
+        и передаются серверу.
+
+        :param str method: HTTP-метод
+        :param str path: Путь запроса
+        :param data: Данные для передачи в теле запроса
+        :param RequestEvent event: Событие, в которое записываются длительности этапов
+        :return: кортеж ``(url, headers, data)``, где ``data`` - ``bytes`` или ``None``
+        """
+        if event is not None:
+            return self.__prepare_observed_request(method, path, data, event)
+
+        url = self._get_url(path)
+        headers = {
+            'Authorization': self.__shop_id,
+            'Accept': 'application/json'
+        }
+        if data is None:
+            headers['X-HMAC-Signature'] = self._get_signature(method, url)
+        else:
+            data = self.__serializer.dumps(data)
+            headers['Content-Type'] = 'application/json'
+            headers['X-HMAC-Signature'] = self._get_signature(method, url, data)
+        return url, headers, data
+
+    def __prepare_observed_request(self, method, path, data, event):
+        started = perf_counter()
+        url = event.url = self._get_url(path)
+        headers = {
+            'Authorization': self.__shop_id,
+            'Accept': 'application/json'
+        }
+        if data is not None:
+            headers['Content-Type'] = 'application/json'
+
+        encoding = signing = perf_counter()
+        event.build = encoding - started
+        if data is not None:
+            data = self.__serializer.dumps(data)
+            event.payload_bytes = len(data)
+            signing = perf_counter()
+            event.encode = signing - encoding
+
+        headers['X-HMAC-Signature'] = self._get_signature(method, url, data)
+        event.sign = perf_counter() - signing
+        return url, headers, data
+
+    @staticmethod
+    def _get_orders_path(start, limit, courier_id, date_start):
+        path = '/api/shop/v2/orders?start=%s&limit=%s' % (start, limit)
+        if courier_id:
+            path += '&courier_id=%s' % courier_id
+
+        if date_start:
+            path += '&date_start=%s' % date_start
+
+        return path
+
+    @staticmethod
+    def _get_employees_path(type, start, limit):
+        path = '/api/shop/v2/employees?start=%s&limit=%s' % (start, limit)
+        if type:
+            path += '&type=%s' % type
+
+        return path
+
+
+class Client(BaseClient):
+    """
+    Все запросы клиента выполняются через одну HTTP-сессию с пулом постоянных
+    соединений, поэтому экземпляр клиента следует переиспользовать и закрывать
+    методом ``close`` (или использовать как контекстный менеджер).
+
+    :param str shop_id: Идентификатор магазина
+    :param str secret_key: Секретный ключ
+    :param int pool_connections: Количество хостов, для которых кэшируются пулы соединений
+    :param int pool_maxsize: Максимальное количество соединений в пуле одного хоста
+    :param bool pool_block: Ожидать освобождения соединения, если пул хоста исчерпан
+    :param bool keep_alive: Переиспользовать соединения между запросами
+    """
+
+    def __init__(self, shop_id, secret_key, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False, keep_alive=True):
+        super(Client, self).__init__(shop_id, secret_key)
+        self.__pool_connections = pool_connections
+        self.__pool_maxsize = pool_maxsize
+        self.__pool_block = pool_block
+        self.__keep_alive = keep_alive
+        self.__session = None
+        self.__session_lock = threading.Lock()
+        self.__retry_policy = None
+        self.__rate_limiter = None
+        self.__circuit_breaker = None
+        self.__observer = None
+        self.__timeout = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Закрывает HTTP-сессию и все соединения пула.
+
+        После закрытия клиент можно продолжать использовать: при следующем
+        запросе будет открыта новая сессия.
+        """
+        with self.__session_lock:
+            session, self.__session = self.__session, None
+        if session is not None:
+            session.close()
+
+    def set_retry_policy(self, retry_policy):
+        """
+        Устанавливает политику повторных запросов.
+
+        По умолчанию запросы не повторяются.
+
+        :param RetryPolicy retry_policy: Политика повторов (None - отключить повторы)
+        """
+        self.__retry_policy = retry_policy
+        return self
+
+    def set_rate_limiter(self, rate_limiter):
+        """
+        Устанавливает ограничение частоты запросов.
+
+        Перед каждым запросом (в том числе повторным) клиент получает токен
+        у ограничителя и при необходимости ожидает. Чтобы ограничение было общим
+        для нескольких клиентов или процессов, передайте им один ``RateLimiter``
+        или ``FileRateLimiter`` с одним и тем же файлом.
+
+        :param RateLimiter|FileRateLimiter rate_limiter: Ограничитель (None - без ограничения)
+        """
+        self.__rate_limiter = rate_limiter
+        return self
+
+    def set_timeout(self, connect=DEFAULT_CONNECT_TIMEOUT, read=DEFAULT_READ_TIMEOUT):
+        """
+        Устанавливает тайм-ауты запросов.
+
+        :param float connect: Тайм-аут установки соединения, сек (None - без ограничения)
+        :param float read: Тайм-аут ожидания ответа, сек (None - без ограничения)
+        """
+        self.__timeout = (connect, read)
+        return self
+
+    def get_max_request_time(self):
+        """
+        Возвращает максимальную длительность одного запроса с учетом тайм-аутов
+        и политики повторов, сек, или None, если тайм-ауты не ограничены.
+
+        Ожидание ограничителя частоты запросов не учитывается.
+        """
+        connect, read = self.__timeout
+        if connect is None or read is None:
+            return None
+        if self.__retry_policy is None:
+            return connect + read
+        return (self.__retry_policy.max_attempts * (connect + read) +
+                self.__retry_policy.get_max_wait())
+
+    def set_observer(self, observer):
+        """
+        Устанавливает наблюдателя за запросами.
+
+        После каждого запроса (в том числе завершившегося ошибкой) наблюдатель
+        получает событие ``RequestEvent`` с HTTP-методом, шаблоном пути, размером тела,
+        кодом ответа и длительностью этапов: формирования запроса, сериализации,
+        подписи, отправки и разбора ответа. Наблюдатель вызывается в потоке, выполнившем
+        запрос; исключения наблюдателя записываются в лог и не влияют на результат запроса.
+
+        Без наблюдателя время этапов не измеряется.
+
+        :param callable observer: Наблюдатель, ``observer(event)`` (None - отключить)
+        """
+        self.__observer = observer
+        return self
+
+    def set_circuit_breaker(self, circuit_breaker):
+        """
+        Устанавливает предохранитель, который после серии неудачных запросов
+        отклоняет запросы исключением ``CircuitOpenError``, не обращаясь к серверу.
+
+        :param CircuitBreaker circuit_breaker: Предохранитель (None - отключить)
+        """
+        self.__circuit_breaker = circuit_breaker
+        return self
+
     def is_queue_active(self, qid=None):
         """
         Является ли очередь активной
 
         :param int qid: Идентификатор очереди
         """
-        qid = self.__handle_queue_id(qid)
-        rep = self.__get('/api/shop/v2/queues/%s' % qid)
-        rep.raise_for_status()
-        return rep.json().get('state') == 'active'
+        qid = self._handle_queue_id(qid)
+        return self.__request('GET', '/api/shop/v2/queues/%s' % qid,
+                              route='/api/shop/v2/queues/{qid}',
+                              parse=lambda result: result.get('state') == 'active')
 
     def create_task(self, check, qid=None):
         """
@@ -90,11 +475,9 @@ class Client(object):
         :param Check check: Экземпляр чека
         :param int qid: Идентификатор очереди
         """
-        qid = self.__handle_queue_id(qid)
-        rep = self.__post('/api/shop/v2/queues/%s/task' % qid, dict(check))
-        rep.raise_for_status()
-        result = rep.json()
-        return Task(**result)
+        qid = self._handle_queue_id(qid)
+        return self.__request('POST', '/api/shop/v2/queues/%s/task' % qid, check,
+                              route='/api/shop/v2/queues/{qid}/task', parse=Task.from_dict)
 
     def create_tasks(self, checks, qid=None):
         """
@@ -103,12 +486,76 @@ class Client(object):
         :param list check: Список экземпляров чека
         :param int qid: Идентификатор очереди
         """
-        qid = self.__handle_queue_id(qid)
-        rep = self.__post('/api/shop/v2/queues/%s/multi-tasks' % qid,
-                          [dict(check) for check in checks])
-        rep.raise_for_status()
-        result = rep.json()
-        return [Task(**value) for value in result.values()]
+        qid = self._handle_queue_id(qid)
+        return self.__request('POST', '/api/shop/v2/queues/%s/multi-tasks' % qid, list(checks),
+                              route='/api/shop/v2/queues/{qid}/multi-tasks',
+                              parse=lambda result: [Task.from_dict(value)
+                                                    for value in result.values()])
+
+    def create_tasks_bulk(self, checks, qid=None, chunk_size=DEFAULT_BULK_CHUNK_SIZE,
+                          max_workers=DEFAULT_BULK_MAX_WORKERS):
+        """
+        Постановка большого количества задач в очередь на фискализацию
+
+        Чеки разбиваются на пакеты по ``chunk_size`` штук, которые отправляются
+        через ``create_tasks`` параллельно, не более чем в ``max_workers`` потоков.
+        Ошибка отправки или разбора ответа пакета (любое исключение) не влияет
+        на остальные пакеты: она сохраняется в результате для каждого чека этого
+        пакета, а уже созданные задачи остальных пакетов не теряются.
+
+        Результат сопоставляет задачи с чеками по ``external_id``, поэтому
+        номера операций чеков должны быть уникальными.
+
+        Для полной параллельности размер пула соединений клиента (``pool_maxsize``)
+        должен быть не меньше ``max_workers``.
+
+        :param list checks: Список экземпляров чека
+        :param int qid: Идентификатор очереди
+        :param int chunk_size: Количество чеков в одном запросе
+        :param int max_workers: Количество одновременно отправляемых пакетов
+        :rtype: BulkResult
+        :raises ValueError: если ``external_id`` чеков повторяются
+        """
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be positive')
+
+        qid = self._handle_queue_id(qid)
+        checks = list(checks)
+        external_ids = [check['external_id'] for check in checks]
+        if len(set(external_ids)) != len(external_ids):
+            seen = set()
+            for external_id in external_ids:
+                if external_id in seen:
+                    raise ValueError('Duplicate external_id %s' % external_id)
+                seen.add(external_id)
+
+        def send(index):
+            chunk = checks[index:index + chunk_size]
+            chunk_ids = external_ids[index:index + chunk_size]
+            try:
+                tasks = {str(task.external_id): task for task in self.create_tasks(chunk, qid)}
+            except Exception as exc:
+                return [(external_id, exc) for external_id in chunk_ids]
+
+            outcome = []
+            for external_id in chunk_ids:
+                task = tasks.get(str(external_id))
+                if task is None:
+                    task = ValueError('Task for external_id %s is missing in response'
+                                      % external_id)
+                outcome.append((external_id, task))
+            return outcome
+
+        result = BulkResult()
+        if not checks:
+            return result
+
+        indexes = range(0, len(checks), chunk_size)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(indexes))) as executor:
+            for outcome in executor.map(send, indexes):
+                result.update(outcome)
+
+        return result
 
     def get_task_info(self, task_id):
         """
@@ -116,10 +563,8 @@ class Client(object):
 
         :param str|int task_id: ID задачи
         """
-        rep = self.__get('/api/shop/v2/tasks/%s' % task_id)
-        rep.raise_for_status()
-        result = rep.json()
-        return TaskInfo(**result)
+        return self.__request('GET', '/api/shop/v2/tasks/%s' % task_id,
+                              route='/api/shop/v2/tasks/{task_id}', parse=TaskInfo.from_dict)
 
     def get_orders(self, start='0', limit='10', courier_id=None, date_start=None,):
         """
@@ -130,17 +575,26 @@ class Client(object):
         :param string limit: Ограничить вывод заказов на limit элементов
         """
 
-        url = '/api/shop/v2/orders?start=%s&limit=%s' % (start, limit)
-        if courier_id:
-            url += '&courier_id=%s' % courier_id
+        return self.__request('GET', self._get_orders_path(start, limit, courier_id, date_start),
+                              route='/api/shop/v2/orders')
 
-        if date_start:
-            url += '&date_start=%s' % date_start
+    def iter_orders(self, courier_id=None, date_start=None, page_size=DEFAULT_PAGE_SIZE,
+                    prefetch=False):
+        """
+        Последовательно возвращает все заказы, запрашивая их постранично
+        по мере необходимости
 
-        rep = self.__get(url)
-        rep.raise_for_status()
-        result = rep.json()
-        return result
+        :param string courier_id: Индетификатор курьера
+        :param string date_start: Дата и время доставки (с)
+        :param int page_size: Количество заказов, запрашиваемых за один запрос
+        :param bool prefetch: Запрашивать следующую страницу в фоне, пока обрабатывается текущая
+        :rtype: Iterator[OrderInfo]
+        """
+        def fetch(start):
+            return self.get_orders(start, page_size, courier_id, date_start)
+
+        for item in self.__iter_pages(fetch, 'orders', page_size, prefetch):
+            yield OrderInfo.from_dict(item)
 
     def create_order(self, order):
         """
@@ -148,10 +602,7 @@ class Client(object):
 
         :param Order order: Экземпляр заказа
         """
-        rep = self.__post('/api/shop/v2/orders', dict(order))
-        rep.raise_for_status()
-        result = rep.json()
-        return OrderInfo(**result)
+        return self.__request('POST', '/api/shop/v2/orders', order, parse=OrderInfo.from_dict)
 
     def update_order(self, oid, order):
         """
@@ -159,28 +610,24 @@ class Client(object):
         :param int oid: Идентификатор заказа
         :param Order order: Экземпляр заказа
         """
-        rep = self.__put('/api/shop/v2/orders/%s' % oid, dict(order))
-        rep.raise_for_status()
-        result = rep.json()
-        return OrderInfo(**result)
+        return self.__request('PUT', '/api/shop/v2/orders/%s' % oid, order,
+                              route='/api/shop/v2/orders/{oid}', parse=OrderInfo.from_dict)
 
     def get_order_info(self, oid):
         """
         Просмотр информации о заказе
         :param int oid: Идентификатор заказа
         """
-        rep = self.__get('/api/shop/v2/orders/%s' % oid)
-        rep.raise_for_status()
-        result = rep.json()
-        return OrderInfo(**result)
+        return self.__request('GET', '/api/shop/v2/orders/%s' % oid,
+                              route='/api/shop/v2/orders/{oid}', parse=OrderInfo.from_dict)
 
     def delete_order(self, oid):
         """
         Удаление заказа
         :param int oid: Идентификатор заказа
         """
-        rep = self.__delete('/api/shop/v2/orders/%s' % oid)
-        rep.raise_for_status()
+        self.__request('DELETE', '/api/shop/v2/orders/%s' % oid,
+                       route='/api/shop/v2/orders/{oid}', read_json=False)
         return True
 
     def get_employees(self, type=None, start='0', limit='10'):
@@ -190,24 +637,33 @@ class Client(object):
         :param string start: Начинать вывод сотрудников с start
         :param string limit: Ограничить вывод сотрудников на limit элементов
         """
-        url = '/api/shop/v2/employees?start=%s&limit=%s' % (start, limit)
-        if type:
-            url += '&type=%s' % type
+        return self.__request('GET', self._get_employees_path(type, start, limit),
+                              route='/api/shop/v2/employees')
 
-        rep = self.__get(url)
-        rep.raise_for_status()
-        result = rep.json()
-        return result
+    def iter_employees(self, type=None, page_size=DEFAULT_PAGE_SIZE, prefetch=False):
+        """
+        Последовательно возвращает всех сотрудников, запрашивая их постранично
+        по мере необходимости
+
+        :param EmployeeType type: Тип сотрудника
+        :param int page_size: Количество сотрудников, запрашиваемых за один запрос
+        :param bool prefetch: Запрашивать следующую страницу в фоне, пока обрабатывается текущая
+        :rtype: Iterator[EmployeeInfo]
+        """
+        def fetch(start):
+            return self.get_employees(type, start, page_size)
+
+        for item in self.__iter_pages(fetch, 'account_employees', page_size, prefetch):
+            yield EmployeeInfo.from_dict(item)
 
     def create_employee(self, employee):
         """
         Создание сотрудника
         :param Employee employee: Экземпляр сотрудника
         """
-        rep = self.__post('/api/shop/v2/employees', dict(employee))
-        rep.raise_for_status()
-        result = rep.json()
-        return EmployeeInfo(**result)
+        # Повторная отправка создаст еще одного сотрудника
+        return self.__request('POST', '/api/shop/v2/employees', dict(employee),
+                              parse=EmployeeInfo.from_dict, idempotent=False)
 
     def update_employee(self, eid, employee):
         """
@@ -215,79 +671,138 @@ class Client(object):
         :param int eid: Идентификатор сотрудника
         :param Employee employee: Экземпляр сотрудника
         """
-        rep = self.__put('/api/shop/v2/employees/%s' % eid, dict(employee))
-        rep.raise_for_status()
-        result = rep.json()
-        return EmployeeInfo(**result)
+        return self.__request('PUT', '/api/shop/v2/employees/%s' % eid, dict(employee),
+                              route='/api/shop/v2/employees/{eid}', parse=EmployeeInfo.from_dict)
 
     def get_employee_info(self, eid):
         """
         Просмотр информации о сотруднике
         :param int eid: Идентификатор сотрудника
         """
-        rep = self.__get('/api/shop/v2/employees/%s' % eid)
-        rep.raise_for_status()
-        result = rep.json()
-        return EmployeeInfo(**result)
+        return self.__request('GET', '/api/shop/v2/employees/%s' % eid,
+                              route='/api/shop/v2/employees/{eid}', parse=EmployeeInfo.from_dict)
 
     def delete_employee(self, eid):
         """
         Удаление сотрудника
         :param int eid: Идентификатор сотрудника
         """
-        rep = self.__delete('/api/shop/v2/employees/%s' % eid)
-        rep.raise_for_status()
+        self.__request('DELETE', '/api/shop/v2/employees/%s' % eid,
+                       route='/api/shop/v2/employees/{eid}', read_json=False)
         return True
 
-    def __handle_queue_id(self, qid):
-        if qid is None:
-            if self.__default_queue is None:
-                raise ValueError('Queue ID is not specified')
-            qid = self.__default_queue
-        return qid
-
-    def __get_url(self, path):
-        return '{}/{}'.format(self.__host, path.strip('/'))
-
-    def __get_signature(self, *args):
-        return hmac.new(self.__secret_key, ''.join(args).encode('utf-8'), hashlib.md5).hexdigest()
-
-    def __get(self, path):
-        url = self.__get_url(path)
-        headers = {
-            'Authorization': self.__shop_id,
-            'Accept': 'application/json',
-            'X-HMAC-Signature': self.__get_signature('GET', url)
-        }
-        return requests.get(url=url, headers=headers, allow_redirects=True)
-
-    def __post(self, path, data):
-        url = self.__get_url(path)
-        data = json_encode(data)
-        headers = {
-            'Authorization': self.__shop_id,
-            'Accept': 'application/json',
-            'Content-Type': 'application/json',
-            'X-HMAC-Signature': self.__get_signature('POST', url, data)
-        }
-        return requests.post(url=url, headers=headers, data=data)
-
-    def __put(self, path, data):
-        url = self.__get_url(path)
-        data = json_encode(data)
-        headers = {
-            'Authorization': self.__shop_id,
-            'Accept': 'application/json',
-            'Content-Type': 'application/json',
-            'X-HMAC-Signature': self.__get_signature('PUT', url, data)
-        }
-        return requests.put(url=url, headers=headers, data=data)
-
-    def __delete(self, path):
-        url = self.__get_url(path)
-        headers = {
-            'Authorization': self.__shop_id,
-            'Accept': 'application/json',
-            'X-HMAC-Signature': self.__get_signature('DELETE', url)
-        }
-        return requests.delete(url=url, headers=headers, allow_redirects=True)
+    @staticmethod
+    def __iter_pages(fetch, key, page_size, prefetch):
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            start = 0
+            page = fetch(start)
+            while True:
+                items = page.get(key) or []
+                total = (page.get('meta') or {}).get('total')
+                start += len(items)
+                # Сервер может вернуть меньше запрошенного limit, поэтому при известном
+                # total страницы запрашиваются до его достижения или до пустой страницы
+                if total is None:
+                    has_next = len(items) >= page_size
+                else:
+                    has_next = bool(items) and start < total
+                if has_next and executor is not None:
+                    next_page = executor.submit(fetch, start)
+
+                for item in items:
+                    yield item
+
+                if not has_next:
+                    return
+                page = next_page.result() if executor is not None else fetch(start)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def __get_session(self):
+        session = self.__session
+        if session is None:
+            with self.__session_lock:
+                session = self.__session
+                if session is None:
+                    session = self.__session = self.__create_session()
+        return session
+
+    def __create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.__pool_connections,
+                              pool_maxsize=self.__pool_maxsize,
+                              pool_block=self.__pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not self.__keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def __send(self, method, url, idempotent=True, **kwargs):
+        send = functools.partial(getattr(self.__get_session(), method), url=url,
+                                 timeout=self.__timeout, **kwargs)
+        if self.__rate_limiter is not None:
+            send = functools.partial(self.__limited_send, self.__rate_limiter, send)
+        if self.__circuit_breaker is not None:
+            send = functools.partial(self.__circuit_breaker.call, send)
+        if self.__retry_policy is None:
+            return send()
+        # При повторах используются те же подготовленные заголовки и тело запроса
+        return self.__retry_policy.call(send, idempotent)
+
+    @staticmethod
+    def __limited_send(rate_limiter, send):
+        rate_limiter.acquire()
+        return send()
+
+    def __request(self, method, path, data=None, route=None, parse=None, idempotent=True,
+                  read_json=True):
+        observer = self.__observer
+        if observer is not None:
+            return self.__observed_request(observer, method, path, data, route, parse,
+                                           idempotent, read_json)
+
+        url, headers, data = self._prepare_request(method, path, data)
+        rep = self.__send_request(method, url, headers, data, idempotent)
+        rep.raise_for_status()
+        if read_json:
+            result = rep.json()
+            return result if parse is None else parse(result)
+
+    def __observed_request(self, observer, method, path, data, route, parse, idempotent,
+                           read_json):
+        event = RequestEvent(method, route or path)
+        try:
+            url, headers, data = self._prepare_request(method, path, data, event)
+
+            started = perf_counter()
+            try:
+                rep = self.__send_request(method, url, headers, data, idempotent)
+            finally:
+                event.send = perf_counter() - started
+            event.status = rep.status_code
+
+            started = perf_counter()
+            try:
+                rep.raise_for_status()
+                if read_json:
+                    result = rep.json()
+                    return result if parse is None else parse(result)
+            finally:
+                event.parse = perf_counter() - started
+        except Exception as exc:
+            event.error = exc
+            raise
+        finally:
+            try:
+                observer(event)
+            except Exception:
+                logger.exception('Request observer failed')
+
+    def __send_request(self, method, url, headers, data, idempotent):
+        if data is None:
+            return self.__send(method.lower(), url, idempotent, headers=headers,
+                               allow_redirects=True)
+        return self.__send(method.lower(), url, idempotent, headers=headers, data=data)
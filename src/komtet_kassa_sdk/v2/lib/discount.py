@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Пакетное распределение скидок по позициям чеков и заказов.
+
+``apply_discounts`` распределяет скидки сразу по многим спискам позиций,
+выполняя расчет в целых копейках вместо операций с Decimal. Результат
+полностью совпадает с ``apply_discount``: доли скидки округляются до копеек
+так же, как в ``to_decimal``, а остаток скидки относится на последнюю позицию.
+
+Списки позиций, для которых совпадение при целочисленном расчете
+не гарантировано (суммы с долями копеек, смешение Decimal и float, скидка
+типа float, изменённый контекст decimal и т.д.), обрабатываются функцией
+``apply_discount``.
+
+Если установлен NumPy (``pip install komtet_kassa_sdk[numpy]``), арифметика
+для большого количества позиций выполняется векторно.
+"""
+import decimal
+from itertools import chain
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .helpers import apply_discount, to_decimal
+
+
+NUMPY_MIN_ITEMS = 2048
+"""Минимальное количество позиций, начиная с которого по умолчанию используется NumPy"""
+
+_CENT = decimal.Decimal('0.01')
+
+# Пока произведение скидки и суммы позиции в копейках меньше этой границы,
+# погрешность промежуточных операций Decimal в apply_discount (28 значащих цифр)
+# не может изменить результат округления, кроме случая ровно половины копейки
+_MAX_EXACT_PRODUCT = 10 ** 24
+_MAX_INT64 = 2 ** 63 - 1
+_MAX_EXACT_FLOAT = 2 ** 53
+
+_CENTS, _FLOATS = range(2)
+
+# На Python 2 деление целых сумм в apply_discount выполняется нацело
+_TRUE_DIVISION = 1 / 2 != 0
+
+
+if hasattr(decimal.Decimal, 'as_integer_ratio'):
+    def _decimal_to_cents(value):
+        # Копейки для Decimal не более чем с двумя знаками после запятой, иначе None
+        try:
+            numerator, denominator = value.as_integer_ratio()
+        except (ValueError, OverflowError):
+            return None
+        if 100 % denominator:
+            return None
+        return numerator * (100 // denominator)
+else:  # Python 2 и Python < 3.6
+    def _decimal_to_cents(value):
+        sign, digits, exponent = value.as_tuple()
+        if not isinstance(exponent, int):
+            # NaN и Infinity
+            return None
+        cents = int(''.join(map(str, digits)))
+        if exponent >= -2:
+            cents *= 10 ** (exponent + 2)
+        else:
+            cents, remainder = divmod(cents, 10 ** (-2 - exponent))
+            if remainder:
+                return None
+        return -cents if sign else cents
+
+
+def _float_to_cents(value):
+    # Копейки, как в to_decimal(value): Decimal(float) точно представляет
+    # двоичное значение, которое округляется до копеек, половина - к четному
+    if type(value) is int:
+        return value * 100
+    numerator, denominator = value.as_integer_ratio()
+    cents, remainder = divmod(numerator * 100, denominator)
+    remainder *= 2
+    if remainder > denominator or (remainder == denominator and cents % 2):
+        cents += 1
+    return cents
+
+
+def _is_exact_context():
+    context = decimal.getcontext()
+    return (context.rounding == decimal.ROUND_HALF_EVEN and context.prec >= 28 and
+            not context.traps[decimal.Inexact] and not context.traps[decimal.Rounded])
+
+
+class _Basket(object):
+    # Список позиций, подготовленный к расчету в копейках
+
+    __slots__ = ('items', 'kind', 'discount', 'discount_cents', 'totals', 'totals_cents',
+                 'items_total', 'vectorizable')
+
+    def __init__(self, items, kind, discount, discount_cents, totals, totals_cents,
+                 items_total, vectorizable):
+        self.items = items
+        self.kind = kind
+        self.discount = discount
+        self.discount_cents = discount_cents
+        self.totals = totals
+        self.totals_cents = totals_cents
+        self.items_total = items_total
+        self.vectorizable = vectorizable
+
+    def get_exact_share(self, index):
+        # Доля скидки, посчитанная так же, как в apply_discount
+        total = self.totals[index]
+        if self.kind == _CENTS:
+            # Значение совпадает с суммой позиций в apply_discount
+            items_total = decimal.Decimal(self.items_total) * _CENT
+            return _decimal_to_cents(to_decimal(self.discount * (total / items_total * 100) / 100))
+        return _float_to_cents(self.discount * (total / self.items_total * 100) / 100)
+
+    def get_shares(self):
+        # Доли скидки всех позиций, кроме последней, в копейках
+        discount = self.discount
+        if self.kind == _FLOATS:
+            items_total = self.items_total
+            return [_float_to_cents(discount * (total / items_total * 100) / 100)
+                    for total in self.totals[:-1]]
+
+        discount_cents = self.discount_cents
+        items_total = self.items_total
+        shares = []
+        for index, total in enumerate(self.totals_cents[:-1]):
+            share, remainder = divmod(discount_cents * total, items_total)
+            remainder *= 2
+            if remainder == items_total:
+                share = self.get_exact_share(index)
+            elif remainder > items_total:
+                share += 1
+            shares.append(share)
+        return shares
+
+    def apply(self, shares):
+        last_share = self.discount_cents - sum(shares)
+        shares.append(last_share)
+        cent = _CENT
+        for item, total, share in zip(self.items, self.totals_cents, shares):
+            item['total'] = decimal.Decimal(total - share) * cent
+
+
+def _prepare(discount, items):
+    # Возвращает _Basket или None, если совпадение с apply_discount не гарантировано
+    if len(items) < 2 or type(discount) not in (int, decimal.Decimal):
+        return None
+    # Повторно добавленная позиция в apply_discount изменяется дважды
+    if len(set(map(id, items))) != len(items):
+        return None
+    totals = [item['total'] for item in items]
+    total_types = set(map(type, totals))
+
+    if total_types == {decimal.Decimal}:
+        totals_cents = [_decimal_to_cents(total) for total in totals]
+        if None in totals_cents:
+            return None
+        if type(discount) is int:
+            discount_cents = discount * 100
+        else:
+            discount_cents = _decimal_to_cents(discount)
+            if discount_cents is None:
+                return None
+        items_total = sum(totals_cents)
+        if items_total <= 0:
+            return None
+        product = abs(discount_cents) * max(max(totals_cents), -min(totals_cents))
+        if product >= _MAX_EXACT_PRODUCT:
+            return None
+        return _Basket(items, _CENTS, discount, discount_cents, totals, totals_cents,
+                       items_total, product <= _MAX_INT64 // 2 and items_total <= _MAX_INT64 // 4)
+
+    if type(discount) is int and total_types <= {int, float}:
+        items_total = sum(totals)
+        if not items_total or items_total != items_total or abs(items_total) == float('inf'):
+            return None
+        if not _TRUE_DIVISION and type(items_total) is int:
+            return None
+        totals_cents = [_float_to_cents(total) for total in totals]
+        limit = _MAX_EXACT_FLOAT
+        vectorizable = (abs(discount) < limit and abs(items_total) < limit and
+                        all(abs(total) < limit for total in totals))
+        return _Basket(items, _FLOATS, discount, discount * 100, totals, totals_cents,
+                       items_total, vectorizable)
+
+    return None
+
+
+def _get_numpy_shares(baskets, kind):
+    # Доли скидки всех позиций, кроме последней, для списков одного вида
+    counts = [len(basket.totals) - 1 for basket in baskets]
+    if kind == _CENTS:
+        totals = numpy.fromiter(chain.from_iterable(basket.totals_cents[:-1]
+                                                    for basket in baskets),
+                                numpy.int64, sum(counts))
+        discounts = numpy.repeat(numpy.array([basket.discount_cents for basket in baskets],
+                                             numpy.int64), counts)
+        items_totals = numpy.repeat(numpy.array([basket.items_total for basket in baskets],
+                                                numpy.int64), counts)
+        shares, remainders = numpy.divmod(discounts * totals, items_totals)
+        remainders *= 2
+        shares += remainders > items_totals
+        inexact = numpy.flatnonzero(remainders == items_totals)
+    else:
+        totals = numpy.fromiter(chain.from_iterable(basket.totals[:-1] for basket in baskets),
+                                numpy.float64, sum(counts))
+        discounts = numpy.repeat(numpy.array([basket.discount for basket in baskets],
+                                             numpy.float64), counts)
+        items_totals = numpy.repeat(numpy.array([basket.items_total for basket in baskets],
+                                                numpy.float64), counts)
+        # Те же операции с float64, что и в apply_discount, дают те же значения
+        values = discounts * (totals / items_totals * 100) / 100
+        scaled = values * 100
+        shares = numpy.rint(scaled)
+        # Значение, близкое к половине копейки, округляется точно
+        inexact = numpy.flatnonzero(
+            numpy.abs(numpy.abs(scaled - shares) - 0.5) <= 1e-12 * (1 + numpy.abs(scaled)))
+        shares = shares.astype(numpy.int64)
+
+    shares = shares.tolist()
+    if len(inexact):
+        owners = numpy.repeat(numpy.arange(len(baskets)), counts)
+        offsets = numpy.cumsum([0] + counts)
+        for position in inexact.tolist():
+            owner = int(owners[position])
+            shares[position] = baskets[owner].get_exact_share(position - int(offsets[owner]))
+
+    result = []
+    start = 0
+    for count in counts:
+        result.append(shares[start:start + count])
+        start += count
+    return result
+
+
+def apply_discounts(discounts, baskets, use_numpy=None):
+    """
+    Распределяет скидки по позициям нескольких чеков или заказов.
+
+    Для каждой пары скидки и списка позиций результат совпадает с
+    ``apply_discount(discount, items)``. Списки не должны содержать общих позиций.
+
+    :param list discounts: Суммы скидок
+    :param list baskets: Списки позиций, по одному на каждую скидку
+    :param bool use_numpy: Использовать NumPy (по умолчанию - если он установлен
+                           и количество позиций не меньше ``NUMPY_MIN_ITEMS``)
+    """
+    discounts = list(discounts)
+    baskets = list(baskets)
+    if len(discounts) != len(baskets):
+        raise ValueError('Expected %d baskets, got %d' % (len(discounts), len(baskets)))
+    if use_numpy and numpy is None:
+        raise ImportError('use_numpy requires numpy: pip install numpy')
+
+    exact = _is_exact_context()
+    prepared = []
+    for discount, items in zip(discounts, baskets):
+        basket = _prepare(discount, items) if exact else None
+        if basket is None:
+            apply_discount(discount, items)
+        else:
+            prepared.append(basket)
+
+    if use_numpy is None:
+        use_numpy = (numpy is not None and
+                     sum(len(basket.items) for basket in prepared) >= NUMPY_MIN_ITEMS)
+
+    vectorized = {_CENTS: [], _FLOATS: []}
+    for basket in prepared:
+        if use_numpy and basket.vectorizable:
+            vectorized[basket.kind].append(basket)
+        else:
+            basket.apply(basket.get_shares())
+
+    for kind, group in vectorized.items():
+        if group:
+            for basket, shares in zip(group, _get_numpy_shares(group, kind)):
+                basket.apply(shares)
@@ -1,17 +1,61 @@
 # -*- coding: utf-8 -*-
 import decimal
 
+from .money import Money
+
+
+_CENTS = decimal.Decimal('.00')
+
 
 def to_decimal(value, rounding='.00'):
-    return decimal.Decimal(value).quantize(decimal.Decimal(rounding))
+    if isinstance(value, Money):
+        value = value.to_decimal()
+    elif type(value) is not decimal.Decimal:
+        value = decimal.Decimal(value)
+    return value.quantize(_CENTS if rounding == '.00' else decimal.Decimal(rounding))
+
+
+def distribute_kopecks(discount, totals):
+    """
+    Распределяет скидку пропорционально суммам позиций, все суммы в копейках.
+
+    Доли округляются до копейки (половина - к четному), остаток скидки
+    относится на последнюю позицию.
+
+    :param int discount: сумма скидки
+    :param list totals: суммы позиций
+    :return: список долей скидки
+    """
+    items_total = sum(totals)
+    shares = []
+    for total in totals[:-1]:
+        share, remainder = divmod(discount * total, items_total)
+        remainder *= 2
+        if remainder > items_total or (remainder == items_total and share % 2):
+            share += 1
+        shares.append(share)
+    if totals:
+        shares.append(discount - sum(shares))
+    return shares
 
 
 def apply_discount(discount, items):
     """
-    :param int|float discount: сумма скидки
+    Суммы позиций ``Money`` и скидка ``Money`` распределяются в целых копейках,
+    результат - суммы ``Money``.
+
+    :param int|float|Money discount: сумма скидки
     :param list items: список позиций
     """
-    items_total = sum(item['total'] for item in items)
+    totals = [item['total'] for item in items]
+    if isinstance(discount, Money) or any(type(total) is Money for total in totals):
+        totals = [Money.from_value(total).kopecks for total in totals]
+        shares = distribute_kopecks(Money.from_value(discount).kopecks, totals)
+        for item, total, share in zip(items, totals, shares):
+            item['total'] = Money(total - share)
+        return
+
+    items_total = sum(totals)
 
     items_count = len(items)
     accumulated_discount = 0
@@ -27,47 +71,90 @@ def apply_discount(discount, items):
         item['total'] = to_decimal(item['total']) - cur_item_discount
 
 
-def correction_positions(items):
+def correct_positions(items):
     """
-    Кооректировка позиций
+    Корректировка позиций на месте
 
-    :param list items: список позиций
-    """
+    Позиция с количеством больше 1, стоимость которой не равна price * quantity,
+    разделяется на две: позицию с количеством 1, на которую относится
+    расхождение, и позицию с остальным количеством. Количество и стоимость
+    остальных позиций приводятся к Decimal (суммы Money остаются Money).
 
-    def update_item(item, data):
-        """
-        Обновление позиции
+    Позиции изменяются на месте, копируются только выделяемые позиции и
+    позиции, которые встречаются в списке несколько раз.
 
-        :param dict item: позиция в чеке|заказе
-        :param dict data: данные для обновления
-        """
-        item.update(data)
-        return item
+    :param list items: список позиций, заменяется скорректированным
+    :return: индексы разделенных позиций в исходном списке
+    :rtype: list
+    """
+    Decimal = decimal.Decimal
+    ids = [id(item) for item in items]
+    repeated = set()
+    if len(set(ids)) != len(ids):
+        seen = set()
+        for item_id in ids:
+            if item_id in seen:
+                repeated.add(item_id)
+            seen.add(item_id)
 
     new_items = []
+    split = []
 
-    for item in items:
-        quantity = decimal.Decimal(item['quantity'])
-        price = decimal.Decimal(item['price'])
-        total = decimal.Decimal(item['total'])
-
-        has_extra_position = (total != price * quantity) and quantity > 1
-        base_position_total = total
+    for index, item in enumerate(items):
+        if repeated and id(item) in repeated:
+            item = item.copy()
+
+        quantity = item['quantity']
+        if type(quantity) is not Decimal:
+            quantity = Decimal(quantity)
+        price = item['price']
+        total = item['total']
+
+        if type(price) is Money or type(total) is Money:
+            # Расчет в копейках, суммы остаются Money
+            price = Money.from_value(price)
+            total = Money.from_value(total)
+            has_extra_position = quantity > 1 and total.kopecks != price.kopecks * quantity
+        else:
+            if type(price) is not Decimal:
+                price = Decimal(price)
+            if type(total) is not Decimal:
+                total = Decimal(total)
+            has_extra_position = quantity > 1 and total != price * quantity
 
         if has_extra_position:
             quantity -= 1
-            base_position_total = to_decimal(price * quantity)
+            if type(price) is Money:
+                base_position_total = price * quantity
+            else:
+                base_position_total = to_decimal(price * quantity)
             price = total - base_position_total
 
-            new_items.append(update_item(item.copy(), {
-                'price': price,
-                'quantity': 1,
-                'total': price
-            }))
+            extra_item = item.copy()
+            extra_item['price'] = price
+            extra_item['quantity'] = 1
+            extra_item['total'] = price
+            new_items.append(extra_item)
+            split.append(index)
+            total = base_position_total
+
+        item['quantity'] = quantity
+        item['total'] = total
+        new_items.append(item)
+
+    items[:] = new_items
+    return split
 
-        new_items.append(update_item(item.copy(), {
-            'quantity': quantity,
-            'total': base_position_total
-        }))
 
+def correction_positions(items):
+    """
+    Кооректировка позиций
+
+    Исходные позиции не изменяются, см. ``correct_positions``
+
+    :param list items: список позиций
+    :return: новый список позиций
+    """
+    new_items = [item.copy() for item in items]
+    correct_positions(new_items)
     return new_items
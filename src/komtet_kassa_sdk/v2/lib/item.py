@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+_REQUIRED, _OPTIONAL, _EXTRA = range(3)
+
+# Порядок дополнительных ключей одинаков у большинства позиций, поэтому
+# кортежи с порядком ключей хранятся в одном экземпляре и используются совместно
+_KEY_ORDERS = {}
+_KEY_ORDERS_LIMIT = 1024
+
+
+def _append_key(keys, key):
+    keys = keys + (key,)
+    if len(_KEY_ORDERS) >= _KEY_ORDERS_LIMIT:
+        return _KEY_ORDERS.get(keys, keys)
+    return _KEY_ORDERS.setdefault(keys, keys)
+
+
+def get_field_kinds(fields, required, extra_fields):
+    """
+    Возвращает словарь ``{ключ: вид поля}`` для ``BaseItem._kinds``
+
+    :param tuple fields: Поля, сериализуемые первыми, в порядке сериализации
+    :param int required: Количество первых полей, которые передаются даже со значением None
+    :param tuple extra_fields: Остальные ключи, для которых выделяются ``__slots__``
+    """
+    kinds = dict.fromkeys(extra_fields, _EXTRA)
+    kinds.update(dict.fromkeys(fields[required:], _OPTIONAL))
+    kinds.update(dict.fromkeys(fields[:required], _REQUIRED))
+    return kinds
+
+
+class BaseItem(object):
+    """
+    Компактное представление позиции чека или заказа.
+
+    Часто используемые реквизиты позиции хранятся в ``__slots__``, редкие - в словаре,
+    который создается только при необходимости. Позиция поддерживает чтение
+    и изменение как словарь, а итерация, как и раньше, возвращает пары
+    ``(ключ, значение)`` в том же порядке, что и прежнее словарное представление,
+    поэтому ``dict(item)`` и сериализация не изменились: сначала поля ``_fields``
+    (необязательные - только если они не None), затем остальные реквизиты
+    в порядке их установки.
+
+    Как и в словаре, необязательное поле, которому явно присвоено None
+    (``item['id'] = None``), сохраняется и передается значением null.
+    """
+
+    __slots__ = ('_keys', '_extra')
+
+    _fields = ()
+    """Поля, хранящиеся в ``__slots__`` и сериализуемые первыми"""
+
+    _required = 0
+    """Количество первых полей ``_fields``, которые передаются даже со значением None"""
+
+    _kinds = {}
+    """Виды полей, см. ``get_field_kinds``"""
+
+    def __init__(self):
+        self._keys = ()
+        self._extra = None
+
+    def __iter__(self):
+        fields = self._fields
+        required = self._required
+        for field in fields[:required]:
+            yield field, getattr(self, field)
+        for field in fields[required:]:
+            value = getattr(self, field)
+            if value is not None:
+                yield field, value
+        for key in self._keys:
+            yield key, self.__get_extra(key)
+
+    def __getitem__(self, key):
+        kind = self._kinds.get(key)
+        if kind == _REQUIRED:
+            return getattr(self, key)
+        if kind == _OPTIONAL:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        if key in self._keys:
+            return self.__get_extra(key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        kind = self._kinds.get(key)
+        if kind == _REQUIRED:
+            setattr(self, key, value)
+            return
+        if kind == _OPTIONAL:
+            setattr(self, key, value)
+            if value is not None:
+                if key in self._keys:
+                    self.__discard_extra(key)
+                return
+            # Явно присвоенное None хранится среди остальных реквизитов
+
+        if key not in self._keys:
+            self._keys = _append_key(self._keys, key)
+        if kind == _EXTRA:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __contains__(self, key):
+        kind = self._kinds.get(key)
+        if kind == _REQUIRED:
+            return True
+        if kind == _OPTIONAL and getattr(self, key) is not None:
+            return True
+        return key in self._keys
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __eq__(self, other):
+        if isinstance(other, (BaseItem, dict)):
+            return dict(self) == dict(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, dict(self))
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return [key for key, _ in self]
+
+    def items(self):
+        return list(self)
+
+    def update(self, data):
+        for key, value in dict(data).items():
+            self[key] = value
+
+    def _asdict(self):
+        # dict(self) обращается к keys() и __getitem__, пары из __iter__ быстрее
+        return dict(iter(self))
+
+    def copy(self):
+        item = type(self).__new__(type(self))
+        for field in self._fields:
+            setattr(item, field, getattr(self, field))
+        for key in self._keys:
+            if self._kinds.get(key) == _EXTRA:
+                setattr(item, key, getattr(self, key))
+        item._keys = self._keys
+        item._extra = dict(self._extra) if self._extra else None
+        return item
+
+    def __discard_extra(self, key):
+        self._keys = tuple(other for other in self._keys if other != key)
+        del self._extra[key]
+
+    def __get_extra(self, key):
+        if self._kinds.get(key) == _EXTRA:
+            return getattr(self, key)
+        return self._extra[key]
+
+
+def get_item_dicts(items):
+    """
+    Возвращает копии позиций списка в виде словарей
+
+    :param list items: Позиции ``BaseItem`` или словари
+    :rtype: list
+    """
+    return [item._asdict() if isinstance(item, BaseItem) else dict(item) for item in items]
+
+
+def own_items(items, owned):
+    """
+    Заменяет копиями позиции, которые не принадлежат документу или встречаются
+    в списке несколько раз. Вызывается перед изменением позиций документа, чтобы
+    не изменять объекты, переданные также в другие чеки и заказы.
+
+    :param list items: Позиции документа, изменяется на месте
+    :param dict owned: Позиции, принадлежащие документу, ``{id(позиция): позиция}``
+    :return: позиции, принадлежащие документу после замены
+    :rtype: dict
+    """
+    result = {}
+    for index, item in enumerate(items):
+        if id(item) in result or owned.get(id(item)) is not item:
+            item = items[index] = item.copy()
+        result[id(item)] = item
+    return result
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import decimal
+import functools
+
+
+_CENT = decimal.Decimal('0.01')
+_ONE = decimal.Decimal(1)
+
+try:
+    _INTEGER_TYPES = (int, long)
+except NameError:  # Python 3
+    _INTEGER_TYPES = (int,)
+_NUMBER_TYPES = _INTEGER_TYPES + (float, decimal.Decimal)
+
+
+def _to_kopecks(value):
+    # Сумма в рублях -> копейки, округление как в to_decimal (половина - к четному)
+    value = decimal.Decimal(value).quantize(_CENT, rounding=decimal.ROUND_HALF_EVEN)
+    return int(value.scaleb(2))
+
+
+@functools.total_ordering
+class Money(object):
+    """
+    Денежная сумма в целых копейках.
+
+    Сложение, вычитание и умножение на целое количество выполняются в целых
+    числах, без операций с Decimal. ``Money`` принимается везде, где SDK ожидает
+    сумму: цена и стоимость ``Position`` и ``OrderItem``, ``Check.add_payment``,
+    ``apply_discount``, ``correction_positions`` и т.д. В запросе сумма
+    записывается десятичным числом: ``Money(1050)`` - как ``10.5``, а при
+    ``exact_decimal=True`` - как ``10.50``.
+
+    Значение неизменяемо: арифметические операции возвращают новый объект.
+
+    :param int kopecks: Сумма в копейках
+    """
+
+    __slots__ = ('kopecks',)
+
+    def __init__(self, kopecks):
+        if type(kopecks) not in _INTEGER_TYPES:
+            raise TypeError('kopecks must be int, not %s' % type(kopecks).__name__)
+        self.kopecks = kopecks
+
+    @classmethod
+    def from_value(cls, value):
+        """
+        Создает сумму из значения в рублях, округляя его до копеек так же,
+        как ``to_decimal`` (половина - к четному)
+
+        :param int|float|Decimal|str|Money value: Сумма в рублях
+        :rtype: Money
+        """
+        if isinstance(value, Money):
+            return value
+        if type(value) in _INTEGER_TYPES:
+            return cls(value * 100)
+        return cls(_to_kopecks(value))
+
+    def to_decimal(self):
+        """
+        Сумма в рублях с двумя знаками после запятой
+
+        :rtype: Decimal
+        """
+        return decimal.Decimal(self.kopecks) * _CENT
+
+    def __str__(self):
+        if self.kopecks < 0:
+            return '-%d.%02d' % divmod(-self.kopecks, 100)
+        return '%d.%02d' % divmod(self.kopecks, 100)
+
+    def __repr__(self):
+        return 'Money(%d)' % self.kopecks
+
+    def __float__(self):
+        return self.kopecks / 100.0
+
+    def __bool__(self):
+        return self.kopecks != 0
+
+    __nonzero__ = __bool__
+
+    def __hash__(self):
+        return hash(self.to_decimal())
+
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.kopecks == other.kopecks
+        if isinstance(other, _NUMBER_TYPES):
+            return self.to_decimal() == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.kopecks < other.kopecks
+        if isinstance(other, _NUMBER_TYPES):
+            return self.to_decimal() < other
+        return NotImplemented
+
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money(self.kopecks + other.kopecks)
+        return NotImplemented
+
+    def __radd__(self, other):
+        # sum() начинает с 0
+        if type(other) is int and other == 0:
+            return self
+        return NotImplemented
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money(self.kopecks - other.kopecks)
+        return NotImplemented
+
+    def __neg__(self):
+        return Money(-self.kopecks)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Money(abs(self.kopecks))
+
+    def __mul__(self, quantity):
+        """
+        Стоимость ``quantity`` единиц, округленная до копеек (половина - к четному)
+
+        :param int|float|Decimal quantity: Количество
+        """
+        if type(quantity) in _INTEGER_TYPES:
+            return Money(self.kopecks * quantity)
+        if isinstance(quantity, _NUMBER_TYPES):
+            value = decimal.Decimal(self.kopecks) * decimal.Decimal(quantity)
+            return Money(int(value.quantize(_ONE, rounding=decimal.ROUND_HALF_EVEN)))
+        return NotImplemented
+
+    __rmul__ = __mul__
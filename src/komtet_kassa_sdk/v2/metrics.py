@@ -0,0 +1,334 @@
+# coding: utf-8
+import math
+import threading
+
+
+# Логарифмически-линейные корзины: каждая степень двойки (в микросекундах) делится
+# на 32 равные части, значения до 64 мкс хранятся с точностью до микросекунды.
+# Ширина корзины не превышает 1/32 ее нижней границы, поэтому квантиль
+# вычисляется с относительной погрешностью не более 1.6%
+_SUB_BUCKET_BITS = 5
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+_MAX_VALUE = (1 << 31) - 1
+_BUCKETS = (_MAX_VALUE.bit_length() - _SUB_BUCKET_BITS) * _SUB_BUCKETS + _SUB_BUCKETS
+
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+DEFAULT_PREFIX = 'komtet_kassa'
+
+
+def _get_bucket(value):
+    if value > _MAX_VALUE:
+        value = _MAX_VALUE
+    shift = value.bit_length() - _SUB_BUCKET_BITS - 1
+    if shift <= 0:
+        return value if value > 0 else 0
+    return (shift << _SUB_BUCKET_BITS) + (value >> shift)
+
+
+def _get_bucket_bounds(bucket):
+    # Границы корзины [lower, upper) в микросекундах
+    shift = max(bucket // _SUB_BUCKETS - 1, 0)
+    lower = (bucket - (shift << _SUB_BUCKET_BITS)) << shift
+    return lower, lower + (1 << shift)
+
+
+class LatencyHistogram(object):
+    """
+    Гистограмма длительностей с фиксированным объемом памяти.
+
+    Длительности от 1 мкс до 35 минут распределяются по 864 логарифмически-линейным
+    корзинам (большие значения попадают в последнюю корзину), поэтому память
+    не зависит от количества измерений, а гистограммы складываются поэлементно.
+    Квантили вычисляются с относительной погрешностью не более 1.6%.
+
+    Гистограмма не защищена блокировкой: одновременно записывать в нее
+    должен только один поток.
+    """
+
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, seconds):
+        """
+        :param float seconds: Длительность, сек
+        """
+        self.counts[_get_bucket(int(seconds * 1000000))] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def merge(self, other):
+        """
+        Добавляет к гистограмме измерения другой гистограммы
+
+        :param LatencyHistogram other: Гистограмма
+        """
+        self.counts = [count + other_count
+                       for count, other_count in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        return self
+
+    def copy(self):
+        histogram = LatencyHistogram()
+        return histogram.merge(self)
+
+    def quantile(self, q):
+        """
+        Возвращает квантиль длительности, сек (None, если измерений нет)
+
+        :param float q: Уровень квантиля от 0 до 1, например 0.99
+        """
+        if not 0 <= q <= 1:
+            raise ValueError('Quantile must be between 0 and 1')
+        if not self.count:
+            return None
+
+        rank = max(int(math.ceil(q * self.count)), 1)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                lower, upper = _get_bucket_bounds(bucket)
+                return (lower + upper) / 2000000.0
+
+
+class RouteMetrics(object):
+    """
+    Измерения запросов одного маршрута: гистограмма длительностей и счетчики.
+
+    - ``histogram`` - ``LatencyHistogram`` полной длительности запросов
+    - ``successes`` - количество успешных запросов
+    - ``errors`` - количество запросов, завершившихся исключением
+    - ``statuses`` - количество ответов по кодам: ``{200: 10, 503: 1}``
+      (запросы без ответа сервера учитываются с кодом None)
+    """
+
+    __slots__ = ('histogram', 'successes', 'errors', 'statuses')
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.successes = 0
+        self.errors = 0
+        self.statuses = {}
+
+    def record(self, event):
+        self.histogram.record(event.total)
+        if event.error is None:
+            self.successes += 1
+        else:
+            self.errors += 1
+        self.statuses[event.status] = self.statuses.get(event.status, 0) + 1
+
+    def merge(self, other):
+        """
+        :param RouteMetrics other: Измерения того же маршрута
+        """
+        self.histogram.merge(other.histogram)
+        self.successes += other.successes
+        self.errors += other.errors
+        for status, count in list(other.statuses.items()):
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        return self
+
+    def copy(self):
+        return RouteMetrics().merge(self)
+
+    def quantile(self, q):
+        """
+        Квантиль длительности запросов, сек
+
+        :param float q: Уровень квантиля от 0 до 1
+        """
+        return self.histogram.quantile(q)
+
+
+class RequestMetrics(object):
+    """
+    Метрики запросов клиента по маршрутам API: гистограммы длительностей
+    и счетчики успешных запросов, ошибок и кодов ответа.
+
+    Экземпляр - наблюдатель для ``Client.set_observer``; один экземпляр можно
+    установить нескольким клиентам. Маршрут - это HTTP-метод и шаблон пути
+    запроса (``RequestEvent.route``), например ``POST /api/shop/v2/queues/{qid}/task``.
+
+    Каждый поток записывает измерения в собственный набор гистограмм, поэтому запись
+    выполняется без блокировок. Наборы потоков складываются при чтении метрик;
+    наборы завершившихся потоков объединяются в общий.
+
+    :param tuple quantiles: Квантили, выводимые методом ``render``
+    """
+
+    def __init__(self, quantiles=DEFAULT_QUANTILES):
+        self.quantiles = quantiles
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__shards = []
+        self.__retired = {}
+
+    def __call__(self, event):
+        try:
+            routes = self.__local.routes
+        except AttributeError:
+            routes = self.__add_shard()
+
+        key = (event.method, event.route)
+        route = routes.get(key)
+        if route is None:
+            route = routes[key] = RouteMetrics()
+        route.record(event)
+
+    def get_routes(self):
+        """
+        Возвращает копию измерений всех потоков по маршрутам
+
+        :rtype: dict[tuple, RouteMetrics]
+        :return: ``{(method, route): RouteMetrics}``
+        """
+        with self.__lock:
+            self.__retire_shards()
+            result = {key: route.copy() for key, route in self.__retired.items()}
+            shards = [routes for _, routes in self.__shards]
+
+        for routes in shards:
+            # Набор потока изменяется только самим потоком, при чтении копируется список ключей
+            for key, route in list(routes.items()):
+                if key in result:
+                    result[key].merge(route)
+                else:
+                    result[key] = route.copy()
+        return result
+
+    def get_route(self, route, method=None):
+        """
+        Возвращает измерения маршрута, объединенные по всем HTTP-методам,
+        если метод не указан
+
+        :param str route: Шаблон пути, например ``/api/shop/v2/orders/{oid}``
+        :param str method: HTTP-метод
+        :rtype: RouteMetrics
+        """
+        result = RouteMetrics()
+        for (route_method, route_path), metrics in self.get_routes().items():
+            if route_path == route and (method is None or route_method == method):
+                result.merge(metrics)
+        return result
+
+    def quantile(self, route, q, method=None):
+        """
+        Квантиль длительности запросов маршрута, сек (None, если запросов не было)
+
+        :param str route: Шаблон пути
+        :param float q: Уровень квантиля от 0 до 1, например 0.95
+        :param str method: HTTP-метод
+        """
+        return self.get_route(route, method).quantile(q)
+
+    def merge(self, other):
+        """
+        Добавляет измерения другого экземпляра, например чтобы вывести
+        метрики нескольких клиентов одним снимком
+
+        :param RequestMetrics other: Метрики
+        """
+        routes = other.get_routes()
+        with self.__lock:
+            for key, route in routes.items():
+                if key in self.__retired:
+                    self.__retired[key].merge(route)
+                else:
+                    self.__retired[key] = route
+        return self
+
+    def reset(self):
+        """Удаляет все измерения"""
+        with self.__lock:
+            self.__local = threading.local()
+            self.__shards = []
+            self.__retired = {}
+
+    def render(self, prefix=DEFAULT_PREFIX):
+        """
+        Возвращает снимок метрик в текстовом формате Prometheus:
+
+        - ``<prefix>_requests_total{method, route, status}`` - количество ответов по кодам
+          (``status="none"`` - ответ не получен)
+        - ``<prefix>_request_errors_total{method, route}`` - количество запросов,
+          завершившихся исключением
+        - ``<prefix>_request_duration_seconds{method, route, quantile}`` - квантили
+          длительности запросов, а также ``_sum`` и ``_count``
+
+        :param str prefix: Префикс имен метрик
+        :rtype: str
+        """
+        routes = sorted(self.get_routes().items())
+        lines = [
+            '# HELP %s_requests_total Komtet Kassa API requests by response status.' % prefix,
+            '# TYPE %s_requests_total counter' % prefix,
+        ]
+        for key, route in routes:
+            for status, count in sorted(route.statuses.items(), key=lambda item: str(item[0])):
+                lines.append('%s_requests_total{%s,status="%s"} %d' % (
+                    prefix, _get_labels(key), 'none' if status is None else status, count))
+
+        lines.extend([
+            '# HELP %s_request_errors_total Komtet Kassa API requests failed with an '
+            'exception.' % prefix,
+            '# TYPE %s_request_errors_total counter' % prefix,
+        ])
+        for key, route in routes:
+            lines.append('%s_request_errors_total{%s} %d' % (
+                prefix, _get_labels(key), route.errors))
+
+        lines.extend([
+            '# HELP %s_request_duration_seconds Komtet Kassa API request duration.' % prefix,
+            '# TYPE %s_request_duration_seconds summary' % prefix,
+        ])
+        for key, route in routes:
+            labels = _get_labels(key)
+            for q in self.quantiles:
+                lines.append('%s_request_duration_seconds{%s,quantile="%s"} %s' % (
+                    prefix, labels, _format_value(q), _format_value(route.quantile(q))))
+            lines.append('%s_request_duration_seconds_sum{%s} %s' % (
+                prefix, labels, _format_value(route.histogram.sum)))
+            lines.append('%s_request_duration_seconds_count{%s} %d' % (
+                prefix, labels, route.histogram.count))
+        return '\n'.join(lines) + '\n'
+
+    def __add_shard(self):
+        routes = self.__local.routes = {}
+        with self.__lock:
+            self.__retire_shards()
+            self.__shards.append((threading.current_thread(), routes))
+        return routes
+
+    def __retire_shards(self):
+        # Наборы завершившихся потоков больше не изменяются: они переносятся в общий набор,
+        # чтобы количество наборов не росло при создании новых потоков
+        shards = []
+        for thread, routes in self.__shards:
+            if thread.is_alive():
+                shards.append((thread, routes))
+                continue
+            for key, route in routes.items():
+                if key in self.__retired:
+                    self.__retired[key].merge(route)
+                else:
+                    self.__retired[key] = route
+        self.__shards = shards
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _get_labels(key):
+    method, route = key
+    return 'method="%s",route="%s"' % (_escape(method), _escape(route))
+
+
+def _format_value(value):
+    return repr(float(value))
@@ -1,5 +1,7 @@
 # coding: utf-8
-from komtet_kassa_sdk.v2.lib.helpers import apply_discount, correction_positions
+from komtet_kassa_sdk.v2.lib.discount import apply_discounts
+from komtet_kassa_sdk.v2.lib.helpers import correct_positions
+from komtet_kassa_sdk.v2.lib.item import BaseItem, get_field_kinds, get_item_dicts, own_items
 
 from . import PaymentType, VatRate
 
@@ -26,14 +28,24 @@ class Order(object):
 
         if state:
             self.__data['state'] = state
+        # Позиции, скопированные заказом перед изменением, см. own_items
+        self.__owned = {}
 
     def __iter__(self):
-        for item in self.__data.items():
-            yield item
+        # Позиции хранятся объектами, dict(order) по-прежнему содержит словари
+        for key, value in self.__data.items():
+            if key == 'items':
+                value = get_item_dicts(value)
+            yield key, value
 
     def __getitem__(self, item):
         return self.__data[item]
 
+    def _asdict(self):
+        # Данные без копирования: сериализаторы записывают их напрямую,
+        # позиции материализуются только при записи
+        return self.__data
+
     def set_company(self, payment_address, tax_system, inn=None, place_address=None):
         """
         :param str payment_address: Платёжный адрес компании
@@ -159,108 +171,117 @@ class Order(object):
 
     def apply_discount(self, discount):
         """
-        :param int|float discount: сумма скидки
+        :param int|float|Money discount: сумма скидки
         """
-        apply_discount(discount, self.__data['items'])
+        items = self.__data['items']
+        self.__owned = own_items(items, self.__owned)
+        apply_discounts([discount], [items])
 
     def apply_correction_positions(self):
         """
         Кооректировка позиций с расхождениями между price * quantity и total
+
+        Позиции корректируются на месте, см. ``correct_positions``; позиции,
+        добавленные извне или несколько раз, предварительно заменяются копиями
+
+        :return: индексы разделенных позиций
+        :rtype: list
         """
-        self.__data['items'] = correction_positions(self.__data['items'])
+        items = self.__data['items']
+        self.__owned = own_items(items, self.__owned)
+        split = correct_positions(items)
+        # Выделенные позиции - новые копии, они также принадлежат заказу
+        self.__owned = dict((id(item), item) for item in items)
+        return split
 
     def add_item(self, item):
         """
+        Позиция добавляется без копирования. ``apply_discount`` и
+        ``apply_correction_positions`` перед первым изменением заменяют ее копией,
+        поэтому исходная позиция и другие заказы с ней не изменяются.
+
         :param OrderItem item: Экземпляр позиции
         """
-        self.__data['items'].append(dict(item))
+        self.__data['items'].append(item)
 
 
-class OrderItem(object):
+class OrderItem(BaseItem):
     """
         :param int id: Идентификатор позиции в заказе
         :param int product_id: Идентификатор продукта в магазине
         :param str name: Наименование позиции
         :param str type: Тип заказа
-        :param int|float price: Цена позиции в заказе
+        :param int|float|Money price: Цена позиции в заказе
         :param int|float quantity: Количество единиц
         :param str measure: Единица измерения
-        :param int|float total: Общая стоимость позиции
+        :param int|float|Money total: Общая стоимость позиции
         :param str user_data: Дополнительный реквизит предмета расчета
-        :param int|float excise: Сумма акциза
+        :param int|float|Money excise: Сумма акциза
         :param str country_code: Цифровой код страны происхождения товара
         :param str declaration_number: Номер таможенной декларации
         :param str vat: Налоговая ставка
         :param bool is_need_nomenclature_code: Необходимость указания маркировки для фискализации
     """
 
+    _fields = ('name', 'measure', 'price', 'quantity', 'total', 'vat', 'id', 'type', 'product_id',
+               'external_id')
+    _required = 6
+    _extra_fields = ('is_need_nomenclature_code', 'mark_code', 'mark_quantity')
+    _kinds = get_field_kinds(_fields, _required, _extra_fields)
+    __slots__ = _fields + _extra_fields
+
     def __init__(self, name, price, quantity=1, measure=0, total=None, is_need_nomenclature_code=False,
                  type=None, user_data=None, excise=None, id=None, country_code=None, product_id=None,
                  declaration_number=None, vat=VatRate.RATE_NO, external_id=None):
+        super(OrderItem, self).__init__()
         if total is None:
             total = price * quantity
 
-        self.__data = {
-            'name': name,
-            'measure': measure,
-            'price': price,
-            'quantity': quantity,
-            'total': total,
-            'vat': VatRate.parse(vat)
-        }
-
-        if id is not None:
-            self.__data['id'] = id
-
-        if type is not None:
-            self.__data['type'] = type
-
-        if measure is not None:
-            self.__data['measure'] = measure
-
-        if product_id is not None:
-            self.__data['product_id'] = product_id
-
-        if id is not None:
-            self.__data['id'] = id
-
-        if external_id is not None:
-            self.__data['external_id'] = external_id
+        self.name = name
+        self.measure = measure
+        self.price = price
+        self.quantity = quantity
+        self.total = total
+        self.vat = VatRate.parse(vat)
+        self.id = id
+        self.type = type
+        self.product_id = product_id
+        self.external_id = external_id
 
         if excise is not None:
-            self.__data['excise'] = excise
+            self['excise'] = excise
 
         if country_code is not None:
-            self.__data['country_code'] = country_code
+            self['country_code'] = country_code
 
         if user_data is not None:
-            self.__data['user_data'] = user_data
+            self['user_data'] = user_data
 
         if declaration_number is not None:
-            self.__data['declaration_number'] = declaration_number
+            self['declaration_number'] = declaration_number
 
         if is_need_nomenclature_code is not None:
-            self.__data['is_need_nomenclature_code'] = is_need_nomenclature_code
+            self['is_need_nomenclature_code'] = is_need_nomenclature_code
 
     def set_agent(self, agent):
         """
         :param Agent agent: агент на позицию
         """
-        self.__data.update(dict(agent))
+        self.update(agent)
 
     def set_mark_code(self, type, code):
         """ Установка кода маркировки
         :param str type: Тип маркировки
         :param str code: Код маркировки
         """
-        self.__data['mark_code'] = {type: code}
+        self['mark_code'] = {type: code}
 
     def set_mark_quantity(self, numerator, denominator):
         """ Установка дробного колличества маркировки
         :param int numerator: Делимое
         :param int denominator: Делитель
         """
-        self.__data['mark_quantity'] = {
+        self['mark_quantity'] = {
             'numerator': numerator,
             'denominator': denominator
         }
@@ -272,16 +293,12 @@ class OrderItem(object):
         :param str number: Номер нормативного акта федерального органа исполнительной власти
         :param str value: Состав значений
         """
-        if not self.__data.get('sectoral_item_props'):
-            self.__data['sectoral_item_props'] = []
+        if not self.get('sectoral_item_props'):
+            self['sectoral_item_props'] = []
 
-        self.__data['sectoral_item_props'].append({
+        self['sectoral_item_props'].append({
             'federal_id': federal_id,
             'date': date,
             'number': number,
             'value': value
         })
-
-    def __iter__(self):
-        for item in self.__data.items():
-            yield item
@@ -0,0 +1,404 @@
+# coding: utf-8
+import decimal
+import collections
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+import requests
+
+from .serializers import get_default_serializer
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_LEASE_TIMEOUT = 60.0
+LEASE_TIMEOUT_FACTOR = 2
+
+
+class OutboxState(object):
+    """Состояния чека в локальной очереди"""
+
+    PENDING = 'pending'
+    """Ожидает отправки"""
+
+    SENT = 'sent'
+    """Задача поставлена в очередь на фискализацию"""
+
+    FAILED = 'failed'
+    """Сервер отклонил чек"""
+
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS outbox (
+    external_id TEXT PRIMARY KEY,
+    qid TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    task_id TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (state, next_attempt_at);
+'''
+
+
+class Outbox(object):
+    """
+    Локальная очередь чеков с гарантированной отправкой.
+
+    Метод ``put`` сохраняет чек в базу SQLite и сразу возвращает управление;
+    отправка выполняется пакетами через ``Client.create_tasks`` методом ``flush``
+    или в фоновом потоке (``start``/``stop``). Чеки, которые не удалось отправить
+    из-за сетевой ошибки или ответа 429/5xx, отправляются повторно с экспоненциально
+    растущим интервалом. Если сервер отклонил пакет, чеки отправляются по одному,
+    и отклоненный чек получает состояние ``OutboxState.FAILED``.
+
+    Чеки идентифицируются по ``external_id``: повторный ``put`` чека с тем же
+    ``external_id`` игнорируется, в том числе после перезапуска приложения,
+    поэтому чек не будет отправлен дважды. Перед каждым запросом неотправленные
+    чеки пакета захватываются на ``lease_timeout`` секунд, поэтому одну базу могут
+    обрабатывать несколько потоков и процессов, а чеки, отправка которых прервалась
+    аварийным завершением процесса, будут отправлены повторно по истечении этого времени.
+
+    Время захвата должно превышать максимальную длительность запроса клиента
+    (``Client.get_max_request_time``), иначе чек может быть отправлен повторно
+    другим потоком, пока первый ожидает ответа. По умолчанию оно рассчитывается
+    из тайм-аутов и политики повторов клиента, поэтому их нужно установить
+    до создания очереди.
+
+    :param Client client: Клиент
+    :param str path: Путь к файлу базы SQLite
+    :param int batch_size: Максимальное количество чеков в одном запросе
+    :param float flush_interval: Интервал проверки очереди фоновым потоком, сек
+    :param float initial_delay: Задержка перед первым повтором отправки, сек
+    :param float max_delay: Максимальный интервал между повторами отправки, сек
+    :param float lease_timeout: Время, на которое захватываются чеки при отправке, сек
+                                (None - рассчитать по настройкам клиента)
+    :param callable callback: Обработчик результата отправки чека,
+                              ``callback(external_id, result)``, где ``result`` - ``Task``
+                              или исключение, если сервер отклонил чек
+    """
+
+    def __init__(self, client, path, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, initial_delay=1.0, max_delay=300.0,
+                 lease_timeout=None, callback=None):
+        if batch_size < 1:
+            raise ValueError('batch_size must be positive')
+        max_request_time = client.get_max_request_time()
+        if max_request_time is None:
+            raise ValueError('Client timeouts must be bounded')
+        if lease_timeout is None:
+            lease_timeout = max(DEFAULT_LEASE_TIMEOUT, max_request_time * LEASE_TIMEOUT_FACTOR)
+        elif lease_timeout <= max_request_time:
+            raise ValueError('lease_timeout must exceed the maximum request time (%ss)' %
+                             max_request_time)
+        self.__client = client
+        self.__path = path
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        self.__initial_delay = initial_delay
+        self.__max_delay = max_delay
+        self.__lease_timeout = lease_timeout
+        self.__callback = callback
+        # Данные хранятся с точной записью Decimal, чтобы не терять точность сумм
+        self.__serializer = get_default_serializer(exact_decimal=True)
+        self.__local = threading.local()
+        self.__connections = []
+        self.__lock = threading.Lock()
+        self.__wakeup = threading.Event()
+        self.__stopped = threading.Event()
+        self.__threads = []
+
+        connection = self.__get_connection()
+        connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        """Количество чеков, ожидающих отправки"""
+        cursor = self.__get_connection().execute(
+            'SELECT COUNT(*) FROM outbox WHERE state = ?', (OutboxState.PENDING,))
+        return cursor.fetchone()[0]
+
+    def put(self, check, qid=None):
+        """
+        Сохраняет чек для отправки
+
+        :param Check|CorrectionCheck check: Экземпляр чека
+        :param int qid: Идентификатор очереди
+        :return: ``True``, если чек добавлен, ``False``, если чек с таким ``external_id``
+                 уже есть в очереди
+        """
+        return self.put_many([check], qid) == 1
+
+    def put_many(self, checks, qid=None):
+        """
+        Сохраняет множество чеков для отправки в одной транзакции
+
+        :param list checks: Список экземпляров чека
+        :param int qid: Идентификатор очереди
+        :return: количество добавленных чеков
+        """
+        qid = str(self.__client._handle_queue_id(qid))
+        now = time.time()
+        rows = []
+        for check in checks:
+            rows.append((str(check['external_id']), qid,
+                         sqlite3.Binary(self.__serializer.dumps(check)), OutboxState.PENDING, now))
+
+        connection = self.__get_connection()
+        with _Transaction(connection):
+            before = connection.total_changes
+            connection.executemany(
+                'INSERT OR IGNORE INTO outbox (external_id, qid, payload, state, created_at) '
+                'VALUES (?, ?, ?, ?, ?)', rows)
+            added = connection.total_changes - before
+        if added:
+            self.__wakeup.set()
+        return added
+
+    def get_state(self, external_id):
+        """
+        Возвращает состояние чека: ``{'state': ..., 'attempts': ..., 'task_id': ...,
+        'error': ...}`` или ``None``, если чека нет в очереди
+
+        :param str external_id: Идентификатор чека
+        """
+        row = self.__get_connection().execute(
+            'SELECT state, attempts, task_id, error FROM outbox WHERE external_id = ?',
+            (str(external_id),)).fetchone()
+        if row is None:
+            return None
+        return {'state': row[0], 'attempts': row[1], 'task_id': row[2], 'error': row[3]}
+
+    def get_stats(self):
+        """Возвращает количество чеков в каждом состоянии"""
+        stats = {OutboxState.PENDING: 0, OutboxState.SENT: 0, OutboxState.FAILED: 0}
+        stats.update(self.__get_connection().execute(
+            'SELECT state, COUNT(*) FROM outbox GROUP BY state'))
+        return stats
+
+    def purge(self, older_than=0):
+        """
+        Удаляет отправленные чеки. Сведения о чеке нужны для защиты
+        от повторной отправки, поэтому удалять следует только чеки,
+        которые не будут добавлены в очередь снова.
+
+        :param float older_than: Удалять чеки, добавленные раньше, чем указанное
+                                 количество секунд назад
+        :return: количество удаленных чеков
+        """
+        connection = self.__get_connection()
+        with _Transaction(connection):
+            cursor = connection.execute(
+                'DELETE FROM outbox WHERE state = ? AND created_at <= ?',
+                (OutboxState.SENT, time.time() - older_than))
+        return cursor.rowcount
+
+    def flush(self):
+        """
+        Отправляет все чеки, время отправки которых наступило
+
+        :return: количество отправленных чеков
+        """
+        # Чеки, отправка которых отложена во время этого вызова, не выбираются повторно
+        started_at = time.time()
+        sent = 0
+        while True:
+            batch = self.__claim(started_at)
+            if not batch:
+                return sent
+            sent += self.__send(batch)
+
+    def start(self, workers=1):
+        """
+        Запускает отправку чеков в фоновых потоках
+
+        :param int workers: Количество потоков
+        """
+        with self.__lock:
+            if self.__threads:
+                return self
+            self.__stopped.clear()
+            for i in range(workers):
+                thread = threading.Thread(target=self.__run_forever, name='Outbox-%s' % i)
+                thread.daemon = True
+                thread.start()
+                self.__threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Останавливает фоновые потоки. Неотправленные чеки остаются в базе.
+
+        :param float timeout: Максимальное время ожидания остановки каждого потока, сек
+        """
+        with self.__lock:
+            threads, self.__threads = self.__threads, []
+            self.__stopped.set()
+            self.__wakeup.set()
+        for thread in threads:
+            thread.join(timeout)
+
+    def close(self):
+        """Останавливает фоновые потоки и закрывает соединения с базой"""
+        self.stop()
+        with self.__lock:
+            connections, self.__connections = self.__connections, []
+        for connection in connections:
+            connection.close()
+        self.__local = threading.local()
+
+    def __run_forever(self):
+        while not self.__stopped.is_set():
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Outbox flush failed')
+            self.__wakeup.wait(self.__flush_interval)
+            self.__wakeup.clear()
+
+    def __get_connection(self):
+        connection = getattr(self.__local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.__path, timeout=30, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=FULL')
+            self.__local.connection = connection
+            with self.__lock:
+                self.__connections.append(connection)
+        return connection
+
+    def __claim(self, due_before):
+        now = time.time()
+        connection = self.__get_connection()
+        with _Transaction(connection):
+            rows = connection.execute(
+                'SELECT external_id, qid, payload, attempts FROM outbox '
+                'WHERE state = ? AND next_attempt_at < ? ORDER BY created_at LIMIT ?',
+                (OutboxState.PENDING, due_before, self.__batch_size)).fetchall()
+            connection.executemany(
+                'UPDATE outbox SET next_attempt_at = ? WHERE external_id = ?',
+                [(now + self.__lease_timeout, row[0]) for row in rows])
+        return rows
+
+    def __send(self, batch):
+        by_queue = {}
+        for row in batch:
+            by_queue.setdefault(row[1], []).append(row)
+
+        units = collections.deque(by_queue.items())
+        sent = 0
+        renew = False
+        while units:
+            # Пакет захвачен на время одного запроса: перед следующими запросами
+            # захват оставшихся чеков продлевается
+            if renew:
+                self.__renew([row for _, rows in units for row in rows])
+            renew = True
+            qid, rows = units.popleft()
+            try:
+                tasks = self.__client.create_tasks([self.__load(row[2]) for row in rows], qid)
+            except (requests.RequestException, ValueError) as exc:
+                if not self.__is_rejected(exc) or len(rows) == 1:
+                    self.__fail(rows, exc)
+                    continue
+                # Сервер отклонил пакет: отправляем чеки по одному, чтобы
+                # ошибка одного чека не блокировала остальные
+                units.extendleft((qid, [row]) for row in reversed(rows))
+                continue
+
+            tasks = {str(task.external_id): task for task in tasks}
+            missing = [row for row in rows if row[0] not in tasks]
+            self.__complete([(row[0], tasks[row[0]]) for row in rows if row[0] in tasks])
+            if missing:
+                self.__fail(missing, ValueError('Task is missing in response'))
+            sent += len(rows) - len(missing)
+        return sent
+
+    def __renew(self, rows):
+        lease_until = time.time() + self.__lease_timeout
+        connection = self.__get_connection()
+        with _Transaction(connection):
+            connection.executemany(
+                'UPDATE outbox SET next_attempt_at = ? WHERE external_id = ? AND state = ?',
+                [(lease_until, row[0], OutboxState.PENDING) for row in rows])
+
+    @staticmethod
+    def __load(payload):
+        return json.loads(bytes(payload).decode('utf-8'), parse_float=decimal.Decimal)
+
+    @staticmethod
+    def __is_rejected(exc):
+        response = getattr(exc, 'response', None)
+        status_code = getattr(response, 'status_code', None)
+        return status_code is not None and 400 <= status_code < 500 and status_code != 429
+
+    def __complete(self, results):
+        connection = self.__get_connection()
+        with _Transaction(connection):
+            connection.executemany(
+                'UPDATE outbox SET state = ?, attempts = attempts + 1, task_id = ?, error = NULL '
+                'WHERE external_id = ?',
+                [(OutboxState.SENT, str(task.id), external_id) for external_id, task in results])
+        self.__notify(results)
+
+    def __fail(self, rows, exc):
+        now = time.time()
+        error = '%s: %s' % (type(exc).__name__, exc)
+        connection = self.__get_connection()
+        if self.__is_rejected(exc):
+            with _Transaction(connection):
+                connection.executemany(
+                    'UPDATE outbox SET state = ?, attempts = attempts + 1, error = ? '
+                    'WHERE external_id = ?',
+                    [(OutboxState.FAILED, error, row[0]) for row in rows])
+            logger.error('Checks %s rejected: %s', ', '.join(row[0] for row in rows), error)
+            self.__notify([(row[0], exc) for row in rows])
+            return
+
+        with _Transaction(connection):
+            connection.executemany(
+                'UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, error = ? '
+                'WHERE external_id = ?',
+                [(now + min(self.__initial_delay * 2 ** row[3], self.__max_delay), error, row[0])
+                 for row in rows])
+        logger.warning('Failed to send %s checks, will retry: %s', len(rows), error)
+
+    def __notify(self, results):
+        if self.__callback is None:
+            return
+        for external_id, result in results:
+            try:
+                self.__callback(external_id, result)
+            except Exception:
+                logger.exception('Outbox callback failed')
+
+
+class _Transaction(object):
+    # BEGIN IMMEDIATE сразу захватывает блокировку записи, чтобы параллельные
+    # потоки и процессы не выбирали для отправки одни и те же чеки
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.connection.execute('COMMIT')
+        else:
+            self.connection.execute('ROLLBACK')
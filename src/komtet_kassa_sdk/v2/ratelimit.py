@@ -0,0 +1,154 @@
+# coding: utf-8
+"""
+Ограничение частоты запросов клиента по алгоритму token bucket.
+
+Корзина вмещает ``burst`` токенов и пополняется со скоростью ``rate`` токенов
+в секунду; каждый запрос расходует один токен. Если токенов не хватает,
+запрос резервирует токен "в долг" и ожидает его поступления вне блокировки,
+поэтому конкурирующие потоки и процессы обслуживаются в порядке обращения,
+а суммарная частота запросов не превышает ``rate``.
+"""
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+monotonic = getattr(time, 'monotonic', time.time)
+
+
+def _reserve(tokens, updated_at, now, rate, burst, count, timeout):
+    # Возвращает новое состояние корзины и время ожидания или None,
+    # если ожидание превысило бы timeout
+    tokens = min(burst, tokens + max(now - updated_at, 0) * rate)
+    tokens -= count
+    wait = -tokens / rate if tokens < 0 else 0
+    if timeout is not None and wait > timeout:
+        return None
+    return tokens, wait
+
+
+class RateLimiter(object):
+    """
+    Ограничение частоты запросов в пределах процесса.
+
+    Один экземпляр можно использовать в нескольких клиентах и потоках.
+    Время отсчитывается по монотонным часам, поэтому перевод системных часов
+    не приостанавливает пополнение корзины и не пополняет ее сразу.
+
+    :param float rate: Максимальное количество запросов в секунду
+    :param int burst: Максимальное количество запросов, выполняемых без ожидания
+                      после простоя (по умолчанию - ``rate``, но не меньше 1)
+    """
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self.__tokens = self.burst
+        self.__updated_at = monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self, count=1, timeout=None):
+        """
+        Получает токены, при необходимости ожидая их поступления
+
+        :param int count: Количество токенов
+        :param float timeout: Максимальное время ожидания, сек (None - без ограничения)
+        :return: ``True``, если токены получены, ``False``, если ожидание превысило бы ``timeout``
+        """
+        with self.__lock:
+            now = monotonic()
+            reserved = _reserve(self.__tokens, self.__updated_at, now, self.rate, self.burst,
+                                count, timeout)
+            if reserved is None:
+                return False
+            self.__tokens, wait = reserved
+            self.__updated_at = now
+        if wait:
+            time.sleep(wait)
+        return True
+
+
+class FileRateLimiter(object):
+    """
+    Ограничение частоты запросов, общее для всех процессов, использующих
+    один и тот же файл (например, воркеров gunicorn на одном сервере).
+
+    Состояние корзины хранится в файле ``path`` и изменяется под блокировкой
+    ``flock``. Требуется POSIX-система. Монотонные часы разных процессов
+    несопоставимы, поэтому время в файле - системное.
+
+    :param str path: Путь к файлу состояния (создается при необходимости)
+    :param float rate: Максимальное количество запросов в секунду
+    :param int burst: Максимальное количество запросов, выполняемых без ожидания
+                      после простоя (по умолчанию - ``rate``, но не меньше 1)
+    """
+
+    __state = struct.Struct('<dd')
+
+    def __init__(self, path, rate, burst=None):
+        if fcntl is None:
+            raise ImportError('FileRateLimiter requires fcntl (POSIX systems only)')
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.path = path
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self.__lock = threading.Lock()
+        self.__fd = None
+        self.__pid = None
+
+    def acquire(self, count=1, timeout=None):
+        """
+        Получает токены, при необходимости ожидая их поступления
+
+        :param int count: Количество токенов
+        :param float timeout: Максимальное время ожидания, сек (None - без ограничения)
+        :return: ``True``, если токены получены, ``False``, если ожидание превысило бы ``timeout``
+        """
+        with self.__lock:
+            fd = self.__get_fd()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                os.lseek(fd, 0, os.SEEK_SET)
+                data = os.read(fd, self.__state.size)
+                if len(data) == self.__state.size:
+                    tokens, updated_at = self.__state.unpack(data)
+                else:
+                    tokens, updated_at = self.burst, now
+                reserved = _reserve(tokens, updated_at, now, self.rate, self.burst, count,
+                                    timeout)
+                if reserved is None:
+                    return False
+                tokens, wait = reserved
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.write(fd, self.__state.pack(tokens, now))
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        if wait:
+            time.sleep(wait)
+        return True
+
+    def close(self):
+        """Закрывает файл состояния"""
+        with self.__lock:
+            fd, self.__fd = self.__fd, None
+            if fd is not None and self.__pid == os.getpid():
+                os.close(fd)
+
+    def __get_fd(self):
+        # flock действует на открытый файл целиком, поэтому после fork
+        # дочерний процесс должен открыть файл заново, иначе блокировка
+        # будет общей с родительским процессом
+        pid = os.getpid()
+        if self.__fd is None or self.__pid != pid:
+            self.__fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self.__pid = pid
+        return self.__fd
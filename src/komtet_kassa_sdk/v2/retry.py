@@ -0,0 +1,175 @@
+# coding: utf-8
+import email.utils
+import random
+import threading
+import time
+
+import requests
+
+
+DEFAULT_STATUS_FORCELIST = (429, 500, 502, 503, 504)
+
+
+class RetryPolicy(object):
+    """
+    Политика повторных запросов клиента.
+
+    Запрос повторяется при сетевых ошибках и ответах с кодами из ``status_forcelist``.
+    Перед очередной попыткой выдерживается пауза, растущая экспоненциально:
+    ``backoff_factor * 2 ** (номер повтора - 1)``, но не более ``max_backoff``.
+    При ``jitter=True`` пауза выбирается случайно от нуля до этого значения.
+    Если сервер передал заголовок ``Retry-After``, пауза не меньше указанной в нем
+    (но не больше ``max_retry_after``).
+
+    Неидемпотентные запросы (например, создание сотрудника) повторяются только
+    если запрос гарантированно не был отправлен (тайм-аут установки соединения).
+    Постановка задач и создание заказов считаются идемпотентными: повторная
+    отправка чека с тем же ``external_id`` не создает новую задачу.
+
+    :param int max_attempts: Максимальное количество попыток, включая первую
+    :param float backoff_factor: Базовая пауза между попытками, сек
+    :param float max_backoff: Максимальная пауза между попытками, сек
+    :param bool jitter: Выбирать паузу случайно в пределах рассчитанной
+    :param tuple status_forcelist: Коды ответа, при которых запрос повторяется
+    :param bool respect_retry_after: Учитывать заголовок ``Retry-After``
+    :param float max_retry_after: Максимальная пауза по заголовку ``Retry-After``, сек
+    """
+
+    def __init__(self, max_attempts=3, backoff_factor=0.5, max_backoff=30.0, jitter=True,
+                 status_forcelist=DEFAULT_STATUS_FORCELIST, respect_retry_after=True,
+                 max_retry_after=60.0):
+        if max_attempts < 1:
+            raise ValueError('max_attempts must be positive')
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.status_forcelist = frozenset(status_forcelist)
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+        self.__lock = threading.Lock()
+        self.reset_metrics()
+
+    @property
+    def metrics(self):
+        """
+        Счетчики политики:
+
+        - ``calls`` - количество вызовов
+        - ``attempts`` - общее количество попыток
+        - ``retries`` - количество повторов
+        - ``exhausted`` - количество вызовов, исчерпавших все попытки
+        - ``attempts_per_call`` - распределение ``{количество попыток: количество вызовов}``
+        """
+        with self.__lock:
+            metrics = dict(self.__metrics)
+            metrics['attempts_per_call'] = dict(self.__metrics['attempts_per_call'])
+        return metrics
+
+    def reset_metrics(self):
+        """Обнуляет счетчики политики"""
+        with self.__lock:
+            self.__metrics = {
+                'calls': 0,
+                'attempts': 0,
+                'retries': 0,
+                'exhausted': 0,
+                'attempts_per_call': {}
+            }
+
+    def get_backoff(self, retry):
+        """
+        Возвращает паузу перед повтором
+
+        :param int retry: Номер повтора, начиная с 1
+        """
+        backoff = min(self.backoff_factor * 2 ** (retry - 1), self.max_backoff)
+        if self.jitter:
+            backoff = random.uniform(0, backoff)
+        return backoff
+
+    def get_max_wait(self):
+        """Возвращает максимальную суммарную паузу между всеми попытками одного вызова, сек"""
+        wait = 0
+        for retry in range(1, self.max_attempts):
+            backoff = min(self.backoff_factor * 2 ** (retry - 1), self.max_backoff)
+            if self.respect_retry_after:
+                backoff = max(backoff, self.max_retry_after)
+            wait += backoff
+        return wait
+
+    def get_retry_after(self, response):
+        """
+        Возвращает паузу из заголовка ``Retry-After`` ответа или ``None``
+
+        :param requests.Response response: Ответ сервера
+        """
+        value = (response.headers or {}).get('Retry-After')
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            parsed = email.utils.parsedate_tz(value)
+            if parsed is None:
+                return None
+            seconds = email.utils.mktime_tz(parsed) - time.time()
+        return min(max(seconds, 0), self.max_retry_after)
+
+    def is_retryable_response(self, response):
+        return response.status_code in self.status_forcelist
+
+    def is_retryable_error(self, error, idempotent):
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        return idempotent and isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    def call(self, send, idempotent=True):
+        """
+        Выполняет запрос с повторами
+
+        :param callable send: Функция, отправляющая запрос и возвращающая ответ
+        :param bool idempotent: Запрос можно безопасно повторить
+        :return: ответ последней попытки
+        """
+        attempt = 0
+        try:
+            while True:
+                attempt += 1
+                try:
+                    response = send()
+                except requests.RequestException as exc:
+                    retryable = self.is_retryable_error(exc, idempotent)
+                    if not retryable or attempt >= self.max_attempts:
+                        self.__exhausted(attempt)
+                        raise
+                    delay = self.get_backoff(attempt)
+                else:
+                    if not (idempotent and self.is_retryable_response(response)):
+                        return response
+                    if attempt >= self.max_attempts:
+                        self.__exhausted(attempt)
+                        return response
+                    delay = self.get_backoff(attempt)
+                    if self.respect_retry_after:
+                        retry_after = self.get_retry_after(response)
+                        if retry_after is not None:
+                            delay = max(delay, retry_after)
+                    response.close()
+                time.sleep(delay)
+        finally:
+            self.__count(attempt)
+
+    def __exhausted(self, attempts):
+        if attempts >= self.max_attempts:
+            with self.__lock:
+                self.__metrics['exhausted'] += 1
+
+    def __count(self, attempts):
+        with self.__lock:
+            metrics = self.__metrics
+            metrics['calls'] += 1
+            metrics['attempts'] += attempts
+            metrics['retries'] += attempts - 1
+            metrics['attempts_per_call'][attempts] = \
+                metrics['attempts_per_call'].get(attempts, 0) + 1
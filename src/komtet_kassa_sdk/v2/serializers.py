@@ -0,0 +1,244 @@
+# coding: utf-8
+"""
+Сериализаторы тела запроса.
+
+Все сериализаторы формируют JSON в компактном виде (без пробелов после
+разделителей) в кодировке UTF-8 без экранирования не-ASCII символов,
+поэтому для одних и тех же данных результат побайтно совпадает независимо
+от выбранного сериализатора. Исключение - значения ``float``, которые
+передаются в orjson без изменений: ненулевые числа по модулю меньше 1e-4
+стандартный json записывает с экспонентой (``1e-05``), а orjson - без нее
+(``0.00001``); NaN и бесконечность json записывает как ``NaN`` и ``Infinity``
+(это не допускается стандартом JSON), а orjson - как ``null``. Для ``Decimal``
+и ``Money`` результат совпадает всегда.
+
+На Python 2 не-ASCII символы экранируются (``\\u0418``), как и в прежних
+версиях: строки там бывают и ``str`` в UTF-8, и ``unicode``, и их смешение
+в одном запросе без экранирования приводит к ошибке декодирования.
+
+``decimal.Decimal`` по умолчанию передается как число с плавающей точкой.
+В режиме ``exact_decimal=True`` значение записывается точно так, как оно
+хранится в ``Decimal`` (например, ``Decimal('10.10')`` - как ``10.10``),
+без промежуточного преобразования во ``float``. Суммы ``Money`` записываются
+так же: ``Money(1050)`` - как ``10.5``, в режиме ``exact_decimal=True`` - как ``10.50``.
+
+Чеки, заказы и позиции передаются в сериализатор как есть: объекты с методом
+``_asdict`` записываются по возвращаемым им данным, поэтому структура запроса
+собирается один раз, непосредственно при сериализации.
+"""
+import decimal
+import json
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .lib.item import BaseItem
+from .lib.money import Money
+
+
+# На Python 2 str - байты, см. описание модуля
+_ENSURE_ASCII = str is bytes
+_encode_string = encode_basestring_ascii if _ENSURE_ASCII else encode_basestring
+
+try:
+    _TEXT_TYPES = (str, unicode)
+    _INTEGER_TYPES = (int, long)
+except NameError:  # Python 3
+    _TEXT_TYPES = (str,)
+    _INTEGER_TYPES = (int,)
+
+# Диапазон, в котором стандартный json и orjson одинаково форматируют
+# числа с плавающей точкой (за его пределами они по-разному записывают экспоненту)
+_FLOAT_REPR_MIN = 1e-4
+_FLOAT_REPR_MAX = 1e16
+
+
+def _decimal_to_float(obj):
+    if isinstance(obj, (decimal.Decimal, Money)):
+        return float(obj)
+    if hasattr(obj, '_asdict'):
+        return obj._asdict()
+    raise TypeError('Object of type %s is not JSON serializable' % type(obj).__name__)
+
+
+def _decimal_to_str(value):
+    if not value.is_finite():
+        raise ValueError('Out of range decimal values are not JSON compliant: %s' % value)
+    return str(value)
+
+
+def _float_to_str(value):
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return 'Infinity' if value > 0 else '-Infinity'
+    return float.__repr__(value)
+
+
+def _key_to_str(key):
+    if isinstance(key, _TEXT_TYPES):
+        return key
+    if key is True:
+        return 'true'
+    if key is False:
+        return 'false'
+    if key is None:
+        return 'null'
+    if isinstance(key, float):
+        return _float_to_str(key)
+    if isinstance(key, _INTEGER_TYPES):
+        return '%d' % key
+    raise TypeError('keys must be str, int, float, bool or None, not %s' % type(key).__name__)
+
+
+def _encode_exact(obj, chunks):
+    # Однопроходная сериализация с точной записью Decimal: стандартный
+    # C-кодировщик json не позволяет вставить число как есть
+    if isinstance(obj, _TEXT_TYPES):
+        chunks.append(_encode_string(obj))
+    elif obj is None:
+        chunks.append('null')
+    elif obj is True:
+        chunks.append('true')
+    elif obj is False:
+        chunks.append('false')
+    elif isinstance(obj, _INTEGER_TYPES):
+        chunks.append('%d' % obj)
+    elif isinstance(obj, float):
+        chunks.append(_float_to_str(obj))
+    elif isinstance(obj, decimal.Decimal):
+        chunks.append(_decimal_to_str(obj))
+    elif isinstance(obj, Money):
+        chunks.append(str(obj))
+    elif isinstance(obj, (dict, BaseItem)):
+        # Позиции чека записываются сразу из полей объекта, без промежуточного словаря
+        chunks.append('{')
+        first = True
+        for key, value in (obj.items() if isinstance(obj, dict) else obj):
+            if first:
+                first = False
+            else:
+                chunks.append(',')
+            chunks.append(_encode_string(_key_to_str(key)))
+            chunks.append(':')
+            _encode_exact(value, chunks)
+        chunks.append('}')
+    elif isinstance(obj, (list, tuple)):
+        chunks.append('[')
+        first = True
+        for value in obj:
+            if first:
+                first = False
+            else:
+                chunks.append(',')
+            _encode_exact(value, chunks)
+        chunks.append(']')
+    elif hasattr(obj, '_asdict'):
+        _encode_exact(obj._asdict(), chunks)
+    else:
+        raise TypeError('Object of type %s is not JSON serializable' % type(obj).__name__)
+
+
+class JSONSerializer(object):
+    """
+    Сериализатор на основе стандартного модуля json
+
+    :param bool exact_decimal: Записывать Decimal точно, без преобразования во float
+    """
+
+    name = 'json'
+
+    def __init__(self, exact_decimal=False):
+        self.exact_decimal = exact_decimal
+        self.__encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=_ENSURE_ASCII,
+                                          default=_decimal_to_float)
+
+    def dumps(self, obj):
+        """
+        :param obj: Данные запроса
+        :rtype: bytes
+        """
+        if self.exact_decimal:
+            chunks = []
+            _encode_exact(obj, chunks)
+            return ''.join(chunks).encode('utf-8')
+        return self.__encoder.encode(obj).encode('utf-8')
+
+
+def _orjson_default(obj):
+    if isinstance(obj, (decimal.Decimal, Money)):
+        value = float(obj)
+        if not value or _FLOAT_REPR_MIN <= abs(value) < _FLOAT_REPR_MAX:
+            return value
+    elif hasattr(obj, '_asdict'):
+        return obj._asdict()
+    # Исключение прерывает сериализацию, после чего данные передаются в JSONSerializer
+    raise TypeError
+
+
+def _orjson_exact_default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return orjson.Fragment(_decimal_to_str(obj))
+    if isinstance(obj, Money):
+        return orjson.Fragment(str(obj))
+    if hasattr(obj, '_asdict'):
+        return obj._asdict()
+    raise TypeError
+
+
+class OrjsonSerializer(object):
+    """
+    Сериализатор на основе пакета orjson.
+
+    Данные, которые orjson не может сериализовать так же, как стандартный
+    json (например, целые числа больше 64 бит или Decimal, которые после
+    преобразования во float оказываются меньше 1e-4), передаются
+    в ``JSONSerializer``. Значения ``float`` orjson записывает сам, поэтому
+    для очень малых чисел, NaN и бесконечности результат отличается
+    (см. описание модуля).
+    Точная запись Decimal требует orjson 3.9 и выше, в более ранних версиях
+    такие данные также сериализуются ``JSONSerializer``.
+
+    :param bool exact_decimal: Записывать Decimal точно, без преобразования во float
+    """
+
+    name = 'orjson'
+
+    def __init__(self, exact_decimal=False):
+        if orjson is None:
+            raise ImportError('OrjsonSerializer requires orjson: pip install orjson')
+        self.exact_decimal = exact_decimal
+        self.__fallback = JSONSerializer(exact_decimal)
+        if not exact_decimal:
+            self.__default = _orjson_default
+        elif hasattr(orjson, 'Fragment'):
+            self.__default = _orjson_exact_default
+        else:
+            self.__default = None
+
+    def dumps(self, obj):
+        """
+        :param obj: Данные запроса
+        :rtype: bytes
+        """
+        if self.__default is None:
+            return self.__fallback.dumps(obj)
+        try:
+            return orjson.dumps(obj, default=self.__default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return self.__fallback.dumps(obj)
+
+
+def get_default_serializer(exact_decimal=False):
+    """
+    Возвращает самый быстрый из доступных сериализаторов:
+    ``OrjsonSerializer``, если установлен orjson, иначе ``JSONSerializer``.
+
+    :param bool exact_decimal: Записывать Decimal точно, без преобразования во float
+    """
+    if orjson is not None:
+        return OrjsonSerializer(exact_decimal)
+    return JSONSerializer(exact_decimal)
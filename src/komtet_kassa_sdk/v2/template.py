@@ -0,0 +1,97 @@
+# coding: utf-8
+class TemplateCheck(object):
+    """
+    Чек, созданный по шаблону ``CheckTemplate``.
+
+    Поддерживает тот же интерфейс чтения, что и ``Check``, поэтому его можно
+    передавать в ``Client.create_task``, ``create_tasks`` и ``Outbox.put``.
+    Неизменяемые части чека общие для всех чеков шаблона, их не следует изменять.
+    """
+
+    __slots__ = ('__data',)
+
+    def __init__(self, data):
+        self.__data = data
+
+    def __iter__(self):
+        return iter(self.__data.items())
+
+    def __getitem__(self, item):
+        return self.__data[item]
+
+    def _asdict(self):
+        return self.__data
+
+
+class CheckTemplate(object):
+    """
+    Шаблон для быстрого создания однотипных чеков.
+
+    Прототип - полностью заполненный ``Check`` или ``CorrectionCheck``
+    (организация, кассир, позиции, платежи и т.д.). Его данные фиксируются
+    при создании шаблона, после чего метод ``create`` формирует новые чеки,
+    подставляя только изменяемые поля: номер операции, данные покупателя,
+    суммы позиций и платежей. Неизменяемые части не копируются и не собираются
+    заново, а используются всеми чеками шаблона совместно.
+
+    :param Check|CorrectionCheck prototype: Чек-прототип
+    """
+
+    def __init__(self, prototype):
+        data = dict(prototype)
+        self.__positions = [dict(position) for position in data.get('positions', ())]
+        self.__payments = [dict(payment) for payment in data.get('payments', ())]
+        self.__client = dict(data.get('client') or {})
+        self.__data = data
+        data['positions'] = self.__positions
+        data['payments'] = self.__payments
+        data['client'] = self.__client
+
+    def create(self, oid, client=None, positions=None, payments=None):
+        """
+        Создает чек по шаблону
+
+        :param oid: Номер операции в магазине
+        :param dict client: Данные покупателя, заменяющие данные прототипа,
+                            например ``{'email': 'client@client.ru'}``
+        :param list positions: Изменения позиций прототипа в том же порядке, например
+                               ``[{'price': 100, 'total': 100}]``; вместо словаря можно
+                               передать ``Position``, который заменит позицию целиком
+        :param list payments: Суммы платежей в том же порядке, что и в прототипе
+        :rtype: TemplateCheck
+        """
+        data = self.__data.copy()
+        data['external_id'] = oid
+
+        if client is not None:
+            data['client'] = client
+
+        if positions is not None:
+            if len(positions) != len(self.__positions):
+                raise ValueError('Expected %d positions, got %d'
+                                 % (len(self.__positions), len(positions)))
+            data['positions'] = [
+                self.__merge(prototype, changes)
+                for prototype, changes in zip(self.__positions, positions)
+            ]
+
+        if payments is not None:
+            if len(payments) != len(self.__payments):
+                raise ValueError('Expected %d payments, got %d'
+                                 % (len(self.__payments), len(payments)))
+            data['payments'] = [
+                {'sum': amount, 'type': prototype['type']}
+                for prototype, amount in zip(self.__payments, payments)
+            ]
+
+        return TemplateCheck(data)
+
+    @staticmethod
+    def __merge(prototype, changes):
+        if not changes:
+            return prototype
+        if not isinstance(changes, dict):
+            return dict(changes)
+        position = prototype.copy()
+        position.update(changes)
+        return position
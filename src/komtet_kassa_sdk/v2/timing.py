@@ -0,0 +1,60 @@
+# coding: utf-8
+import time
+
+
+perf_counter = getattr(time, 'perf_counter', time.time)
+
+
+class RequestEvent(object):
+    """
+    Сведения о запросе клиента, которые получает наблюдатель (см. ``Client.set_observer``).
+
+    Длительность каждого этапа запроса указана в секундах и измерена
+    монотонными часами ``time.perf_counter``:
+
+    * ``build`` - формирование URL и заголовков;
+    * ``encode`` - сериализация тела запроса;
+    * ``sign`` - вычисление подписи;
+    * ``send`` - отправка запроса и ожидание ответа, в том числе повторы
+      и ожидание ограничителя частоты запросов;
+    * ``parse`` - проверка статуса, разбор JSON и создание объекта ответа.
+
+    Этапы, которые не выполнялись (``encode`` у запроса без тела, этапы после
+    ошибки), имеют длительность 0.
+
+    Кроме того, событие содержит ``url`` запроса, размер тела запроса в байтах
+    ``payload_bytes``, код ответа ``status`` (None, если ответ не получен) и
+    исключение ``error``, которым завершился запрос (None при успехе).
+
+    :param str method: HTTP-метод
+    :param str route: Шаблон пути запроса, например ``/api/shop/v2/queues/{qid}/task``
+    """
+
+    __slots__ = ('method', 'route', 'url', 'payload_bytes', 'status', 'error',
+                 'build', 'encode', 'sign', 'send', 'parse')
+
+    PHASES = ('build', 'encode', 'sign', 'send', 'parse')
+
+    def __init__(self, method, route):
+        self.method = method
+        self.route = route
+        self.url = None
+        self.payload_bytes = 0
+        self.status = None
+        self.error = None
+        self.build = self.encode = self.sign = self.send = self.parse = 0.0
+
+    @property
+    def total(self):
+        """Суммарная длительность всех этапов, сек"""
+        return self.build + self.encode + self.sign + self.send + self.parse
+
+    @property
+    def phases(self):
+        """Длительности этапов: ``{'build': ..., 'encode': ..., ...}``"""
+        return {name: getattr(self, name) for name in self.PHASES}
+
+    def __repr__(self):
+        return '%s(%s %s, status=%s, %s)' % (
+            type(self).__name__, self.method, self.route, self.status,
+            ', '.join('%s=%.6f' % (name, getattr(self, name)) for name in self.PHASES))
@@ -0,0 +1,270 @@
+# coding: utf-8
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+import requests
+
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATES = ('done', 'error')
+"""Состояния задачи, после которых ее статус больше не меняется"""
+
+monotonic = getattr(time, 'monotonic', time.time)
+
+
+def _is_permanent_error(error):
+    # Ответ 4xx, кроме 429 Too Many Requests (например, задача не найдена):
+    # повторные проверки задачи бесполезны
+    response = getattr(error, 'response', None)
+    if response is None:
+        return False
+    return 400 <= response.status_code < 500 and response.status_code != 429
+
+
+class _TrackedTask(object):
+    __slots__ = ('attempt', 'callback', 'error_callback')
+
+    def __init__(self, callback, error_callback):
+        self.attempt = 0
+        self.callback = callback
+        self.error_callback = error_callback
+
+
+class TaskTracker(object):
+    """
+    Отслеживание статусов множества задач до их завершения.
+
+    Задачи хранятся в очереди с приоритетом по времени следующей проверки.
+    Интервал между проверками одной задачи растет экспоненциально
+    (``initial_delay``, ``initial_delay * backoff``, ... до ``max_delay``),
+    а общее количество запросов ``get_task_info`` ограничено ``max_rate``
+    запросами в секунду.
+
+    Завершенные задачи (``TaskInfo`` в состоянии ``done`` или ``error``)
+    передаются в обработчики, указанные при вызове ``track`` или при создании
+    трекера, а также возвращаются итератором ``iter_completed``. Обработку
+    можно вести в текущем потоке (``poll``, ``iter_completed``, ``run``)
+    или в фоновом (``start``/``stop``).
+
+    Сетевые ошибки и ответы 5xx и 429 приводят к повторной проверке задачи.
+    При постоянной ошибке (ответ 4xx, например, задача не найдена) задача
+    перестает отслеживаться, а исключение передается в обработчик ошибок
+    ``error_callback(task_id, error)``; если он не указан, ошибка записывается в лог.
+    Исключения обработчиков записываются в лог и не прерывают отслеживание.
+
+    :param Client client: Клиент
+    :param float initial_delay: Задержка перед первой проверкой задачи, сек
+    :param float max_delay: Максимальный интервал между проверками задачи, сек
+    :param float backoff: Множитель интервала после каждой проверки
+    :param float max_rate: Максимальное количество запросов в секунду (None - без ограничения)
+    :param callable callback: Обработчик завершения задачи по умолчанию, ``callback(task_info)``
+    :param callable error_callback: Обработчик постоянной ошибки проверки задачи
+                                    по умолчанию, ``error_callback(task_id, error)``
+    """
+
+    def __init__(self, client, initial_delay=1.0, max_delay=60.0, backoff=2.0, max_rate=10.0,
+                 callback=None, error_callback=None):
+        self.__client = client
+        self.__initial_delay = initial_delay
+        self.__max_delay = max_delay
+        self.__backoff = backoff
+        self.__interval = 1.0 / max_rate if max_rate else 0
+        self.__callback = callback
+        self.__error_callback = error_callback
+        self.__queue = []
+        self.__tasks = {}
+        self.__counter = itertools.count()
+        self.__next_request_at = 0
+        self.__condition = threading.Condition()
+        self.__thread = None
+        self.__stopped = False
+
+    def __len__(self):
+        """Количество незавершенных задач"""
+        with self.__condition:
+            return len(self.__tasks)
+
+    def track(self, task_id, callback=None, delay=None, error_callback=None):
+        """
+        Добавляет задачу для отслеживания
+
+        :param str|int task_id: ID задачи
+        :param callable callback: Обработчик завершения задачи, ``callback(task_info)``
+        :param float delay: Задержка перед первой проверкой, сек (по умолчанию ``initial_delay``)
+        :param callable error_callback: Обработчик постоянной ошибки проверки задачи,
+                                        ``error_callback(task_id, error)``
+        """
+        if delay is None:
+            delay = self.__initial_delay
+
+        with self.__condition:
+            if task_id not in self.__tasks:
+                self.__tasks[task_id] = _TrackedTask(callback, error_callback)
+                self.__schedule(task_id, monotonic() + delay)
+                self.__condition.notify_all()
+        return self
+
+    def poll(self):
+        """
+        Проверяет задачи, время проверки которых наступило, с учетом
+        ограничения частоты запросов.
+
+        :return: список ``TaskInfo`` завершившихся задач
+        """
+        completed = []
+        while True:
+            task_id = self.__pop_due()
+            if task_id is None:
+                return completed
+
+            task_info = self.__check(task_id)
+            if task_info is not None:
+                completed.append(task_info)
+
+    def iter_completed(self, timeout=None):
+        """
+        Отслеживает задачи в текущем потоке и возвращает ``TaskInfo``
+        по мере их завершения, пока все задачи не завершатся.
+
+        :param float timeout: Максимальное время ожидания, сек
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            for task_info in self.poll():
+                yield task_info
+
+            with self.__condition:
+                if not self.__tasks:
+                    return
+                wait = self.__get_wait_time()
+                if deadline is not None:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        return
+                    wait = remaining if wait is None else min(wait, remaining)
+                self.__condition.wait(wait)
+
+    def run(self, timeout=None):
+        """
+        Блокирует текущий поток до завершения всех задач (или истечения ``timeout``),
+        вызывая обработчики завершения.
+
+        :param float timeout: Максимальное время ожидания, сек
+        """
+        for _ in self.iter_completed(timeout):
+            pass
+
+    def start(self):
+        """
+        Запускает отслеживание задач в фоновом потоке. Завершенные задачи
+        передаются только в обработчики.
+        """
+        with self.__condition:
+            if self.__thread is not None:
+                return self
+            self.__stopped = False
+            self.__thread = threading.Thread(target=self.__run_forever, name='TaskTracker')
+            self.__thread.daemon = True
+            self.__thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Останавливает фоновый поток. Незавершенные задачи остаются в трекере.
+
+        :param float timeout: Максимальное время ожидания остановки потока, сек
+        """
+        with self.__condition:
+            thread, self.__thread = self.__thread, None
+            self.__stopped = True
+            self.__condition.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+
+    def __run_forever(self):
+        while True:
+            try:
+                self.poll()
+            except Exception:
+                # Задача, при проверке которой произошла ошибка, уже запланирована повторно
+                logger.exception('Failed to check tasks')
+
+            with self.__condition:
+                if self.__stopped:
+                    return
+                self.__condition.wait(self.__get_wait_time() if self.__tasks else None)
+                if self.__stopped:
+                    return
+
+    def __schedule(self, task_id, check_at):
+        heapq.heappush(self.__queue, (check_at, next(self.__counter), task_id))
+
+    def __get_wait_time(self):
+        if not self.__queue:
+            # Каждая отслеживаемая задача находится в очереди, но ожидание
+            # без ограничения при незавершенных задачах недопустимо
+            return self.__max_delay if self.__tasks else None
+        check_at = max(self.__queue[0][0], self.__next_request_at)
+        return max(check_at - monotonic(), 0)
+
+    def __pop_due(self):
+        with self.__condition:
+            now = monotonic()
+            if not self.__queue or self.__queue[0][0] > now or self.__next_request_at > now:
+                return None
+            self.__next_request_at = now + self.__interval
+            return heapq.heappop(self.__queue)[2]
+
+    def __check(self, task_id):
+        task_info = error = None
+        finished = False
+        try:
+            task_info = self.__client.get_task_info(task_id)
+        except requests.RequestException as exc:
+            if _is_permanent_error(exc):
+                error = exc
+            else:
+                logger.warning('Failed to get info of task %s', task_id, exc_info=True)
+        except ValueError:
+            logger.warning('Failed to get info of task %s', task_id, exc_info=True)
+        finally:
+            # Задача снимается с отслеживания или снова планируется, даже если
+            # get_task_info возбудил непредвиденное исключение
+            with self.__condition:
+                tracked = self.__tasks[task_id]
+                if error is not None or (task_info is not None and
+                                         task_info.state in FINAL_STATES):
+                    del self.__tasks[task_id]
+                    finished = True
+                else:
+                    tracked.attempt += 1
+                    delay = min(self.__initial_delay * self.__backoff ** tracked.attempt,
+                                self.__max_delay)
+                    self.__schedule(task_id, monotonic() + delay)
+
+        if not finished:
+            return None
+
+        if error is not None:
+            callback = tracked.error_callback or self.__error_callback
+            if callback is None:
+                logger.error('Stopped tracking task %s: %s', task_id, error)
+            else:
+                self.__notify(callback, task_id, error)
+            return None
+
+        callback = tracked.callback or self.__callback
+        if callback is not None:
+            self.__notify(callback, task_info)
+        return task_info
+
+    @staticmethod
+    def __notify(callback, *args):
+        try:
+            callback(*args)
+        except Exception:
+            logger.exception('Task completion callback failed')
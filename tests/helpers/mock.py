@@ -1,4 +1,7 @@
 class ResponseMock(object):
+    status_code = 200
+    headers = {}
+
     def __init__(self, **kwargs):
         self.data = kwargs
 
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# Модуль импортируется и на Python 2 (setup.py test загружает все модули tests),
+# поэтому в нем нет синтаксиса async/await: корутины клиента выполняются
+# через loop.run_until_complete, а сервер - обычный HTTP-сервер в потоке
+import hashlib
+import hmac
+import json
+import threading
+import time
+from decimal import Decimal
+from unittest import TestCase, skipIf
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+try:
+    import asyncio
+    from komtet_kassa_sdk.v2 import AsyncClient, Task, TaskInfo
+    from komtet_kassa_sdk.v2.async_client import aiohttp
+except ImportError:  # Python 2 и Python 3.4
+    aiohttp = None
+
+
+def sign(*args):
+    return hmac.new(b'secret-key', ''.join(args).encode('utf-8'), hashlib.md5).hexdigest()
+
+
+class _HTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8')
+        url = 'http://%s:%s%s' % (self.server.server_address[:2] + (self.path,))
+        self.server.requests.append((self.command, url, dict(self.headers), body))
+
+        status, data = 404, {'error': 'not found'}
+        if self.path.endswith('/tasks/slow'):
+            time.sleep(0.5)
+        if self.path.endswith('/queues/1'):
+            status, data = 200, {'state': 'active'}
+        elif self.path.endswith('/task'):
+            status, data = 200, {'id': 1, 'external_id': 2, 'print_queue_id': 3, 'state': 'new'}
+        elif self.path.endswith('/multi-tasks'):
+            status, data = 200, {str(idx): {'id': idx} for idx in range(3)}
+        elif self.path.endswith('/tasks/234'):
+            status, data = 200, {'id': 234, 'state': 'done'}
+        elif self.command == 'DELETE':
+            status, data = 200, None
+
+        payload = b'' if data is None else json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+@skipIf(aiohttp is None, 'aiohttp is not installed')
+class TestAsyncClient(TestCase):
+    def setUp(self):
+        server = _HTTPServer(('127.0.0.1', 0), _Handler)
+        server.requests = self.requests = []
+        thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05})
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.client = AsyncClient('shop-id', 'secret-key')
+        self.client.set_host('http://%s:%s' % server.server_address[:2])
+        self.addCleanup(lambda: self.wait(self.client.close()))
+
+    def wait(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_is_queue_active(self):
+        self.assertTrue(self.wait(self.client.is_queue_active(1)))
+        method, url, headers, _ = self.requests[0]
+        self.assertEqual(method, 'GET')
+        self.assertEqual(headers['Authorization'], 'shop-id')
+        self.assertEqual(headers['X-HMAC-Signature'], sign('GET', url))
+
+    def test_create_task(self):
+        task = self.wait(self.client.create_task({'key': Decimal('10.0')}, 3))
+        self.assertIsInstance(task, Task)
+        self.assertEqual(task.id, 1)
+        self.assertEqual(task.state, 'new')
+
+        method, url, headers, body = self.requests[0]
+        self.assertEqual(method, 'POST')
+        self.assertTrue(url.endswith('/api/shop/v2/queues/3/task'))
+        self.assertEqual(json.loads(body), {'key': 10.0})
+        self.assertEqual(headers['Content-Type'], 'application/json')
+        self.assertEqual(headers['X-HMAC-Signature'], sign('POST', url, body))
+
+    def test_create_tasks_and_get_task_info(self):
+        self.client.set_default_queue(1)
+        tasks = self.wait(self.client.create_tasks([{'external_id': idx} for idx in range(3)]))
+        info = self.wait(self.client.get_task_info(234))
+
+        self.assertEqual([task.id for task in tasks], [0, 1, 2])
+        self.assertIsInstance(info, TaskInfo)
+        self.assertEqual(info.state, 'done')
+
+    def test_concurrent_requests(self):
+        tasks = [self.loop.create_task(self.client.get_task_info(234)) for _ in range(50)]
+        infos = self.wait(asyncio.gather(*tasks))
+        self.assertEqual(len(infos), 50)
+        self.assertEqual(len(self.requests), 50)
+
+    def test_delete_and_errors(self):
+        self.assertTrue(self.wait(self.client.delete_order(25)))
+        with self.assertRaises(aiohttp.ClientResponseError) as ctx:
+            self.wait(self.client.get_order_info(25))
+        self.assertEqual(ctx.exception.status, 404)
+
+    def test_queue_id_is_required(self):
+        with self.assertRaises(ValueError) as ctx:
+            self.wait(self.client.create_task({}))
+        self.assertEqual(ctx.exception.args, ('Queue ID is not specified',))
+
+    def test_timeout(self):
+        timeout = AsyncClient('shop-id', 'secret-key')._AsyncClient__timeout
+        self.assertEqual((timeout.total, timeout.sock_connect, timeout.sock_read), (None, 5, 30))
+
+        self.client.set_timeout(read=0.1)
+        with self.assertRaises(asyncio.TimeoutError):
+            self.wait(self.client.get_task_info('slow'))
@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
+import json
 from decimal import Decimal
 from unittest import TestCase
 
 from komtet_kassa_sdk.v2 import (Agent, AgentType, Check, Position, Intent, MarkTypes, MeasureTypes,
-                                 PaymentMethod, PaymentObject, TaxSystem, VatRate, TimeZone, PlannedStatus)
+                                 PaymentMethod, PaymentObject, TaxSystem, VatRate, TimeZone, PlannedStatus,
+                                 CorrectionCheck, JSONSerializer, OrjsonSerializer)
+from komtet_kassa_sdk.v2.client import json_encode
+from komtet_kassa_sdk.v2.serializers import orjson
 
 
 class TestCheck(TestCase):
@@ -440,3 +444,184 @@ class TestSetCashier(TestCase):
         self.assertDictEqual(check['cashier'], {
             'name': 'Иваров И.П.'
         })
+
+
+class TestCompactPosition(TestCase):
+    def make_position(self, **kwargs):
+        position = Position(name='Товар', price=Decimal('10.10'), quantity=2,
+                            measure=MeasureTypes.PIECE, payment_method=PaymentMethod.FULL_PAYMENT,
+                            payment_object=PaymentObject.PRODUCT, vat=VatRate.RATE_20, **kwargs)
+        return position
+
+    def test_key_order(self):
+        position = self.make_position(id=1, excise=1, declaration_number='123')
+        position.set_mark_code(type=MarkTypes.EAN13, code='1234567890123')
+        position.set_planned_status(PlannedStatus.PLANNED_STATUS_1)
+        position.set_wholesale(True)
+        self.assertEqual(position.keys(), [
+            'name', 'measure', 'price', 'quantity', 'payment_object', 'payment_method', 'total',
+            'vat', 'id', 'excise', 'declaration_number', 'mark_code', 'planned_status',
+            'wholesale'])
+        self.assertEqual(position['total'], Decimal('20.20'))
+
+    def test_mapping(self):
+        position = self.make_position(id=1)
+        self.assertIn('id', position)
+        self.assertNotIn('excise', position)
+        self.assertNotIn('mark_code', position)
+        self.assertIsNone(position.get('excise'))
+        with self.assertRaises(KeyError):
+            position['excise']
+
+        position['total'] = Decimal('19')
+        position['mark_code'] = {'ean13': '1'}
+        self.assertEqual(position['total'], Decimal('19'))
+        self.assertEqual(len(position), 10)
+        self.assertEqual(position, dict(position))
+        self.assertEqual(position.keys()[-1], 'mark_code')
+
+    def test_explicit_none(self):
+        position = self.make_position(id=1)
+        position['id'] = None
+        position['excise'] = None
+        self.assertIn('id', position)
+        self.assertIsNone(position['id'])
+        self.assertEqual(position.keys()[-2:], ['id', 'excise'])
+        self.assertEqual(json.loads(JSONSerializer().dumps(position))['id'], None)
+        self.assertEqual(position.copy(), dict(position))
+
+        position['id'] = 2
+        self.assertEqual(position.keys()[-3:], ['vat', 'id', 'excise'])
+        self.assertEqual(position['id'], 2)
+        self.assertNotIn('id', self.make_position())
+
+    def test_copy(self):
+        position = self.make_position()
+        position.set_mark_code(type=MarkTypes.EAN13, code='1')
+        copy = position.copy()
+        copy.update({'total': 1, 'mark_quantity': {'numerator': 1, 'denominator': 2}})
+        self.assertIsInstance(copy, Position)
+        self.assertEqual(position['total'], Decimal('20.20'))
+        self.assertNotIn('mark_quantity', position)
+        self.assertEqual(copy['mark_code'], position['mark_code'])
+
+    def test_add_position_without_copy(self):
+        check = Check(oid=1, intent=Intent.SELL)
+        position = self.make_position()
+        check.add_position(position)
+        self.assertIs(check['positions'][0], position)
+
+    def test_apply_discount_to_shared_position(self):
+        position = self.make_position()
+        first = Check(oid=1, intent=Intent.SELL)
+        second = Check(oid=2, intent=Intent.SELL)
+        for check in (first, second):
+            check.add_position(position)
+            check.add_position(self.make_position())
+
+        first.apply_discount(Decimal('2.00'))
+        self.assertEqual([item['total'] for item in first['positions']],
+                         [Decimal('19.20'), Decimal('19.20')])
+        self.assertIs(second['positions'][0], position)
+        self.assertEqual(position['total'], Decimal('20.20'))
+
+        # Скопированные позиции чека изменяются уже на месте
+        owned = first['positions'][0]
+        first.apply_discount(Decimal('2.00'))
+        self.assertIs(first['positions'][0], owned)
+        self.assertEqual(owned['total'], Decimal('18.20'))
+        self.assertEqual(position['total'], Decimal('20.20'))
+
+    def test_apply_discount_to_repeated_position(self):
+        check = Check(oid=1, intent=Intent.SELL)
+        position = self.make_position()
+        check.add_position(position)
+        check.add_position(position)
+
+        check.apply_discount(Decimal('2.00'))
+        first, second = check['positions']
+        self.assertIsNot(first, second)
+        self.assertEqual([first['total'], second['total']], [Decimal('19.20'), Decimal('19.20')])
+        self.assertEqual(position['total'], Decimal('20.20'))
+
+        check.add_position(first)
+        check.apply_discount(Decimal('3.00'))
+        self.assertEqual([item['total'] for item in check['positions']],
+                         [Decimal('18.20'), Decimal('18.20'), Decimal('18.20')])
+
+    def test_correction_positions(self):
+        check = Check(oid=1, intent=Intent.SELL)
+        check.add_position(self.make_position(total=Decimal('20.19')))
+        check.apply_correction_positions()
+        self.assertEqual([type(position) for position in check['positions']], [Position] * 2)
+        self.assertEqual([position['total'] for position in check['positions']],
+                         [Decimal('10.09'), Decimal('10.10')])
+
+    def test_serialization(self):
+        check = Check(oid=1, intent=Intent.SELL)
+        position = self.make_position(id=1)
+        position.set_mark_code(type=MarkTypes.EAN13, code='1')
+        check.add_position(position)
+        as_dicts = dict(check)
+        as_dicts['positions'] = [dict(position) for position in check['positions']]
+
+        serializers = [JSONSerializer(), JSONSerializer(exact_decimal=True)]
+        if orjson is not None:
+            serializers += [OrjsonSerializer(), OrjsonSerializer(exact_decimal=True)]
+        for serializer in serializers:
+            self.assertEqual(serializer.dumps(dict(check)), serializer.dumps(as_dicts))
+        self.assertEqual(json_encode(dict(check)), json_encode(as_dicts))
+
+
+class TestSerializeWithoutCopy(TestCase):
+    def make_check(self):
+        check = Check(oid=1, intent=Intent.SELL)
+        check.set_client(email='client@client.ru')
+        position = Position(name='Товар', price=Decimal('10.10'), quantity=2,
+                            measure=MeasureTypes.PIECE, payment_method=PaymentMethod.FULL_PAYMENT,
+                            payment_object=PaymentObject.PRODUCT, vat=VatRate.RATE_20, excise=1)
+        position.set_mark_code(type=MarkTypes.EAN13, code='1')
+        check.add_position(position)
+        check.add_payment(Decimal('20.20'))
+        return check
+
+    def assertSameJSON(self, first, second):
+        # На Python 2 порядок ключей словаря произвольный, сравнивается содержимое
+        if str is bytes:
+            self.assertEqual(json.loads(first), json.loads(second))
+        else:
+            self.assertEqual(first, second)
+
+    def test_asdict_returns_data_without_copy(self):
+        check = self.make_check()
+        self.assertIs(check._asdict(), check._asdict())
+        self.assertEqual(check._asdict(), dict(check))
+        self.assertIs(check._asdict()['positions'], check['positions'])
+
+    def test_dict_contains_position_dicts(self):
+        for check in [Check(oid=1, intent=Intent.SELL),
+                      CorrectionCheck(2, Intent.SELL_CORRECTION)]:
+            position = Position(name='Товар', price=10, quantity=2, measure=MeasureTypes.PIECE,
+                                payment_method=PaymentMethod.FULL_PAYMENT,
+                                payment_object=PaymentObject.PRODUCT, vat=VatRate.RATE_20)
+            position.set_mark_code(type=MarkTypes.EAN13, code='1')
+            check.add_position(position)
+            data = dict(check)
+            self.assertEqual([type(item) for item in data['positions']], [dict])
+            self.assertEqual(json.loads(json.dumps(data))['positions'],
+                             json.loads(json.dumps([dict(position)])))
+            self.assertIs(check._asdict()['positions'][0], position)
+
+    def test_same_bytes_as_dict(self):
+        check = self.make_check()
+        as_dicts = dict(check)
+        as_dicts['positions'] = [dict(position) for position in check['positions']]
+
+        serializers = [JSONSerializer(), JSONSerializer(exact_decimal=True)]
+        if orjson is not None:
+            serializers += [OrjsonSerializer(), OrjsonSerializer(exact_decimal=True)]
+        for serializer in serializers:
+            self.assertSameJSON(serializer.dumps(check), serializer.dumps(as_dicts))
+            self.assertSameJSON(serializer.dumps([check, check]),
+                                serializer.dumps([as_dicts, as_dicts]))
+        self.assertSameJSON(json_encode(check), json_encode(as_dicts))
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from komtet_kassa_sdk.v2 import (CircuitBreaker, CircuitOpenError, CircuitState, Client,
+                                 RetryPolicy)
+from mock import patch
+from requests.exceptions import ConnectTimeout, HTTPError, ReadTimeout
+
+from ..retry.test import StatusResponseMock
+
+
+class TestCircuitBreaker(TestCase):
+    def setUp(self):
+        self.now = 100.0
+        patcher = patch('komtet_kassa_sdk.v2.circuit.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.transitions = []
+        self.breaker = CircuitBreaker(
+            failure_threshold=3, recovery_timeout=10,
+            on_state_change=lambda breaker, old, new: self.transitions.append((old, new)))
+
+    def fail(self):
+        def send():
+            raise ReadTimeout('timeout')
+
+        with self.assertRaises(ReadTimeout):
+            self.breaker.call(send)
+
+    def test_open_after_threshold(self):
+        self.fail()
+        self.fail()
+        self.breaker.call(lambda: StatusResponseMock(200))
+        self.assertEqual(self.breaker.failure_count, 0)
+
+        self.fail()
+        self.fail()
+        self.assertEqual(self.breaker.call(lambda: StatusResponseMock(503)).status_code, 503)
+        self.assertEqual(self.breaker.state, CircuitState.OPEN)
+        self.assertEqual(self.transitions, [(CircuitState.CLOSED, CircuitState.OPEN)])
+
+        calls = []
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(lambda: calls.append(1))
+        self.assertEqual(calls, [])
+        self.assertEqual(self.breaker.get_status(),
+                         {'state': CircuitState.OPEN, 'failures': 3, 'retry_in': 10})
+
+    def test_client_errors_are_not_failures(self):
+        for _ in range(5):
+            self.breaker.call(lambda: StatusResponseMock(404))
+        self.assertEqual(self.breaker.state, CircuitState.CLOSED)
+
+    def test_half_open(self):
+        for _ in range(3):
+            self.fail()
+
+        self.now += 10
+        self.assertEqual(self.breaker.state, CircuitState.HALF_OPEN)
+        self.assertEqual(self.breaker.get_status()['state'], CircuitState.HALF_OPEN)
+
+        # Пока выполняется пробный запрос, остальные отклоняются
+        def probe():
+            with self.assertRaises(CircuitOpenError):
+                self.breaker.call(lambda: StatusResponseMock(200))
+            return StatusResponseMock(200)
+
+        self.breaker.call(probe)
+        self.assertEqual(self.breaker.state, CircuitState.CLOSED)
+        self.assertEqual(self.transitions, [
+            (CircuitState.CLOSED, CircuitState.OPEN),
+            (CircuitState.OPEN, CircuitState.HALF_OPEN),
+            (CircuitState.HALF_OPEN, CircuitState.CLOSED)
+        ])
+
+    def test_half_open_failure(self):
+        for _ in range(3):
+            self.fail()
+        self.now += 10
+        self.fail()
+        self.assertEqual(self.breaker.state, CircuitState.OPEN)
+        self.assertEqual(self.breaker.get_status()['retry_in'], 10)
+
+        self.breaker.reset()
+        self.assertEqual(self.breaker.state, CircuitState.CLOSED)
+        self.assertEqual(self.breaker.failure_count, 0)
+
+    def test_invalid_threshold(self):
+        with self.assertRaises(ValueError):
+            CircuitBreaker(failure_threshold=0)
+
+
+class TestClientCircuitBreaker(TestCase):
+    def test_fail_fast(self):
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+        client = Client('shop-id', 'secret-key').set_circuit_breaker(breaker)
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.side_effect = ConnectTimeout('connect timeout')
+            for _ in range(2):
+                with self.assertRaises(ConnectTimeout):
+                    client.get_task_info(1)
+            with self.assertRaises(CircuitOpenError):
+                client.get_task_info(1)
+            self.assertEqual(session.get.call_count, 2)
+
+    def test_retry_stops_on_open_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+        client = Client('shop-id', 'secret-key').set_circuit_breaker(breaker)
+        client.set_retry_policy(RetryPolicy(max_attempts=5, jitter=False))
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session, \
+                patch('komtet_kassa_sdk.v2.retry.time.sleep'):
+            session = Session.return_value
+            session.get.return_value = StatusResponseMock(502)
+            with self.assertRaises(CircuitOpenError):
+                client.get_task_info(1)
+            self.assertEqual(session.get.call_count, 2)
+
+    def test_timeout(self):
+        client = Client('shop-id', 'secret-key').set_timeout(connect=1, read=2)
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.return_value = StatusResponseMock(500)
+            with self.assertRaises(HTTPError):
+                client.get_task_info(1)
+            self.assertEqual(session.get.call_args[1]['timeout'], (1, 2))
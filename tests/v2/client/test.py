@@ -2,21 +2,38 @@
 from decimal import Decimal
 from unittest import TestCase
 
-from komtet_kassa_sdk.v2 import (Client, EmployeeType, Task, TaskInfo, Order)
+try:
+    from urllib.parse import parse_qs, urlparse
+except ImportError:  # Python 2
+    from urlparse import parse_qs, urlparse
+
+from komtet_kassa_sdk.v2 import (Check, Client, EmployeeInfo, EmployeeType, Intent, Order,
+                                 OrderInfo, Task, TaskInfo)
 from ...helpers.mock import ResponseMock, ResponseListMock
 from mock import patch
 
 
+class SerializerMock(object):
+    def __init__(self):
+        self.objects = []
+
+    def dumps(self, obj):
+        self.objects.append(obj)
+        return b'{}'
+
+
 class TestClient(TestCase):
     def setUp(self):
         self.client = Client('shop-id', 'secret-key')
 
     def test_is_queue_active(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
-            requests.get.return_value = ResponseMock(state='active')
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.return_value = ResponseMock(state='active')
             self.assertTrue(self.client.is_queue_active(1))
-            requests.get.assert_called_with(
+            session.get.assert_called_with(
                 allow_redirects=True,
+                timeout=(5.0, 30.0),
                 headers={
                     'Authorization': 'shop-id',
                     'Accept': 'application/json',
@@ -26,10 +43,11 @@ class TestClient(TestCase):
             )
 
             self.assertIs(self.client, self.client.set_host('new-host'))
-            requests.get.return_value = ResponseMock(state='passive')
+            session.get.return_value = ResponseMock(state='passive')
             self.assertFalse(self.client.is_queue_active(1))
-            requests.get.assert_called_with(
+            session.get.assert_called_with(
                 allow_redirects=True,
+                timeout=(5.0, 30.0),
                 headers={
                     'Authorization': 'shop-id',
                     'Accept': 'application/json',
@@ -44,8 +62,9 @@ class TestClient(TestCase):
 
             self.client.set_default_queue(2)
             self.assertFalse(self.client.is_queue_active())
-            requests.get.assert_called_with(
+            session.get.assert_called_with(
                 allow_redirects=True,
+                timeout=(5.0, 30.0),
                 headers={
                     'Authorization': 'shop-id',
                     'Accept': 'application/json',
@@ -55,24 +74,26 @@ class TestClient(TestCase):
             )
 
     def test_create_task_success(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
             response_mock = ResponseMock(id=1, external_id=2, print_queue_id=3, state='new')
-            requests.post.return_value = response_mock
+            session.post.return_value = response_mock
             task = self.client.create_task({'key': Decimal('10.0')}, 3)
             self.assertIsInstance(task, Task)
             self.assertEqual(task.id, 1)
             self.assertEqual(task.external_id, 2)
             self.assertEqual(task.print_queue_id, 3)
             self.assertEqual(task.state, 'new')
-            requests.post.assert_called_with(
+            session.post.assert_called_with(
+                timeout=(5.0, 30.0),
                 headers={
                     'Authorization': 'shop-id',
                     'Accept': 'application/json',
-                    'X-HMAC-Signature': 'd5aa2f6177ba2f4f94218ed9587454be',
+                    'X-HMAC-Signature': '834d2372b9d075cec87bbac59268fd15',
                     'Content-Type': 'application/json'
                 },
                 url='https://kassa.komtet.ru/api/shop/v2/queues/3/task',
-                data='{"key": 10.0}'
+                data=b'{"key":10.0}'
             )
 
             with self.assertRaises(ValueError) as ctx:
@@ -84,8 +105,26 @@ class TestClient(TestCase):
                 self.client.create_task({'key': object()})
             self.assertIn('is not JSON serializable', ctx.exception.args[0])
 
+    def test_create_tasks_passes_checks_without_copy(self):
+        check = Check(oid=1, intent=Intent.SELL)
+        check.add_payment(10)
+        serializer = SerializerMock()
+        self.client.set_serializer(serializer)
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.post.return_value = ResponseMock(id=1, external_id=1, print_queue_id=3,
+                                                     state='new')
+            self.client.create_task(check, 3)
+            self.assertIs(serializer.objects[-1], check)
+
+            session.post.return_value = ResponseMock()
+            self.client.create_tasks([check, check], 3)
+            self.assertEqual(serializer.objects[-1], [check, check])
+            self.assertIs(serializer.objects[-1][0], check)
+
     def test_get_task_info_success(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
             response_mock = ResponseMock(
                 id=234, external_id='4321', state='done', error_description=None,
                 fiscal_data={
@@ -96,7 +135,7 @@ class TestClient(TestCase):
                     'fp': '555555555',
                     's': '6666.77'
                 })
-            requests.get.return_value = response_mock
+            session.get.return_value = response_mock
             task_info = self.client.get_task_info(234)
             self.assertIsInstance(task_info, TaskInfo)
             self.assertEqual(task_info.id, 234)
@@ -113,7 +152,8 @@ class TestClient(TestCase):
             })
 
     def test_get_couriers_success(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
             response_mock = ResponseMock(
                 account_employees=[
                     {
@@ -136,7 +176,7 @@ class TestClient(TestCase):
                     }],
                 meta={'total': 3, 'total_pages': 1}
             )
-            requests.get.return_value = response_mock
+            session.get.return_value = response_mock
             couriers_info = self.client.get_employees(type=EmployeeType.COURIER)
             self.assertDictEqual(couriers_info['meta'], {'total': 3, 'total_pages': 1})
             self.assertDictEqual(couriers_info['account_employees'][0], {
@@ -159,7 +199,8 @@ class TestClient(TestCase):
             })
 
     def test_get_orders_success(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
             expected = {
                 'orders': [
                     {
@@ -220,14 +261,15 @@ class TestClient(TestCase):
             }
 
             response_mock = ResponseListMock(expected)
-            requests.get.return_value = response_mock
+            session.get.return_value = response_mock
             response = self.client.get_orders(0, 10, 70, '2020-12-08 10:00')
 
             self.assertDictEqual(response, expected)
             self.assertEqual(response['meta']['total'], 2)
 
     def test_delete_orders_success(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
             expected = {
                 'text': None,
                 'content': b'',
@@ -242,13 +284,14 @@ class TestClient(TestCase):
             }
 
             response_mock = ResponseListMock(expected)
-            requests.get.return_value = response_mock
+            session.get.return_value = response_mock
             isDeleted = self.client.delete_order(25)
 
             self.assertEqual(isDeleted, True)
 
     def test_get_employee_success(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
             expected = {
                 'id': 71,
                 'name': 'Пупкин',
@@ -263,7 +306,152 @@ class TestClient(TestCase):
             }
 
             response_mock = ResponseListMock(expected)
-            requests.get.return_value = response_mock
+            session.get.return_value = response_mock
             response = self.client.get_employee_info(71)
 
             self.assertDictEqual(dict(response), expected)
+
+
+class TestClientSession(TestCase):
+    def test_session_is_shared_between_requests(self):
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.return_value = ResponseMock(state='active')
+            client = Client('shop-id', 'secret-key', pool_connections=2, pool_maxsize=20)
+            self.assertTrue(client.is_queue_active(1))
+            self.assertTrue(client.is_queue_active(2))
+            self.assertEqual(Session.call_count, 1)
+            self.assertEqual(session.get.call_count, 2)
+
+            self.assertEqual(session.mount.call_count, 2)
+            adapter = session.mount.call_args[0][1]
+            self.assertEqual(adapter._pool_connections, 2)
+            self.assertEqual(adapter._pool_maxsize, 20)
+
+    def test_close(self):
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.return_value = ResponseMock(state='active')
+            client = Client('shop-id', 'secret-key')
+            client.close()
+            session.close.assert_not_called()
+
+            client.is_queue_active(1)
+            client.close()
+            session.close.assert_called_once_with()
+
+            client.is_queue_active(1)
+            self.assertEqual(Session.call_count, 2)
+
+    def test_context_manager(self):
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.return_value = ResponseMock(state='active')
+            with Client('shop-id', 'secret-key', keep_alive=False) as client:
+                client.is_queue_active(1)
+            session.close.assert_called_once_with()
+            session.headers.__setitem__.assert_called_with('Connection', 'close')
+
+
+class TestPagination(TestCase):
+    def setUp(self):
+        self.client = Client('shop-id', 'secret-key')
+
+    @staticmethod
+    def make_get(key, items, max_limit=None):
+        def get(url, headers, allow_redirects, timeout):
+            query = parse_qs(urlparse(url).query)
+            start, limit = int(query['start'][0]), int(query['limit'][0])
+            if max_limit is not None:
+                limit = min(limit, max_limit)
+            return ResponseListMock({
+                key: items[start:start + limit],
+                'meta': {'total': len(items), 'total_pages': (len(items) + limit - 1) // limit}
+            })
+        return get
+
+    def test_iter_orders(self):
+        orders = [{'id': idx, 'external_id': str(idx)} for idx in range(25)]
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.side_effect = self.make_get('orders', orders)
+
+            iterator = self.client.iter_orders(courier_id=70, page_size=10)
+            session.get.assert_not_called()
+            first = next(iterator)
+            self.assertIsInstance(first, OrderInfo)
+            self.assertEqual(first.id, 0)
+            self.assertEqual(session.get.call_count, 1)
+
+            result = [first] + list(iterator)
+            self.assertEqual([order.id for order in result], list(range(25)))
+            self.assertEqual(session.get.call_count, 3)
+            self.assertEqual(
+                [call[1]['url'] for call in session.get.call_args_list],
+                ['https://kassa.komtet.ru/api/shop/v2/orders?start=%s&limit=10&courier_id=70'
+                 % start for start in (0, 10, 20)]
+            )
+
+    def test_iter_orders_prefetch(self):
+        orders = [{'id': idx} for idx in range(20)]
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.side_effect = self.make_get('orders', orders)
+
+            result = list(self.client.iter_orders(page_size=10, prefetch=True))
+            self.assertEqual([order.id for order in result], list(range(20)))
+            self.assertEqual(session.get.call_count, 2)
+
+    def test_iter_orders_limit_capped_by_server(self):
+        orders = [{'id': idx} for idx in range(25)]
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.side_effect = self.make_get('orders', orders, max_limit=10)
+
+            result = list(self.client.iter_orders(page_size=50))
+            self.assertEqual([order.id for order in result], list(range(25)))
+            self.assertEqual(
+                [call[1]['url'] for call in session.get.call_args_list],
+                ['https://kassa.komtet.ru/api/shop/v2/orders?start=%s&limit=50' % start
+                 for start in (0, 10, 20)]
+            )
+
+    def test_iter_employees(self):
+        employees = [{'id': idx, 'name': 'Курьер %s' % idx} for idx in range(3)]
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.side_effect = self.make_get('account_employees', employees)
+
+            result = list(self.client.iter_employees(type=EmployeeType.COURIER, page_size=2,
+                                                     prefetch=True))
+            self.assertEqual([employee.id for employee in result], [0, 1, 2])
+            self.assertIsInstance(result[0], EmployeeInfo)
+            self.assertEqual(session.get.call_count, 2)
+            self.assertEqual(
+                session.get.call_args[1]['url'],
+                'https://kassa.komtet.ru/api/shop/v2/employees?start=2&limit=2&type=courier'
+            )
+
+    def test_iter_empty(self):
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.side_effect = self.make_get('orders', [])
+            self.assertEqual(list(self.client.iter_orders()), [])
+            self.assertEqual(session.get.call_count, 1)
+
+
+class TestSignature(TestCase):
+    def test_signature_matches_joined_request(self):
+        import hashlib
+        import hmac
+
+        client = Client('shop-id', 'secret-key')
+        url, headers, data = client._prepare_request('POST', '/api/shop/v2/orders',
+                                                     {'name': 'Пицца'})
+        self.assertIsInstance(data, bytes)
+        expected = hmac.new(b'secret-key', ('POST' + url + data.decode('utf-8')).encode('utf-8'),
+                            hashlib.md5).hexdigest()
+        self.assertEqual(headers['X-HMAC-Signature'], expected)
+        # Подпись не зависит от предыдущих вычислений
+        self.assertEqual(client._prepare_request('POST', '/api/shop/v2/orders',
+                                                 {'name': 'Пицца'})[1], headers)
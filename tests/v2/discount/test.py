@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import copy
+import decimal
+import random
+from decimal import Decimal
+from unittest import TestCase, skipIf
+
+from komtet_kassa_sdk.v2 import (Check, Intent, MeasureTypes, PaymentMethod, PaymentObject,
+                                 Position, VatRate)
+from komtet_kassa_sdk.v2.lib import discount
+from komtet_kassa_sdk.v2.lib.discount import apply_discounts
+from komtet_kassa_sdk.v2.lib.helpers import apply_discount
+
+
+def make_total(rnd, kind):
+    if kind == 'decimal':
+        return Decimal(rnd.randint(1, 10 ** rnd.randint(1, 8))) / 100
+    if kind == 'int':
+        return rnd.randint(1, 10 ** rnd.randint(1, 6))
+    if kind == 'float':
+        return rnd.randint(1, 10 ** rnd.randint(1, 7)) / 100.0
+    return rnd.choice([Decimal('0.005'), Decimal('1E+2'), Decimal('-10.00'), Decimal('10.1234')])
+
+
+def make_discount(rnd, kind):
+    if kind == 'decimal':
+        return Decimal(rnd.randint(0, 10 ** rnd.randint(1, 6))) / 100
+    return rnd.randint(0, 10 ** rnd.randint(1, 4))
+
+
+def make_baskets(seed, count=50):
+    rnd = random.Random(seed)
+    discounts, baskets = [], []
+    for _ in range(count):
+        kind = rnd.choice(['decimal', 'decimal', 'int', 'float', 'odd'])
+        size = rnd.choice([1, 2, 3, 7, rnd.randint(1, 300)])
+        if rnd.random() < 0.3:
+            # Одинаковые суммы позиций дают доли скидки ровно в половину копейки
+            totals = [make_total(rnd, kind)] * size
+        else:
+            totals = [make_total(rnd, kind) for _ in range(size)]
+        discounts.append(make_discount(rnd, rnd.choice(['decimal', 'int'])))
+        baskets.append([{'total': total} for total in totals])
+    return discounts, baskets
+
+
+def apply_reference(discounts, baskets):
+    results = []
+    for value, items in zip(discounts, baskets):
+        try:
+            apply_discount(value, items)
+        except Exception as exc:
+            results.append(type(exc))
+        else:
+            results.append(None)
+    return results
+
+
+def apply_batch(discounts, baskets, use_numpy):
+    results = []
+    for value, items in zip(discounts, baskets):
+        try:
+            apply_discounts([value], [items], use_numpy=use_numpy)
+        except Exception as exc:
+            results.append(type(exc))
+        else:
+            results.append(None)
+    return results
+
+
+def totals(baskets):
+    return [[(item['total'], repr(item['total'])) for item in items] for items in baskets]
+
+
+class TestApplyDiscounts(TestCase):
+    def assertSameAsReference(self, discounts, baskets, use_numpy):
+        expected = copy.deepcopy(baskets)
+        errors = apply_reference(discounts, expected)
+        if any(errors):
+            self.assertEqual(apply_batch(discounts, baskets, use_numpy), errors)
+        else:
+            apply_discounts(discounts, baskets, use_numpy=use_numpy)
+        self.assertEqual(totals(baskets), totals(expected))
+
+    def test_same_as_apply_discount(self):
+        for seed in range(40):
+            discounts, baskets = make_baskets(seed)
+            self.assertSameAsReference(discounts, baskets, use_numpy=False)
+
+    @skipIf(discount.numpy is None, 'numpy is not installed')
+    def test_same_as_apply_discount_numpy(self):
+        for seed in range(40):
+            discounts, baskets = make_baskets(seed)
+            self.assertSameAsReference(discounts, baskets, use_numpy=True)
+
+    def test_half_cent_shares(self):
+        for use_numpy in ([False, True] if discount.numpy is not None else [False]):
+            for value in [Decimal('0.01'), 1, Decimal('0.03'), Decimal('0.05'), 3]:
+                for size in range(2, 12):
+                    for total in [Decimal('1.00'), Decimal('0.50'), Decimal('10'), 2, 0.5]:
+                        baskets = [[{'total': total} for _ in range(size)]]
+                        self.assertSameAsReference([value], baskets, use_numpy)
+
+    def test_remainder_goes_to_last_item(self):
+        items = [{'total': Decimal('10.00')} for _ in range(3)]
+        apply_discounts([Decimal('1.00')], [items])
+        self.assertEqual([item['total'] for item in items],
+                         [Decimal('9.67'), Decimal('9.67'), Decimal('9.66')])
+
+    def test_fallback(self):
+        # Float-скидка для нескольких позиций приводит к ошибке, как и в apply_discount
+        items = [{'total': 10.0}, {'total': 20.0}]
+        with self.assertRaises(TypeError):
+            apply_discounts([1.5], [items])
+
+        item = {'total': Decimal('10.00')}
+        items = [item, {'total': Decimal('5.00')}, item]
+        expected = copy.deepcopy(items)
+        apply_discount(Decimal('3.00'), expected)
+        apply_discounts([Decimal('3.00')], [items])
+        self.assertEqual(totals([items]), totals([expected]))
+
+        for value in [Decimal('-Infinity'), Decimal('1.005'), Decimal('1E+3'), Decimal('-0')]:
+            self.assertSameAsReference([Decimal('1.00')], [[{'total': value},
+                                                           {'total': Decimal('2.00')}]], False)
+
+    def test_decimal_context(self):
+        items = [{'total': Decimal('1.00')} for _ in range(2)]
+        expected = copy.deepcopy(items)
+        with decimal.localcontext() as context:
+            context.rounding = decimal.ROUND_HALF_UP
+            apply_discount(Decimal('0.01'), expected)
+            apply_discounts([Decimal('0.01')], [items])
+        self.assertEqual(totals([items]), totals([expected]))
+        self.assertEqual(items[0]['total'], Decimal('0.99'))
+
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            apply_discounts([1, 2], [[]])
+        with self.assertRaises(ImportError):
+            original, discount.numpy = discount.numpy, None
+            try:
+                apply_discounts([1], [[{'total': 1}]], use_numpy=True)
+            finally:
+                discount.numpy = original
+
+    def test_check_apply_discount(self):
+        check = Check(oid=1, intent=Intent.SELL)
+        for price in [Decimal('10.10'), Decimal('20.20'), Decimal('30.30')]:
+            check.add_position(Position(name='Товар', price=price, quantity=1,
+                                        measure=MeasureTypes.PIECE, vat=VatRate.RATE_20,
+                                        payment_method=PaymentMethod.FULL_PAYMENT,
+                                        payment_object=PaymentObject.PRODUCT))
+        check.apply_discount(Decimal('10.00'))
+        self.assertEqual([position['total'] for position in check['positions']],
+                         [Decimal('8.43'), Decimal('16.87'), Decimal('25.30')])
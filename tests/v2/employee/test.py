@@ -15,8 +15,9 @@ class TestEmployee(TestCase):
             password='test_password', pos_id='POS_KEY')
 
     def test_create_order_success(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
-            requests.post.return_value = self.response_mock
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.post.return_value = self.response_mock
 
             employee = Employee(type=EmployeeType.CASHIER, name='Ivanov Ivan Ivanovich',
                                 login='test_login', password='test_password', pos_id='POS_KEY')
@@ -30,8 +31,9 @@ class TestEmployee(TestCase):
             self.assertEqual(employee_info.pos_id, 'POS_KEY')
 
     def test_update_order_success(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
-            requests.put.return_value = self.response_mock
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.put.return_value = self.response_mock
 
             employee = Employee(type=EmployeeType.CASHIER, name='Ivanov Ivan Ivanovich',
                                 login='test_login', password='test_password', pos_id='POS_KEY')
@@ -45,8 +47,9 @@ class TestEmployee(TestCase):
             self.assertEqual(employee_info.pos_id, 'POS_KEY')
 
     def test_delete_order_success(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
-            requests.delete.return_value = ResponseMock()
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.delete.return_value = ResponseMock()
 
             result = self.client.delete_employee(1)
             self.assertEqual(result, True)
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+import random
+import time
+from decimal import Decimal
+from unittest import TestCase
+
+import requests
+from komtet_kassa_sdk import v1
+from komtet_kassa_sdk.fake_server import FakeServer, FakeServerProcess, parse_latency
+from komtet_kassa_sdk.v2 import (Check, Client, Employee, EmployeeType, Intent, MeasureTypes,
+                                 Order, PaymentMethod, PaymentObject, PaymentType, Position,
+                                 RetryPolicy, VatRate)
+from mock import patch
+from requests.exceptions import HTTPError
+
+
+def make_check(oid):
+    check = Check(oid, Intent.SELL)
+    check.add_position(Position(name='Товар', price=Decimal('10.50'), quantity=2,
+                                measure=MeasureTypes.PIECE, vat=VatRate.RATE_20,
+                                payment_method=PaymentMethod.FULL_PAYMENT,
+                                payment_object=PaymentObject.PRODUCT))
+    check.add_payment(Decimal('21.00'), PaymentType.CARD)
+    return check
+
+
+def make_order(oid, courier_id=None):
+    order = Order(oid, 'new')
+    order.set_client('Москва', '+79990000000', 'client@client.ru', 'Иванов Иван')
+    order.set_delivery_time('01.01.2026 10:00', '01.01.2026 12:00')
+    if courier_id:
+        order.set_courier_id(courier_id)
+    return order
+
+
+class TestFakeServer(TestCase):
+    def setUp(self):
+        self.server = FakeServer(shops={'shop-id': 'secret-key'}, processing_time=0.4).start()
+        self.addCleanup(self.server.stop)
+        self.client = Client('shop-id', 'secret-key').set_host(self.server.url)
+        self.client.set_default_queue(7)
+        self.addCleanup(self.client.close)
+
+    def test_tasks(self):
+        self.assertTrue(self.client.is_queue_active())
+
+        task = self.client.create_task(make_check('1'))
+        self.assertEqual((task.external_id, task.state), ('1', 'new'))
+        # Повторная постановка чека возвращает ту же задачу
+        self.assertEqual(self.client.create_task(make_check('1')).id, task.id)
+
+        tasks = self.client.create_tasks([make_check('2'), make_check('3')])
+        self.assertEqual(sorted(task.external_id for task in tasks), ['2', '3'])
+        result = self.client.create_tasks_bulk([make_check(str(idx)) for idx in range(10)],
+                                               chunk_size=3)
+        self.assertTrue(result.ok)
+        self.assertEqual(result['1'].id, task.id)
+
+        task = self.client.create_task(make_check('new'))
+        time.sleep(0.25)
+        self.assertEqual(self.client.get_task_info(task.id).state, 'processing')
+        time.sleep(0.2)
+        info = self.client.get_task_info(task.id)
+        self.assertEqual(info.state, 'done')
+        self.assertEqual(info.fiscal_data['s'], '21.00')
+
+        with self.assertRaises(HTTPError) as ctx:
+            self.client.get_task_info(100500)
+        self.assertEqual(ctx.exception.response.status_code, 404)
+
+    def test_task_errors(self):
+        server = FakeServer(processing_time=0, task_error_rate=1).start()
+        self.addCleanup(server.stop)
+        client = Client('shop-id', 'secret-key').set_host(server.url)
+        info = client.get_task_info(client.create_task(make_check('1'), 1).id)
+        self.assertEqual(info.state, 'error')
+        self.assertTrue(info.error_description)
+
+    def test_orders(self):
+        created = [self.client.create_order(make_order(str(idx), courier_id=idx % 2 + 1))
+                   for idx in range(5)]
+        self.assertEqual([order.external_id for order in created], ['0', '1', '2', '3', '4'])
+        self.assertEqual(created[0].state, 'new')
+
+        page = self.client.get_orders(start=1, limit=2)
+        self.assertEqual([order['external_id'] for order in page['orders']], ['1', '2'])
+        self.assertEqual(page['meta']['total'], 5)
+        self.assertEqual([order.external_id for order in self.client.iter_orders(page_size=2)],
+                         ['0', '1', '2', '3', '4'])
+        self.assertEqual(len(self.client.get_orders(courier_id=2)['orders']), 2)
+
+        oid = created[2].id
+        self.assertEqual(self.client.update_order(oid, make_order('new')).external_id, 'new')
+        self.assertEqual(self.client.get_order_info(oid).external_id, 'new')
+        self.assertTrue(self.client.delete_order(oid))
+        with self.assertRaises(HTTPError):
+            self.client.get_order_info(oid)
+
+    def test_employees(self):
+        for idx, type in enumerate([EmployeeType.COURIER, EmployeeType.CASHIER,
+                                    EmployeeType.COURIER]):
+            employee = Employee(type, 'Сотрудник %s' % idx, 'login%s' % idx, 'password', 'pos')
+            self.client.create_employee(employee)
+
+        employees = list(self.client.iter_employees(type=EmployeeType.COURIER, page_size=1))
+        self.assertEqual([employee.name for employee in employees],
+                         [u'Сотрудник 0', u'Сотрудник 2'])
+
+        eid = employees[0].id
+        employee = Employee(EmployeeType.COURIER, 'Новое имя', 'login', 'password', 'pos')
+        self.assertEqual(self.client.update_employee(eid, employee).name, u'Новое имя')
+        self.assertEqual(self.client.get_employee_info(eid).name, u'Новое имя')
+        self.assertTrue(self.client.delete_employee(eid))
+        self.assertEqual(self.client.get_employees()['meta']['total'], 2)
+
+    def test_signature(self):
+        for client in [Client('shop-id', 'wrong-key'), Client('unknown', 'secret-key')]:
+            client.set_host(self.server.url)
+            with self.assertRaises(HTTPError) as ctx:
+                client.create_task(make_check('1'), 1)
+            self.assertEqual(ctx.exception.response.status_code, 401)
+
+        response = requests.post(self.server.url + '/api/shop/v2/queues/1/task', data=b'{}',
+                                 headers={'Authorization': 'shop-id'})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.server.get_stats(), {401: 3})
+
+        server = FakeServer(verify_signature=False).start()
+        self.addCleanup(server.stop)
+        client = Client('shop-id', 'wrong-key').set_host(server.url)
+        self.assertTrue(client.is_queue_active(1))
+
+    def test_v1_client(self):
+        client = v1.Client('shop-id', 'secret-key').set_host(self.server.url)
+        check = v1.Check('1', 'client@client.ru', v1.Intent.SELL, v1.TaxSystem.COMMON)
+        check.add_payment(100)
+        task = client.create_task(check, 1)
+        self.assertEqual(task.external_id, '1')
+        self.assertEqual(client.get_task_info(task.id).id, task.id)
+        self.assertTrue(client.is_queue_active(1))
+
+    def test_errors_and_latency(self):
+        server = FakeServer(error_rate=0.5, error_status=502, latency=0.01, seed=1).start()
+        self.addCleanup(server.stop)
+        client = Client('shop-id', 'secret-key').set_host(server.url)
+
+        started = time.time()
+        statuses = []
+        for _ in range(20):
+            try:
+                client.is_queue_active(1)
+                statuses.append(200)
+            except HTTPError as exc:
+                statuses.append(exc.response.status_code)
+        self.assertGreaterEqual(time.time() - started, 0.2)
+        self.assertEqual(set(statuses), {200, 502})
+        self.assertEqual(server.get_stats(), {200: statuses.count(200),
+                                              502: statuses.count(502)})
+
+        with patch('komtet_kassa_sdk.v2.retry.time.sleep'):
+            client.set_retry_policy(RetryPolicy(max_attempts=20))
+            for _ in range(10):
+                self.assertTrue(client.is_queue_active(1))
+
+    def test_rate_limit(self):
+        server = FakeServer(rate_limit=5).start()
+        self.addCleanup(server.stop)
+        client = Client('shop-id', 'secret-key').set_host(server.url)
+        statuses = []
+        for _ in range(10):
+            try:
+                client.is_queue_active(1)
+                statuses.append(200)
+            except HTTPError as exc:
+                statuses.append(exc.response.status_code)
+                self.assertEqual(exc.response.headers['Retry-After'], '1')
+        self.assertEqual(statuses[:5], [200] * 5)
+        self.assertIn(429, statuses)
+
+    def test_parse_latency(self):
+        rnd = random.Random(1)
+        self.assertEqual(parse_latency(0.5)(rnd), 0.5)
+        self.assertEqual(parse_latency('0.5')(rnd), 0.5)
+        self.assertEqual(parse_latency('const:0.25')(rnd), 0.25)
+        self.assertTrue(0.1 <= parse_latency('uniform:0.1,0.2')(rnd) <= 0.2)
+        values = sorted(parse_latency('lognormal:0.05,0.5')(rnd) for _ in range(1001))
+        self.assertAlmostEqual(values[500], 0.05, delta=0.005)
+        self.assertIsNone(parse_latency(None))
+        with self.assertRaises(ValueError):
+            parse_latency('gauss:1,2')
+
+
+class TestFakeServerProcess(TestCase):
+    def test_process(self):
+        with FakeServerProcess(shops={'other-shop': 'key'}, processing_time=0) as server:
+            client = Client('other-shop', 'key').set_host(server.url)
+            task = client.create_task(make_check('1'), 1)
+            self.assertEqual(client.get_task_info(task.id).state, 'done')
+            client.close()
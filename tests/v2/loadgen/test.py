@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from komtet_kassa_sdk import loadgen
+from komtet_kassa_sdk.fake_server import FakeServer
+from komtet_kassa_sdk.loadgen import (LoadGenerator, OperationStats, Workload, format_summary,
+                                      parse_mix)
+from mock import patch
+from requests import HTTPError, Response
+
+
+class TestParseMix(TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_mix('create_task=5, get_task_info=2.5,get_orders'),
+                         {'create_task': 5.0, 'get_task_info': 2.5, 'get_orders': 1.0})
+        self.assertEqual(set(parse_mix(loadgen.DEFAULT_MIX)), set(loadgen.OPERATIONS))
+
+    def test_invalid(self):
+        for spec in ['create_task=5,delete_order=1', 'create_task=many', 'create_task=-1',
+                     'create_task=0,get_orders=0', '']:
+            with self.assertRaises(ValueError):
+                parse_mix(spec)
+
+
+class TestOperationStats(TestCase):
+    def test_summarize(self):
+        response = Response()
+        response.status_code = 503
+        stats = OperationStats()
+        for _ in range(8):
+            stats.record(0.01)
+        stats.record(0.1, HTTPError(response=response))
+        stats.record(0.1, ValueError())
+
+        summary = stats.summarize(2.0)
+        self.assertEqual(summary['count'], 10)
+        self.assertEqual(summary['errors'], 2)
+        self.assertEqual(summary['throughput'], 5.0)
+        self.assertEqual(summary['error_types'], {'HTTPError 503': 1, 'ValueError': 1})
+        self.assertAlmostEqual(summary['p50'], 0.01, delta=0.0002)
+        self.assertAlmostEqual(summary['p99'], 0.1, delta=0.002)
+        self.assertAlmostEqual(summary['mean'], 0.028)
+
+        empty = OperationStats().summarize(1.0)
+        self.assertEqual((empty['count'], empty['p95'], empty['mean']), (0, None, None))
+
+
+class TestLoadGenerator(TestCase):
+    def setUp(self):
+        self.server = FakeServer(shops={'shop-id': 'secret-key'}, processing_time=0.2).start()
+        self.addCleanup(self.server.stop)
+
+    def run_load(self, api, **kwargs):
+        workload = Workload(api, positions=2, batch_size=3)
+        generator = LoadGenerator(
+            workload, lambda: workload.create_client('shop-id', 'secret-key', self.server.url, 1),
+            parse_mix(loadgen.DEFAULT_MIX), seed=1, **kwargs)
+        reports = []
+        result = generator.run(0.6, interval=0.2, report=reports.append)
+        self.assertEqual(reports, result['intervals'])
+        return result
+
+    def test_closed_loop(self):
+        for api in ['v1', 'v2']:
+            result = self.run_load(api, concurrency=2)
+            total = result['total']
+            self.assertGreater(total['count'], 20)
+            self.assertEqual(total['errors'], 0, total['error_types'])
+            self.assertEqual(set(result['operations']), set(loadgen.OPERATIONS))
+            self.assertEqual(sum(item['total']['count'] for item in result['intervals']),
+                             total['count'])
+            self.assertEqual(len(result['intervals']), 3)
+            self.assertGreaterEqual(result['duration'], 0.6)
+            self.assertLessEqual(total['p50'], total['p99'])
+
+        # Все операции отправлены серверу: заказы и задачи обеих версий API созданы
+        stats = self.server.get_stats()
+        self.assertEqual(list(stats), [200])
+
+    def test_rate(self):
+        result = self.run_load('v2', rate=50, concurrency=4)
+        # Операции запускаются по расписанию: 30 запусков за 0.6 сек
+        self.assertIn(result['total']['count'], (30, 31))
+        self.assertAlmostEqual(result['total']['throughput'], 50, delta=10)
+
+    def test_errors(self):
+        self.server.error_rate = 1.0
+        result = self.run_load('v1', concurrency=2)
+        total = result['total']
+        self.assertGreater(total['count'], 0)
+        self.assertEqual(total['errors'], total['count'])
+        self.assertEqual(total['error_types'], {'HTTPError 503': total['count']})
+        # get_task_info без поставленных задач заменяется постановкой задачи
+        self.assertNotIn('get_task_info', result['operations'])
+        self.assertIn('HTTPError 503', format_summary(result))
+
+    def test_invalid(self):
+        workload = Workload()
+        with self.assertRaises(ValueError):
+            LoadGenerator(workload, None, {'create_task': 1}, rate=0)
+        with self.assertRaises(ValueError):
+            LoadGenerator(workload, None, {'create_task': 1}, concurrency=0)
+        with self.assertRaises(ValueError):
+            Workload('v3')
+
+
+class TestMain(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    @patch('komtet_kassa_sdk.loadgen.print', create=True)
+    def test_fake_server(self, print_mock):
+        path = os.path.join(self.path, 'result.json')
+        loadgen.main(['--fake-server', '--fake-latency', '0', '--duration', '0.5',
+                      '--interval', '0.25', '--concurrency', '2', '--api', 'v1',
+                      '--mix', 'create_task=1,get_orders=1', '--json', path])
+
+        with open(path) as fp:
+            result = json.load(fp)
+        self.assertEqual(result['config']['mix'], {'create_task': 1.0, 'get_orders': 1.0})
+        self.assertEqual(set(result['operations']), {'create_task', 'get_orders'})
+        self.assertGreater(result['total']['count'], 0)
+        self.assertEqual(result['total']['errors'], 0)
+        self.assertEqual(len(result['intervals']), 2)
+        output = '\n'.join(call[0][0] for call in print_mock.call_args_list)
+        self.assertIn('Summary', output)
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import random
+import threading
+from unittest import TestCase
+
+from komtet_kassa_sdk.v2 import Client, LatencyHistogram, RequestEvent, RequestMetrics
+from mock import patch
+from requests.exceptions import ConnectionError, HTTPError
+
+from ..retry.test import StatusResponseMock
+
+
+def make_event(method, route, seconds, status=200, error=None):
+    event = RequestEvent(method, route)
+    event.send = seconds
+    event.status = status
+    event.error = error
+    return event
+
+
+class TestLatencyHistogram(TestCase):
+    def test_quantile_accuracy(self):
+        rnd = random.Random(1)
+        values = [rnd.lognormvariate(-4, 1.5) for _ in range(20000)] + [0, 1e-7, 5000.0]
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+
+        values.sort()
+        self.assertEqual(histogram.count, len(values))
+        self.assertAlmostEqual(histogram.sum, sum(values))
+        for q in [0.01, 0.5, 0.9, 0.95, 0.99, 0.999]:
+            expected = values[max(int(-(-q * len(values) // 1)), 1) - 1]
+            self.assertAlmostEqual(histogram.quantile(q), expected, delta=expected * 0.016 + 1e-6)
+        self.assertLessEqual(histogram.quantile(1), 2200)
+
+    def test_merge(self):
+        rnd = random.Random(2)
+        values = [rnd.expovariate(10) for _ in range(1000)]
+        merged, first, second = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for idx, value in enumerate(values):
+            merged.record(value)
+            (first if idx % 3 else second).record(value)
+
+        result = first.copy().merge(second)
+        self.assertEqual(result.counts, merged.counts)
+        self.assertEqual(result.count, 1000)
+        self.assertEqual(first.count + second.count, 1000)
+
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.quantile(0.5))
+        with self.assertRaises(ValueError):
+            histogram.quantile(1.5)
+
+
+class TestRequestMetrics(TestCase):
+    def test_routes(self):
+        metrics = RequestMetrics()
+        for idx in range(100):
+            metrics(make_event('POST', '/api/shop/v2/queues/{qid}/task', (idx + 1) / 1000.0))
+        metrics(make_event('POST', '/api/shop/v2/queues/{qid}/task', 1.0, 503, HTTPError()))
+        metrics(make_event('GET', '/api/shop/v2/orders/{oid}', 0.2, None, ConnectionError()))
+        metrics(make_event('DELETE', '/api/shop/v2/orders/{oid}', 0.4, 204))
+
+        task = metrics.get_route('/api/shop/v2/queues/{qid}/task')
+        self.assertEqual((task.successes, task.errors), (100, 1))
+        self.assertEqual(task.statuses, {200: 100, 503: 1})
+        self.assertAlmostEqual(metrics.quantile('/api/shop/v2/queues/{qid}/task', 0.5),
+                               0.051, delta=0.001)
+        self.assertAlmostEqual(task.quantile(0.99), 0.1, delta=0.002)
+
+        orders = metrics.get_route('/api/shop/v2/orders/{oid}')
+        self.assertEqual(orders.statuses, {None: 1, 204: 1})
+        self.assertEqual(metrics.get_route('/api/shop/v2/orders/{oid}', 'GET').errors, 1)
+        self.assertIsNone(metrics.quantile('/api/shop/v2/employees', 0.5))
+        self.assertEqual(sorted(metrics.get_routes()), [
+            ('DELETE', '/api/shop/v2/orders/{oid}'),
+            ('GET', '/api/shop/v2/orders/{oid}'),
+            ('POST', '/api/shop/v2/queues/{qid}/task'),
+        ])
+
+    def test_threads(self):
+        metrics = RequestMetrics()
+        started = threading.Event()
+        finish = threading.Event()
+
+        def record(count, wait):
+            for _ in range(count):
+                metrics(make_event('GET', '/api/shop/v2/tasks/{task_id}', 0.01))
+            if wait:
+                started.set()
+                finish.wait()
+
+        live = threading.Thread(target=record, args=(5, True))
+        live.start()
+        started.wait()
+        threads = [threading.Thread(target=record, args=(10, False)) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        record(3, False)
+        self.assertEqual(metrics.get_route('/api/shop/v2/tasks/{task_id}').successes, 208)
+        # Наборы завершившихся потоков объединены, остаются наборы живых потоков
+        self.assertEqual(len(metrics._RequestMetrics__shards), 2)
+
+        finish.set()
+        live.join()
+        self.assertEqual(metrics.get_route('/api/shop/v2/tasks/{task_id}').successes, 208)
+        self.assertEqual(len(metrics._RequestMetrics__shards), 1)
+
+        metrics.reset()
+        self.assertEqual(metrics.get_routes(), {})
+
+    def test_merge(self):
+        first, second = RequestMetrics(), RequestMetrics()
+        first(make_event('GET', '/api/shop/v2/orders', 0.1))
+        second(make_event('GET', '/api/shop/v2/orders', 0.3, 500, HTTPError()))
+        second(make_event('POST', '/api/shop/v2/orders', 0.2))
+
+        self.assertIs(first.merge(second), first)
+        orders = first.get_route('/api/shop/v2/orders', 'GET')
+        self.assertEqual((orders.successes, orders.errors, orders.histogram.count), (1, 1, 2))
+        self.assertEqual(first.get_route('/api/shop/v2/orders', 'POST').successes, 1)
+        self.assertEqual(second.get_route('/api/shop/v2/orders').histogram.count, 2)
+
+    def test_render(self):
+        metrics = RequestMetrics(quantiles=(0.5, 0.99))
+        metrics(make_event('POST', '/api/shop/v2/queues/{qid}/task', 0.25))
+        metrics(make_event('POST', '/api/shop/v2/queues/{qid}/task', 0.5, None,
+                           ConnectionError()))
+        metrics(make_event('GET', 'path "with" \\ quotes', 0.001))
+
+        labels = 'method="POST",route="/api/shop/v2/queues/{qid}/task"'
+        other = 'method="GET",route="path \\"with\\" \\\\ quotes"'
+        self.assertEqual(metrics.render(prefix='shop').splitlines(), [
+            '# HELP shop_requests_total Komtet Kassa API requests by response status.',
+            '# TYPE shop_requests_total counter',
+            'shop_requests_total{%s,status="200"} 1' % other,
+            'shop_requests_total{%s,status="200"} 1' % labels,
+            'shop_requests_total{%s,status="none"} 1' % labels,
+            '# HELP shop_request_errors_total Komtet Kassa API requests failed with an '
+            'exception.',
+            '# TYPE shop_request_errors_total counter',
+            'shop_request_errors_total{%s} 0' % other,
+            'shop_request_errors_total{%s} 1' % labels,
+            '# HELP shop_request_duration_seconds Komtet Kassa API request duration.',
+            '# TYPE shop_request_duration_seconds summary',
+            'shop_request_duration_seconds{%s,quantile="0.5"} 0.001' % other,
+            'shop_request_duration_seconds{%s,quantile="0.99"} 0.001' % other,
+            'shop_request_duration_seconds_sum{%s} 0.001' % other,
+            'shop_request_duration_seconds_count{%s} 1' % other,
+            'shop_request_duration_seconds{%s,quantile="0.5"} 0.251904' % labels,
+            'shop_request_duration_seconds{%s,quantile="0.99"} 0.503808' % labels,
+            'shop_request_duration_seconds_sum{%s} 0.75' % labels,
+            'shop_request_duration_seconds_count{%s} 2' % labels,
+        ])
+        self.assertEqual(RequestMetrics(quantiles=(0.5, 0.99)).merge(metrics).render('shop'),
+                         metrics.render('shop'))
+
+    def test_client_observer(self):
+        metrics = RequestMetrics()
+        client = Client('shop-id', 'secret-key').set_observer(metrics)
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.return_value = StatusResponseMock(200, {'id': 1})
+            client.get_task_info(1)
+            client.get_task_info(2)
+            session.get.return_value = StatusResponseMock(404)
+            with self.assertRaises(HTTPError):
+                client.get_task_info(3)
+
+        route = metrics.get_route('/api/shop/v2/tasks/{task_id}', 'GET')
+        self.assertEqual((route.successes, route.errors), (2, 1))
+        self.assertEqual(route.statuses, {200: 2, 404: 1})
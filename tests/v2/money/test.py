@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import copy
+import random
+from decimal import Decimal
+from unittest import TestCase
+
+from komtet_kassa_sdk.v2 import (Check, Intent, JSONSerializer, MeasureTypes, Money,
+                                 OrjsonSerializer, PaymentMethod, PaymentObject, Position, VatRate)
+from komtet_kassa_sdk.v2.client import json_encode
+from komtet_kassa_sdk.v2.lib.helpers import apply_discount, correction_positions, to_decimal
+from komtet_kassa_sdk.v2.serializers import orjson
+
+
+class TestMoney(TestCase):
+    def test_from_value(self):
+        self.assertEqual(Money.from_value(10).kopecks, 1000)
+        self.assertEqual(Money.from_value('10.5').kopecks, 1050)
+        self.assertEqual(Money.from_value(Decimal('-0.015')).kopecks, -2)
+        rnd = random.Random(1)
+        for _ in range(1000):
+            value = rnd.choice([Decimal(rnd.randint(-10 ** 6, 10 ** 6)) / 1000,
+                                rnd.randint(-10 ** 6, 10 ** 6) / 1000.0])
+            self.assertEqual(Money.from_value(value).to_decimal(), to_decimal(value))
+        money = Money(1)
+        self.assertIs(Money.from_value(money), money)
+        with self.assertRaises(TypeError):
+            Money(10.5)
+
+    def test_large_values(self):
+        # На Python 2 такие значения имеют тип long
+        self.assertEqual(Money(2 ** 70).kopecks, 2 ** 70)
+        self.assertEqual(Money.from_value(2 ** 70).kopecks, 2 ** 70 * 100)
+        self.assertEqual(Money.from_value(Decimal('1E+20')).kopecks, 10 ** 22)
+        self.assertEqual(Money.from_value(Decimal('123456789012345678.905')).kopecks,
+                         12345678901234567890)
+        self.assertEqual(Money(10 ** 20) * 2 ** 70, Money(10 ** 20 * 2 ** 70))
+        self.assertEqual(Money(2 ** 70), Decimal(2 ** 70) / 100)
+
+    def test_arithmetic(self):
+        self.assertEqual(Money(1050) + Money(1), Money(1051))
+        self.assertEqual(Money(1050) - Money(2000), Money(-950))
+        self.assertEqual(Money(1050) * 3, Money(3150))
+        self.assertEqual(3 * Money(1050), Money(3150))
+        self.assertEqual(Money(101) * Decimal('1.5'), Money(152))
+        self.assertEqual(Money(99) * Decimal('1.5'), Money(148))
+        self.assertEqual(sum([Money(1), Money(2)]), Money(3))
+        with self.assertRaises(TypeError):
+            Money(1) + 1
+        with self.assertRaises(TypeError):
+            Money(1) * Money(1)
+
+    def test_comparison(self):
+        self.assertEqual(Money(1050), Decimal('10.50'))
+        self.assertEqual(Money(1050), 10.5)
+        self.assertNotEqual(Money(1050), Money(1051))
+        self.assertLess(Money(1050), Money(1051))
+        self.assertGreater(Money(1050), 10)
+        self.assertEqual(hash(Money(1050)), hash(Decimal('10.5')))
+        self.assertFalse(Money(0))
+
+    def test_format(self):
+        self.assertEqual(str(Money(1050)), '10.50')
+        self.assertEqual(str(Money(-5)), '-0.05')
+        self.assertEqual(repr(Money(1050)), 'Money(1050)')
+        self.assertEqual(float(Money(1050)), 10.5)
+        self.assertEqual(Money(1050).to_decimal().as_tuple(), Decimal('10.50').as_tuple())
+
+
+class TestMoneyInCheck(TestCase):
+    def make_check(self, amount, total=None):
+        check = Check(oid=1, intent=Intent.SELL)
+        check.add_position(Position(name='Товар', price=amount, quantity=Decimal('1.5'),
+                                    total=total,
+                                    measure=MeasureTypes.KILOGRAMM, vat=VatRate.RATE_20,
+                                    payment_method=PaymentMethod.FULL_PAYMENT,
+                                    payment_object=PaymentObject.PRODUCT, excise=amount))
+        check.add_payment(check['positions'][0]['total'])
+        return check
+
+    def test_position_total(self):
+        check = self.make_check(Money(1010))
+        self.assertEqual(check['positions'][0]['total'], Money(1515))
+        self.assertIsInstance(check['positions'][0]['total'], Money)
+
+    def test_serialization(self):
+        with_money = self.make_check(Money(1010))
+        with_decimal = self.make_check(Decimal('10.10'), total=Decimal('15.15'))
+
+        serializers = [JSONSerializer(), JSONSerializer(exact_decimal=True)]
+        if orjson is not None:
+            serializers += [OrjsonSerializer(), OrjsonSerializer(exact_decimal=True)]
+        for serializer in serializers:
+            self.assertEqual(serializer.dumps(with_money), serializer.dumps(with_decimal))
+        self.assertIn(b'"price":10.10', JSONSerializer(exact_decimal=True).dumps(with_money))
+        self.assertEqual(json_encode(with_money), json_encode(with_decimal))
+
+    def test_apply_discount(self):
+        rnd = random.Random(2)
+        for _ in range(300):
+            totals = [rnd.randint(1, 10 ** 6) for _ in range(rnd.randint(1, 20))]
+            discount = rnd.randint(0, sum(totals))
+            with_money = [{'total': Money(total)} for total in totals]
+            with_decimal = [{'total': Money(total).to_decimal()} for total in totals]
+            apply_discount(Money(discount), with_money)
+            apply_discount(Money(discount).to_decimal(), with_decimal)
+            self.assertEqual([item['total'] for item in with_money],
+                             [item['total'] for item in with_decimal])
+            self.assertTrue(all(isinstance(item['total'], Money) for item in with_money))
+
+    def test_correction_positions(self):
+        rnd = random.Random(3)
+        for _ in range(300):
+            price = rnd.randint(1, 10 ** 5)
+            quantity = rnd.choice([rnd.randint(1, 5), Decimal(rnd.randint(1, 5000)) / 1000])
+            total = Money(price) * quantity + Money(rnd.choice([0, 0, 1, -1, 7]))
+            items = [{'price': Money(price), 'quantity': quantity, 'total': total}]
+            expected = correction_positions([{'price': Money(price).to_decimal(),
+                                              'quantity': quantity,
+                                              'total': total.to_decimal()}])
+            result = correction_positions(copy.deepcopy(items))
+            self.assertEqual(result, expected)
+            self.assertTrue(all(isinstance(item['total'], Money) for item in result))
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
+import json
 from decimal import Decimal
 from unittest import TestCase
 
-from komtet_kassa_sdk.v2 import (Agent, AgentType, Client, MarkTypes, Order, OrderInfo, OrderItem,
-                                 PaymentType, TaxSystem, VatRate)
+from komtet_kassa_sdk.v2 import (Agent, AgentType, Client, EmployeeInfo, MarkTypes, Order,
+                                 OrderInfo, OrderItem, PaymentType, Task, TaskInfo, TaxSystem,
+                                 VatRate)
 from komtet_kassa_sdk.v2.client import Response
 from mock import patch
 
@@ -420,8 +422,9 @@ class TestClientOrder(TestCase):
         self.response_mock = ResponseMock(**json)
 
     def test_create_order_success(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
-            requests.post.return_value = self.response_mock
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.post.return_value = self.response_mock
 
             order = Order(12, state='new', is_pay_to_courier=False, payment_type=PaymentType.CARD)
             order.set_company(payment_address='ул. Кижеватова д.7 кв.30', tax_system=0)
@@ -462,8 +465,9 @@ class TestClientOrder(TestCase):
             })
 
     def test_update_order_success(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
-            requests.put.return_value = self.response_mock
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.put.return_value = self.response_mock
 
             order = Order(external_id=12, state='new', is_pay_to_courier=False,
                           payment_type=PaymentType.CARD)
@@ -485,8 +489,9 @@ class TestClientOrder(TestCase):
             self.assertEqual(order_info.amount, 8000.0)
 
     def test_get_order_info_success(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
-            requests.get.return_value = self.response_mock
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.return_value = self.response_mock
             order_info = self.client.get_order_info(775)
             self.assertIsInstance(order_info, OrderInfo)
             self.assertEqual(order_info.id, 775)
@@ -518,8 +523,9 @@ class TestClientOrder(TestCase):
             })
 
     def test_create_order_with_callback_url_success(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
-            requests.post.return_value = self.response_mock
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.post.return_value = self.response_mock
 
             order = Order(12, state='new', is_pay_to_courier=False, payment_type=PaymentType.CARD)
             order.set_company(payment_address='ул. Кижеватова д.7 кв.30', tax_system=0)
@@ -562,8 +568,9 @@ class TestClientOrder(TestCase):
             })
 
     def test_set_payment_type_and_prepayment(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
-            requests.post.return_value = self.response_mock
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.post.return_value = self.response_mock
 
             order = Order(external_id=12, state='new', is_pay_to_courier=False,
                           payment_type=PaymentType.CASH, prepayment=200.0)
@@ -601,6 +608,31 @@ class TestResponse(TestCase):
             'error_description': None
         })
 
+    def test_from_dict(self):
+        data = {'id': 1, 'external_id': '2', 'state': 'new', 'print_queue_id': 3, 'extra': [1]}
+        task = Task.from_dict(data)
+        self.assertIs(task._asdict(), data)
+        self.assertIsInstance(task, TaskInfo)
+        self.assertEqual(task.id, 1)
+        self.assertEqual(task.print_queue_id, 3)
+        self.assertEqual(task.extra, [1])
+        self.assertIsNone(task.fiscal_data)
+        self.assertDictEqual(dict(task), data)
+        self.assertFalse(hasattr(task, '__dict__'))
+        with self.assertRaises(AttributeError):
+            task.unknown
+
+        data['state'] = 'done'
+        self.assertEqual(task.state, 'done')
+        self.assertEqual(repr(Task.from_dict({'id': 1})), 'Task(id=1)')
+
+    def test_typed_responses(self):
+        order = OrderInfo.from_dict({'id': 1, 'courier': {'id': 70, 'name': 'Пупкин'}})
+        self.assertEqual(order.courier['name'], 'Пупкин')
+        self.assertIsNone(order.is_paid)
+        employee = EmployeeInfo.from_dict({'id': 71, 'name': 'Пупкин', 'type': 'courier'})
+        self.assertEqual((employee.id, employee.name, employee.type), (71, 'Пупкин', 'courier'))
+
 
 class TestSetAgentInfoToOrder(TestCase):
 
@@ -686,3 +718,55 @@ class TestSetAgentInfoToOrder(TestCase):
 
         for key, value in order:
             self.assertEqual(expected[key], value)
+
+
+class TestCompactOrderItem(TestCase):
+    def test_key_order(self):
+        item = OrderItem(id=1, name='Пицца', price=500, quantity=2, type='product',
+                         product_id=15, vat=VatRate.RATE_20)
+        item.set_mark_code(type=MarkTypes.GS1M, code='1')
+        self.assertEqual(item.keys(), [
+            'name', 'measure', 'price', 'quantity', 'total', 'vat', 'id', 'type', 'product_id',
+            'is_need_nomenclature_code', 'mark_code'])
+        self.assertEqual(item['total'], 1000)
+
+    def test_add_item_without_copy(self):
+        order = Order(external_id=1)
+        item = OrderItem(name='Пицца', price=500)
+        order.add_item(item)
+        self.assertIs(order['items'][0], item)
+
+        # Перед изменением позиция заменяется копией, другие заказы с ней не изменяются
+        other = Order(external_id=2)
+        other.add_item(item)
+        order.apply_discount(100)
+        self.assertEqual(order['items'][0]['total'], Decimal('400'))
+        self.assertIs(other['items'][0], item)
+        self.assertEqual(item['total'], 500)
+
+    def test_apply_discount_to_repeated_item(self):
+        order = Order(external_id=1)
+        item = OrderItem(name='Пицца', price=Decimal('500'))
+        order.add_item(item)
+        order.add_item(item)
+        order.apply_discount(100)
+        self.assertEqual([value['total'] for value in order['items']],
+                         [Decimal('450'), Decimal('450')])
+        self.assertEqual(item['total'], Decimal('500'))
+
+    def test_explicit_none(self):
+        item = OrderItem(name='Пицца', price=500, product_id=15)
+        item['product_id'] = None
+        self.assertEqual(item['product_id'], None)
+        self.assertEqual(json.loads(json.dumps(dict(item)))['product_id'], None)
+        self.assertNotIn('product_id', OrderItem(name='Пицца', price=500))
+
+    def test_dict_contains_item_dicts(self):
+        order = Order(external_id=1)
+        item = OrderItem(id=1, name='Пицца', price=500, quantity=2, type='product')
+        order.add_item(item)
+        data = dict(order)
+        self.assertEqual([type(value) for value in data['items']], [dict])
+        self.assertEqual(json.loads(json.dumps(data))['items'],
+                         json.loads(json.dumps([dict(item)])))
+        self.assertIs(order._asdict()['items'][0], item)
@@ -1,11 +1,17 @@
 # -*- coding: utf-8 -*-
+import decimal
+import json
+import random
 from decimal import Decimal
 from unittest import TestCase
 
-from komtet_kassa_sdk.v2 import (Check, Client, Intent, MeasureTypes,
-                                 PaymentMethod, Position, PaymentObject, TaskInfo, VatRate)
-from komtet_kassa_sdk.v2.lib.helpers import correction_positions
+from komtet_kassa_sdk.v2 import (BulkResult, Check, Client, Intent, JSONSerializer, MeasureTypes,
+                                 Money, PaymentMethod, Position, PaymentObject, Task, TaskInfo,
+                                 VatRate)
+from komtet_kassa_sdk.v2 import check as check_module
+from komtet_kassa_sdk.v2.lib.helpers import correct_positions, correction_positions, to_decimal
 from mock import patch
+from requests.exceptions import HTTPError
 from ...helpers.mock import ResponseListMock
 
 
@@ -39,6 +45,35 @@ class TestVatRate(TestCase):
             VatRate.parse('unknown')
         self.assertEqual(ctx.exception.args, ('Unknown VAT rate: unknown',))
 
+    def test_parse_same_as_full_parse(self):
+        class Rate(str):
+            pass
+
+        values = [True, False, None, Decimal('20'), Decimal('20.0'), Decimal('0.2'), Rate('20'),
+                  -20, 20.5, 0.29, 1.2, 0.0, -0.0, '20.00', '0.200', '20.0%', ' 20', '', 'NO']
+        values.extend(random.Random(1).randint(0, 12500) / 100.0 for _ in range(500))
+        values.extend(check_module._VAT_RATES[str])
+        for value in values:
+            try:
+                expected = VatRate._parse(value)
+            except Exception as exc:
+                with self.assertRaises(type(exc)) as ctx:
+                    VatRate.parse(value)
+                self.assertEqual(ctx.exception.args, exc.args)
+            else:
+                self.assertEqual(VatRate.parse(value), expected)
+                self.assertEqual(type(VatRate.parse(value)), str)
+
+    def test_parse_cache_is_bounded(self):
+        limit = len(check_module._VAT_RATES[float]) + 1
+        with patch.dict(check_module._VAT_RATES[float]), \
+                patch.object(check_module, '_VAT_RATES_LIMIT', limit):
+            self.assertEqual(VatRate.parse(20.7), '20')
+            self.assertEqual(VatRate.parse(10.7), '10')
+            self.assertIn(20.7, check_module._VAT_RATES[float])
+            self.assertNotIn(10.7, check_module._VAT_RATES[float])
+        self.assertNotIn(20.7, check_module._VAT_RATES[float])
+
 
 class TestMultiTasks(TestCase):
     def setUp(self):
@@ -48,8 +83,9 @@ class TestMultiTasks(TestCase):
         })
 
     def test_create_multi_tasks_success(self):
-        with patch('komtet_kassa_sdk.v2.client.requests') as requests:
-            requests.post.return_value = self.response_mock
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.post.return_value = self.response_mock
             checks = []
             for i in range(5):
                 check = Check(oid=2043, intent=Intent.SELL)
@@ -90,6 +126,85 @@ class TestMultiTasks(TestCase):
                     self.assertEqual(value, getattr(check_info, key))
 
 
+class TestBulkTasks(TestCase):
+    def setUp(self):
+        self.client = Client('shop-id', 'secret-key')
+        self.checks = []
+        for oid in range(10):
+            check = Check(oid=str(oid), intent=Intent.SELL)
+            check.add_payment(100)
+            self.checks.append(check)
+
+    @staticmethod
+    def post(url, headers, data, timeout):
+        checks = json.loads(data)
+        if any(check['external_id'] == '5' for check in checks):
+            raise HTTPError('502 Bad Gateway')
+        return ResponseListMock({
+            str(idx): dict(id=int(check['external_id']), external_id=check['external_id'],
+                           print_queue_id=1, state='new')
+            for idx, check in enumerate(checks)
+        })
+
+    def test_create_tasks_bulk(self):
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.post.side_effect = self.post
+            result = self.client.create_tasks_bulk(self.checks, 1, chunk_size=3, max_workers=2)
+
+        self.assertIsInstance(result, BulkResult)
+        self.assertEqual(session.post.call_count, 4)
+        self.assertEqual(sorted(result, key=int), [str(oid) for oid in range(10)])
+        self.assertFalse(result.ok)
+        self.assertEqual(sorted(result.errors), ['3', '4', '5'])
+        for error in result.errors.values():
+            self.assertIsInstance(error, HTTPError)
+        self.assertEqual(len(result.tasks), 7)
+        for external_id, task in result.tasks.items():
+            self.assertIsInstance(task, Task)
+            self.assertEqual(task.external_id, external_id)
+
+    def test_create_tasks_bulk_missing_task(self):
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.post.return_value = ResponseListMock({
+                '0': dict(id=1, external_id='0', print_queue_id=1, state='new')
+            })
+            result = self.client.create_tasks_bulk(self.checks[:2], 1)
+
+        self.assertEqual(session.post.call_count, 1)
+        self.assertIsInstance(result['0'], Task)
+        self.assertIsInstance(result['1'], ValueError)
+
+    def test_create_tasks_bulk_unexpected_error(self):
+        class Serializer(JSONSerializer):
+            def dumps(self, obj):
+                if any(check['external_id'] == '5' for check in obj):
+                    raise TypeError('Object of type Position is not JSON serializable')
+                return super(Serializer, self).dumps(obj)
+
+        self.client.set_serializer(Serializer())
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            Session.return_value.post.side_effect = self.post
+            result = self.client.create_tasks_bulk(self.checks, 1, chunk_size=3)
+
+        self.assertEqual(sorted(result.errors), ['3', '4', '5'])
+        self.assertIsInstance(result['5'], TypeError)
+        self.assertEqual(sorted(result.tasks, key=int), ['0', '1', '2', '6', '7', '8', '9'])
+
+    def test_create_tasks_bulk_duplicates(self):
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            with self.assertRaises(ValueError) as ctx:
+                self.client.create_tasks_bulk(self.checks + self.checks[2:3], 1)
+            self.assertFalse(Session.return_value.post.called)
+        self.assertEqual(ctx.exception.args, ('Duplicate external_id 2',))
+
+    def test_create_tasks_bulk_empty(self):
+        self.assertEqual(self.client.create_tasks_bulk([], 1), {})
+        with self.assertRaises(ValueError):
+            self.client.create_tasks_bulk(self.checks, 1, chunk_size=0)
+
+
 class TestHelpers(TestCase):
     def test_correction_positions(self):
         '''
@@ -104,3 +219,147 @@ class TestHelpers(TestCase):
             {'price': Decimal('42.4'), 'quantity': 1, 'total': Decimal('42.40')},
             {'price': Decimal('10'), 'quantity': 1, 'total': Decimal('10')}
         ])
+
+
+def legacy_correction_positions(items):
+    # Прежняя реализация correction_positions - эталон для сравнения
+    new_items = []
+    for item in items:
+        quantity = decimal.Decimal(item['quantity'])
+        price = item['price']
+        total = item['total']
+
+        if isinstance(price, Money) or isinstance(total, Money):
+            price = Money.from_value(price)
+            total = Money.from_value(total)
+            has_extra_position = total.kopecks != price.kopecks * quantity and quantity > 1
+        else:
+            price = decimal.Decimal(price)
+            total = decimal.Decimal(total)
+            has_extra_position = (total != price * quantity) and quantity > 1
+        base_position_total = total
+
+        if has_extra_position:
+            quantity -= 1
+            if isinstance(price, Money):
+                base_position_total = price * quantity
+            else:
+                base_position_total = to_decimal(price * quantity)
+            price = total - base_position_total
+            extra_item = item.copy()
+            extra_item.update({'price': price, 'quantity': 1, 'total': price})
+            new_items.append(extra_item)
+
+        base_item = item.copy()
+        base_item.update({'quantity': quantity, 'total': base_position_total})
+        new_items.append(base_item)
+    return new_items
+
+
+def make_positions(seed, count=200):
+    rnd = random.Random(seed)
+    items = []
+    for idx in range(count):
+        kind = rnd.choice(['decimal', 'int', 'float', 'money'])
+        quantity = rnd.choice([1, 2, 5, Decimal('1.5'), 2.5, Decimal(rnd.randint(1, 5000)) / 1000])
+        kopecks = rnd.randint(1, 10 ** 6)
+        if kind == 'decimal':
+            price = Decimal(kopecks) / 100
+        elif kind == 'int':
+            price = kopecks // 100
+        elif kind == 'float':
+            price = kopecks / 100.0
+        else:
+            price = Money(kopecks)
+        try:
+            total = price * quantity
+        except TypeError:
+            total = price
+        if rnd.random() < 0.5:
+            total = to_decimal(total) + Decimal(rnd.choice(['0.01', '-0.01', '0.5']))
+            if kind == 'money':
+                total = Money.from_value(total)
+        if rnd.random() < 0.5:
+            item = {'name': 'Товар %s' % idx, 'price': price, 'quantity': quantity,
+                    'total': total}
+        else:
+            item = Position(name='Товар %s' % idx, price=price, quantity=quantity, total=total,
+                            measure=MeasureTypes.PIECE, payment_method=PaymentMethod.FULL_PAYMENT,
+                            payment_object=PaymentObject.PRODUCT, id=idx)
+        items.append(item)
+    # Одна и та же позиция может быть добавлена несколько раз
+    items.append(items[0])
+    return items
+
+
+def dump(items):
+    # Порядок ключей словаря на Python 2 зависит от истории его изменений
+    return [[(key, value, type(value))
+             for key, value in (sorted(item.items()) if isinstance(item, dict) else item.items())]
+            for item in items]
+
+
+class TestCorrectPositions(TestCase):
+    def test_same_as_legacy(self):
+        for seed in range(20):
+            items = make_positions(seed)
+            expected = dump(legacy_correction_positions(items))
+            before = dump(items)
+
+            self.assertEqual(dump(correction_positions(items)), expected)
+            self.assertEqual(dump(items), before)
+
+            correct_positions(items)
+            self.assertEqual(dump(items), expected)
+
+    def test_in_place(self):
+        items = [
+            {'price': Decimal('42.4'), 'quantity': 2, 'total': Decimal('84.5')},
+            {'price': Decimal('10'), 'quantity': 1, 'total': Decimal('10')},
+            {'price': 5, 'quantity': 3, 'total': 16},
+        ]
+        originals = list(items)
+        self.assertEqual(correct_positions(items), [0, 2])
+        self.assertEqual(len(items), 5)
+        self.assertIs(items[1], originals[0])
+        self.assertIs(items[2], originals[1])
+        self.assertIs(items[4], originals[2])
+        self.assertEqual(items[3], {'price': Decimal('6'), 'quantity': 1, 'total': Decimal('6')})
+        self.assertEqual(items[4],
+                         {'price': 5, 'quantity': Decimal('2'), 'total': Decimal('10.00')})
+
+    def make_position(self):
+        return Position(name='Товар', price=Decimal('42.4'), quantity=2,
+                        total=Decimal('84.5'), measure=MeasureTypes.PIECE,
+                        payment_method=PaymentMethod.FULL_PAYMENT,
+                        payment_object=PaymentObject.PRODUCT)
+
+    def test_check_apply_correction_positions(self):
+        check = Check(oid=1, intent=Intent.SELL)
+        check.add_position(self.make_position())
+        self.assertEqual(check.apply_correction_positions(), [0])
+        self.assertEqual([p['total'] for p in check['positions']],
+                         [Decimal('42.10'), Decimal('42.40')])
+
+        # Позиции, принадлежащие чеку, повторно корректируются на месте
+        positions = list(check['positions'])
+        self.assertEqual(check.apply_correction_positions(), [])
+        self.assertEqual(list(map(id, check['positions'])), list(map(id, positions)))
+
+    def test_check_apply_correction_positions_to_shared_position(self):
+        position = self.make_position()
+        first = Check(oid=1, intent=Intent.SELL)
+        second = Check(oid=2, intent=Intent.SELL)
+        first.add_position(position)
+        second.add_position(position)
+
+        self.assertEqual(first.apply_correction_positions(), [0])
+        self.assertEqual([p['total'] for p in first['positions']],
+                         [Decimal('42.10'), Decimal('42.40')])
+        self.assertEqual((position['quantity'], position['total']), (2, Decimal('84.5')))
+        self.assertIs(second['positions'][0], position)
+
+        self.assertEqual(second.apply_correction_positions(), [0])
+        self.assertEqual([p['total'] for p in second['positions']],
+                         [Decimal('42.10'), Decimal('42.40')])
+        self.assertEqual(position['total'], Decimal('84.5'))
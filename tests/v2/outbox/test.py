@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from decimal import Decimal
+from unittest import TestCase
+
+from komtet_kassa_sdk.v2 import Check, Client, Intent, Outbox, OutboxState, RetryPolicy, Task
+from mock import patch
+from requests.exceptions import ConnectionError, HTTPError
+
+from ..retry.test import StatusResponseMock
+
+
+class ClientMock(object):
+    def __init__(self):
+        self.calls = []
+        self.errors = []
+        self.rejected = set()
+        self.max_request_time = 30.0
+        self.on_call = None
+        self.lock = threading.Lock()
+
+    def get_max_request_time(self):
+        return self.max_request_time
+
+    def _handle_queue_id(self, qid):
+        if qid is None:
+            raise ValueError('Queue ID is not specified')
+        return qid
+
+    def create_tasks(self, checks, qid):
+        if self.on_call is not None:
+            self.on_call()
+        with self.lock:
+            self.calls.append((qid, [check['external_id'] for check in checks]))
+            if self.errors:
+                raise self.errors.pop(0)
+        for check in checks:
+            if check['external_id'] in self.rejected:
+                raise HTTPError('422 Client Error', response=StatusResponseMock(422))
+        return [Task(id='task-%s' % check['external_id'], external_id=check['external_id'],
+                     state='new') for check in checks]
+
+
+class TestOutbox(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'outbox.db')
+        self.client = ClientMock()
+        self.results = []
+        self.outbox = self.create_outbox()
+
+    def create_outbox(self, **kwargs):
+        kwargs.setdefault('initial_delay', 0)
+        outbox = Outbox(self.client, self.path,
+                        callback=lambda external_id, result: self.results.append(
+                            (external_id, result)), **kwargs)
+        self.addCleanup(outbox.close)
+        return outbox
+
+    def make_check(self, oid):
+        check = Check(oid=oid, intent=Intent.SELL)
+        check.add_payment(Decimal('10.10'))
+        return check
+
+    def test_put_and_flush(self):
+        self.assertTrue(self.outbox.put(self.make_check('1'), qid=5))
+        self.assertEqual(self.outbox.put_many([self.make_check(str(i)) for i in range(1, 4)],
+                                              qid=5), 2)
+        self.assertEqual(len(self.outbox), 3)
+
+        self.assertEqual(self.outbox.flush(), 3)
+        self.assertEqual(self.client.calls, [('5', ['1', '2', '3'])])
+        self.assertEqual(len(self.outbox), 0)
+        self.assertEqual(self.outbox.get_state('2'), {
+            'state': OutboxState.SENT, 'attempts': 1, 'task_id': 'task-2', 'error': None})
+        self.assertEqual([external_id for external_id, _ in self.results], ['1', '2', '3'])
+        self.assertIsNone(self.outbox.get_state('unknown'))
+
+        with self.assertRaises(ValueError):
+            self.outbox.put(self.make_check('4'))
+
+    def test_payload_is_exact(self):
+        self.outbox.put(self.make_check('1'), qid=5)
+        sent = []
+        self.client.create_tasks = lambda checks, qid: sent.extend(checks) or []
+        self.outbox.flush()
+        self.assertEqual(sent[0]['payments'], [{'sum': Decimal('10.10'), 'type': 'card'}])
+
+    def test_no_double_submission_after_restart(self):
+        self.outbox.put(self.make_check('1'), qid=5)
+        self.outbox.flush()
+        self.outbox.close()
+
+        outbox = self.create_outbox()
+        self.assertFalse(outbox.put(self.make_check('1'), qid=5))
+        self.assertEqual(outbox.flush(), 0)
+        self.assertEqual(len(self.client.calls), 1)
+
+    def test_pending_survive_restart(self):
+        self.outbox.put(self.make_check('1'), qid=5)
+        self.outbox.close()
+
+        outbox = self.create_outbox()
+        self.assertEqual(outbox.flush(), 1)
+
+    def test_retry_on_network_error(self):
+        self.client.errors = [ConnectionError('reset')]
+        self.outbox.put(self.make_check('1'), qid=5)
+        self.assertEqual(self.outbox.flush(), 0)
+        state = self.outbox.get_state('1')
+        self.assertEqual(state['state'], OutboxState.PENDING)
+        self.assertEqual(state['attempts'], 1)
+        self.assertIn('ConnectionError', state['error'])
+        self.assertEqual(self.results, [])
+
+        self.assertEqual(self.outbox.flush(), 1)
+        self.assertEqual(self.outbox.get_state('1')['state'], OutboxState.SENT)
+
+    def test_backoff(self):
+        outbox = self.create_outbox(initial_delay=60)
+        self.client.errors = [ConnectionError('reset')]
+        outbox.put(self.make_check('1'), qid=5)
+        outbox.flush()
+        self.assertEqual(outbox.flush(), 0)
+        self.assertEqual(len(self.client.calls), 1)
+
+    def test_rejected_check(self):
+        self.client.rejected = {'2'}
+        self.outbox.put_many([self.make_check(str(i)) for i in range(1, 4)], qid=5)
+        self.assertEqual(self.outbox.flush(), 2)
+        self.assertEqual(self.client.calls, [
+            ('5', ['1', '2', '3']), ('5', ['1']), ('5', ['2']), ('5', ['3'])])
+        self.assertEqual(self.outbox.get_stats(),
+                         {OutboxState.PENDING: 0, OutboxState.SENT: 2, OutboxState.FAILED: 1})
+        self.assertEqual(self.outbox.get_state('2')['state'], OutboxState.FAILED)
+        self.assertIsInstance(dict(self.results)['2'], HTTPError)
+
+        self.assertEqual(self.outbox.purge(), 2)
+        self.assertEqual(self.outbox.get_stats()[OutboxState.SENT], 0)
+
+    def test_batches_and_queues(self):
+        outbox = self.create_outbox(batch_size=2)
+        outbox.put_many([self.make_check(str(i)) for i in range(3)], qid=5)
+        outbox.put(self.make_check('other'), qid=6)
+        self.assertEqual(outbox.flush(), 4)
+        self.assertEqual(sorted(self.client.calls),
+                         [('5', ['0', '1']), ('5', ['2']), ('6', ['other'])])
+
+    def test_lease_timeout(self):
+        client = Client('shop-id', 'secret')
+        outbox = Outbox(client, self.path)
+        self.addCleanup(outbox.close)
+        self.assertEqual(client.get_max_request_time(), 35)
+
+        client.set_retry_policy(RetryPolicy(max_attempts=3, backoff_factor=1, max_backoff=2,
+                                            max_retry_after=10))
+        self.assertEqual(client.get_max_request_time(), 3 * 35 + 2 * 10)
+        with self.assertRaises(ValueError):
+            Outbox(client, self.path, lease_timeout=60)
+        outbox = Outbox(client, self.path, lease_timeout=130)
+        self.addCleanup(outbox.close)
+
+        client.set_timeout(read=None)
+        self.assertIsNone(client.get_max_request_time())
+        with self.assertRaises(ValueError):
+            Outbox(client, self.path)
+
+    def test_lease_is_renewed(self):
+        clock = [1000.0]
+        claimable = []
+
+        def on_call():
+            clock[0] += 30
+            connection = sqlite3.connect(self.path)
+            claimable.append(connection.execute(
+                'SELECT COUNT(*) FROM outbox WHERE state = ? AND next_attempt_at < ?',
+                (OutboxState.PENDING, clock[0])).fetchone()[0])
+            connection.close()
+
+        self.client.on_call = on_call
+        self.client.rejected = {'2'}
+        with patch('time.time', lambda: clock[0]):
+            outbox = self.create_outbox(lease_timeout=40)
+            outbox.put_many([self.make_check(str(i)) for i in range(1, 4)], qid=5)
+            self.assertEqual(outbox.flush(), 2)
+        self.assertEqual(len(self.client.calls), 4)
+        self.assertEqual(claimable, [0, 0, 0, 0])
+
+    def test_background_workers(self):
+        outbox = self.create_outbox(batch_size=10, flush_interval=0.01)
+        outbox.start(workers=2)
+        outbox.put_many([self.make_check(str(i)) for i in range(50)], qid=5)
+        for _ in range(500):
+            if not len(outbox):
+                break
+            threading.Event().wait(0.01)
+        outbox.stop()
+
+        sent = [external_id for _, ids in self.client.calls for external_id in ids]
+        self.assertEqual(sorted(sent), sorted(str(i) for i in range(50)))
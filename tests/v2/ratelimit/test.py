@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase, skipIf
+
+from komtet_kassa_sdk.v2 import Client, FileRateLimiter, RateLimiter, RetryPolicy
+from komtet_kassa_sdk.v2.ratelimit import fcntl
+from mock import Mock, patch
+from requests.exceptions import ConnectionError
+
+from ...helpers.mock import ResponseMock
+
+
+def acquire_many(path, rate, count):
+    limiter = FileRateLimiter(path, rate, burst=1)
+    for _ in range(count):
+        limiter.acquire()
+
+
+class ClockMock(object):
+    def __init__(self):
+        self.now = 1000.0
+        # Перевод системных часов
+        self.shift = 0
+
+    def time(self):
+        return self.now + self.shift
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class LimiterTestMixin(object):
+    def setUp(self):
+        self.clock = ClockMock()
+        for name in ('time', 'sleep'):
+            patcher = patch('komtet_kassa_sdk.v2.ratelimit.time.%s' % name,
+                            getattr(self.clock, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch('komtet_kassa_sdk.v2.ratelimit.monotonic', self.clock.monotonic)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_and_rate(self):
+        limiter = self.create_limiter(rate=10, burst=3)
+        for _ in range(3):
+            self.assertTrue(limiter.acquire())
+        self.assertEqual(self.clock.now, 1000.0)
+
+        for _ in range(5):
+            limiter.acquire()
+        self.assertAlmostEqual(self.clock.now, 1000.5)
+
+        self.clock.now += 100
+        for _ in range(3):
+            limiter.acquire()
+        self.assertAlmostEqual(self.clock.now, 1100.5)
+
+    def test_timeout(self):
+        limiter = self.create_limiter(rate=2, burst=1)
+        self.assertTrue(limiter.acquire(timeout=0))
+        self.assertFalse(limiter.acquire(timeout=0.1))
+        self.assertEqual(self.clock.now, 1000.0)
+        self.assertTrue(limiter.acquire(timeout=0.5))
+        self.assertAlmostEqual(self.clock.now, 1000.5)
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            self.create_limiter(rate=0)
+
+
+class TestRateLimiter(LimiterTestMixin, TestCase):
+    def create_limiter(self, **kwargs):
+        return RateLimiter(**kwargs)
+
+    def test_default_burst(self):
+        self.assertEqual(RateLimiter(5).burst, 5)
+        self.assertEqual(RateLimiter(0.5).burst, 1)
+
+    def test_wall_clock_change(self):
+        limiter = RateLimiter(rate=10, burst=2)
+        limiter.acquire(count=2)
+        self.clock.shift = -3600
+        self.assertTrue(limiter.acquire(timeout=0.1))
+        self.assertAlmostEqual(self.clock.now, 1000.1)
+
+        self.clock.shift = 3600
+        self.assertFalse(limiter.acquire(count=2, timeout=0))
+
+
+@skipIf(fcntl is None, 'fcntl is not available')
+class TestFileRateLimiter(LimiterTestMixin, TestCase):
+    def setUp(self):
+        super(TestFileRateLimiter, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'komtet.bucket')
+
+    def create_limiter(self, **kwargs):
+        limiter = FileRateLimiter(self.path, **kwargs)
+        self.addCleanup(limiter.close)
+        return limiter
+
+    def test_shared_state(self):
+        first = self.create_limiter(rate=10, burst=2)
+        second = self.create_limiter(rate=10, burst=2)
+        first.acquire()
+        second.acquire()
+        self.assertEqual(self.clock.now, 1000.0)
+        first.acquire()
+        second.acquire()
+        self.assertAlmostEqual(self.clock.now, 1000.2)
+
+
+@skipIf(fcntl is None, 'fcntl is not available')
+class TestFileRateLimiterProcesses(TestCase):
+    def test_processes(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'komtet.bucket')
+
+        started_at = time.time()
+        processes = [multiprocessing.Process(target=acquire_many, args=(path, 50, 10))
+                     for _ in range(2)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(10)
+            self.assertEqual(process.exitcode, 0)
+        # 20 запросов при 50 запросах в секунду и одном токене в запасе
+        self.assertGreaterEqual(time.time() - started_at, 19 / 50.0)
+
+
+class TestClientRateLimiter(TestCase):
+    def test_acquire_per_attempt(self):
+        limiter = Mock()
+        client = Client('shop-id', 'secret-key').set_rate_limiter(limiter)
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.return_value = ResponseMock(id=1, state='done')
+            session.delete.return_value = ResponseMock()
+            client.get_task_info(1)
+            client.delete_order(1)
+            self.assertEqual(limiter.acquire.call_count, 2)
+
+            client.set_retry_policy(RetryPolicy(max_attempts=2, jitter=False))
+            session.get.side_effect = [ConnectionError('reset'), ResponseMock(id=1, state='done')]
+            with patch('komtet_kassa_sdk.v2.retry.time.sleep'):
+                client.get_task_info(1)
+            self.assertEqual(limiter.acquire.call_count, 4)
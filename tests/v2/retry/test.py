@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from komtet_kassa_sdk.v2 import Check, Client, Employee, EmployeeType, Intent, RetryPolicy
+from mock import patch
+from requests.exceptions import ConnectionError, ConnectTimeout, HTTPError, ReadTimeout
+
+
+class StatusResponseMock(object):
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self.data = data or {}
+        self.headers = headers or {}
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError('%s Error' % self.status_code, response=self)
+
+    def json(self):
+        return self.data
+
+    def close(self):
+        self.closed = True
+
+
+class TestRetryPolicy(TestCase):
+    def setUp(self):
+        patcher = patch('komtet_kassa_sdk.v2.retry.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retry_on_status(self):
+        policy = RetryPolicy(max_attempts=3, backoff_factor=1, jitter=False)
+        responses = [StatusResponseMock(502), StatusResponseMock(503), StatusResponseMock(200)]
+        rep = policy.call(lambda: responses.pop(0))
+        self.assertEqual(rep.status_code, 200)
+        self.assertEqual([c[0][0] for c in self.sleep.call_args_list], [1, 2])
+        self.assertEqual(policy.metrics, {
+            'calls': 1,
+            'attempts': 3,
+            'retries': 2,
+            'exhausted': 0,
+            'attempts_per_call': {3: 1}
+        })
+
+    def test_exhausted(self):
+        policy = RetryPolicy(max_attempts=2, jitter=False)
+        rep = policy.call(lambda: StatusResponseMock(500))
+        self.assertEqual(rep.status_code, 500)
+        self.assertEqual(self.sleep.call_count, 1)
+        self.assertEqual(policy.metrics['exhausted'], 1)
+
+        def send():
+            raise ReadTimeout('timeout')
+
+        with self.assertRaises(ReadTimeout):
+            policy.call(send)
+        self.assertEqual(policy.metrics['calls'], 2)
+        self.assertEqual(policy.metrics['exhausted'], 2)
+        self.assertEqual(policy.metrics['attempts_per_call'], {2: 2})
+
+    def test_not_retryable_status(self):
+        policy = RetryPolicy()
+        rep = policy.call(lambda: StatusResponseMock(400))
+        self.assertEqual(rep.status_code, 400)
+        self.assertFalse(self.sleep.called)
+        self.assertEqual(policy.metrics['retries'], 0)
+
+    def test_backoff(self):
+        policy = RetryPolicy(backoff_factor=0.5, max_backoff=3, jitter=False)
+        self.assertEqual([policy.get_backoff(i) for i in range(1, 6)], [0.5, 1, 2, 3, 3])
+
+        policy = RetryPolicy(backoff_factor=0.5, max_backoff=3)
+        for i in range(1, 6):
+            self.assertTrue(0 <= policy.get_backoff(i) <= min(0.5 * 2 ** (i - 1), 3))
+
+    def test_retry_after(self):
+        policy = RetryPolicy(backoff_factor=0.1, jitter=False, max_retry_after=10)
+        responses = [
+            StatusResponseMock(429, headers={'Retry-After': '5'}),
+            StatusResponseMock(503, headers={'Retry-After': '120'}),
+            StatusResponseMock(200)
+        ]
+        first = responses[0]
+        policy.call(lambda: responses.pop(0))
+        self.assertEqual([c[0][0] for c in self.sleep.call_args_list], [5, 10])
+        self.assertTrue(first.closed)
+
+        rep = StatusResponseMock(503, headers={'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+        self.assertEqual(policy.get_retry_after(rep), 0)
+        rep = StatusResponseMock(503, headers={'Retry-After': 'soon'})
+        self.assertIsNone(policy.get_retry_after(rep))
+
+        policy = RetryPolicy(backoff_factor=0.1, jitter=False, respect_retry_after=False)
+        responses = [StatusResponseMock(429, headers={'Retry-After': '5'}), StatusResponseMock(200)]
+        self.sleep.reset_mock()
+        policy.call(lambda: responses.pop(0))
+        self.sleep.assert_called_once_with(0.1)
+
+    def test_non_idempotent(self):
+        policy = RetryPolicy(max_attempts=3, jitter=False)
+
+        rep = policy.call(lambda: StatusResponseMock(502), idempotent=False)
+        self.assertEqual(rep.status_code, 502)
+
+        errors = [ConnectionError('reset')]
+
+        def send():
+            raise errors.pop(0)
+
+        with self.assertRaises(ConnectionError):
+            policy.call(send, idempotent=False)
+
+        errors = [ConnectTimeout('connect timeout')]
+        responses = [StatusResponseMock(201)]
+
+        def send():
+            if errors:
+                raise errors.pop(0)
+            return responses.pop(0)
+
+        self.assertEqual(policy.call(send, idempotent=False).status_code, 201)
+        self.assertEqual(policy.metrics['attempts_per_call'], {1: 2, 2: 1})
+
+    def test_invalid_attempts(self):
+        with self.assertRaises(ValueError):
+            RetryPolicy(max_attempts=0)
+
+
+class TestClientRetry(TestCase):
+    def setUp(self):
+        patcher = patch('komtet_kassa_sdk.v2.retry.time.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.policy = RetryPolicy(max_attempts=3, jitter=False)
+        self.client = Client('shop-id', 'secret-key').set_retry_policy(self.policy)
+
+    def test_create_task_retry(self):
+        check = Check(oid=1, intent=Intent.SELL)
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.post.side_effect = [
+                ConnectionError('reset'),
+                StatusResponseMock(502),
+                StatusResponseMock(200, {'id': 5, 'external_id': 1, 'state': 'new'})
+            ]
+            task = self.client.create_task(check, 'queue-id')
+
+        self.assertEqual(task.id, 5)
+        self.assertEqual(session.post.call_count, 3)
+        first_call, last_call = session.post.call_args_list[0], session.post.call_args_list[2]
+        self.assertEqual(first_call, last_call)
+        self.assertEqual(self.policy.metrics['retries'], 2)
+
+    def test_get_task_info_exhausted(self):
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.return_value = StatusResponseMock(503)
+            with self.assertRaises(HTTPError):
+                self.client.get_task_info(5)
+
+        self.assertEqual(session.get.call_count, 3)
+        self.assertEqual(self.policy.metrics['exhausted'], 1)
+
+    def test_create_employee_not_retried(self):
+        employee = Employee(type=EmployeeType.COURIER, name='Name', login='login',
+                            password='password', pos_id='POS_KEY')
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.post.return_value = StatusResponseMock(502)
+            with self.assertRaises(HTTPError):
+                self.client.create_employee(employee)
+
+        self.assertEqual(session.post.call_count, 1)
+
+    def test_disabled(self):
+        self.client.set_retry_policy(None)
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.get.return_value = StatusResponseMock(503)
+            with self.assertRaises(HTTPError):
+                self.client.get_task_info(5)
+
+        self.assertEqual(session.get.call_count, 1)
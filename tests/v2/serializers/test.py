@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import json
+from collections import OrderedDict
+from decimal import Decimal
+from unittest import TestCase, skipIf
+
+from komtet_kassa_sdk.v2 import (Check, Client, Intent, JSONSerializer, OrjsonSerializer,
+                                 PaymentMethod, PaymentObject, Position, VatRate)
+from komtet_kassa_sdk.v2.serializers import get_default_serializer, orjson
+from mock import patch
+
+from ...helpers.mock import ResponseMock
+
+
+def make_check(positions=3):
+    check = Check('ext-1', Intent.SELL)
+    check.set_client(email='client@client.ru', name='Иванов Иван')
+    for idx in range(positions):
+        check.add_position(Position(name='Товар "%s"\n' % idx, price=Decimal('10.10'),
+                                    quantity=Decimal('1.5'), total=Decimal('15.15'),
+                                    measure=0, vat=VatRate.RATE_20,
+                                    payment_method=PaymentMethod.FULL_PAYMENT,
+                                    payment_object=PaymentObject.PRODUCT))
+    check.add_payment(Decimal('45.45'))
+    return dict(check)
+
+
+class TestJSONSerializer(TestCase):
+    def test_dumps(self):
+        data = make_check()
+        result = JSONSerializer().dumps(data)
+        self.assertIsInstance(result, bytes)
+        self.assertEqual(json.loads(result.decode('utf-8'))['payments'][0]['sum'], 45.45)
+        self.assertEqual(json.loads(result.decode('utf-8'))['client']['name'], u'Иванов Иван')
+        if str is not bytes:
+            # На Python 2 не-ASCII символы экранируются
+            self.assertIn('Иванов Иван'.encode('utf-8'), result)
+        self.assertNotIn(b', ', result)
+
+    def test_mixed_text_types(self):
+        data = {'name': 'Иванов Иван', u'email': u'Иванов@почта.рф', u'items': [u'Товар']}
+        for serializer in [JSONSerializer(), JSONSerializer(exact_decimal=True)]:
+            result = serializer.dumps(data)
+            self.assertEqual(json.loads(result.decode('utf-8')), {
+                u'name': u'Иванов Иван', u'email': u'Иванов@почта.рф', u'items': [u'Товар']})
+
+    def test_not_serializable(self):
+        with self.assertRaises(TypeError) as ctx:
+            JSONSerializer().dumps({'key': object()})
+        self.assertIn('is not JSON serializable', ctx.exception.args[0])
+
+
+@skipIf(orjson is None, 'orjson is not installed')
+class TestOrjsonSerializer(TestCase):
+    def test_default(self):
+        self.assertIsInstance(get_default_serializer(), OrjsonSerializer)
+
+    def test_identical_output(self):
+        stdlib, fast = JSONSerializer(), OrjsonSerializer()
+        for data in [
+            make_check(),
+            make_check(100),
+            {'sum': Decimal('0.00'), 'total': Decimal('-0.01'), 'price': Decimal('12345678.90')},
+            {'tiny': Decimal('0.00001'), 'huge': Decimal('1E+20'), 'sum': Decimal('1.10')},
+            {1: 'int key', 'big': 2 ** 70, 'list': [None, True, False, 'é ']},
+            {'floats': [0.0, 0.0001, 0.1, -12.5, 1e15, 1e16, 1.5e300]},
+        ]:
+            self.assertEqual(fast.dumps(data), stdlib.dumps(data))
+
+    def test_not_serializable(self):
+        with self.assertRaises(TypeError) as ctx:
+            OrjsonSerializer().dumps({'key': object()})
+        self.assertIn('is not JSON serializable', ctx.exception.args[0])
+
+
+class TestClientSerializer(TestCase):
+    def test_set_serializer(self):
+        class Serializer(object):
+            def dumps(self, obj):
+                return b'payload'
+
+        client = Client('shop-id', 'secret-key')
+        self.assertIs(client.set_serializer(Serializer()), client)
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.post.return_value = ResponseMock(id=1)
+            client.create_task({'key': 'value'}, 1)
+            self.assertEqual(session.post.call_args[1]['data'], b'payload')
+
+
+class TestExactDecimal(TestCase):
+    def serializers(self):
+        result = [JSONSerializer(exact_decimal=True)]
+        if orjson is not None:
+            result.append(OrjsonSerializer(exact_decimal=True))
+        return result
+
+    def test_exact_decimal(self):
+        data = OrderedDict([
+            ('price', Decimal('10.10')), ('quantity', Decimal('1.500')), ('total', Decimal('0.00')),
+            ('huge', Decimal('12345678901234567890.12')), ('exp', Decimal('1E+2')),
+            ('items', [Decimal('-0.01'), 1, 1.5, None, True, 'Товар "1"\n']), (2, 'int key'),
+            (2 ** 70, 2 ** 70),
+        ])
+        expected = ('{"price":10.10,"quantity":1.500,"total":0.00,'
+                    '"huge":12345678901234567890.12,"exp":1E+2,'
+                    '"items":[-0.01,1,1.5,null,true,%s],"2":"int key",'
+                    '"1180591620717411303424":1180591620717411303424}'
+                    # На Python 2 не-ASCII символы экранируются
+                    % json.dumps(u'Товар "1"\n', ensure_ascii=str is bytes))
+        for serializer in self.serializers():
+            result = serializer.dumps(data)
+            self.assertEqual(result.decode('utf-8'), expected)
+            self.assertEqual(json.loads(result.decode('utf-8'), parse_float=Decimal)['huge'],
+                             Decimal('12345678901234567890.12'))
+
+    def test_same_as_float_mode_without_decimals(self):
+        data = make_check(10)
+        data['positions'] = [dict(position, price=10.1, quantity=1.5, total=15.15)
+                             for position in data['positions']]
+        data['payments'] = [{'sum': 151.5, 'type': 'card'}]
+        expected = JSONSerializer().dumps(data)
+        for serializer in self.serializers():
+            self.assertEqual(serializer.dumps(data), expected)
+
+    def test_not_finite(self):
+        for serializer in self.serializers():
+            with self.assertRaises(ValueError):
+                serializer.dumps({'sum': Decimal('NaN')})
+            with self.assertRaises(TypeError):
+                serializer.dumps({'key': object()})
+
+    def test_client(self):
+        client = Client('shop-id', 'secret-key')
+        client.set_serializer(JSONSerializer(exact_decimal=True))
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.post.return_value = ResponseMock(id=1)
+            client.create_task({'sum': Decimal('10.10')}, 1)
+            self.assertEqual(session.post.call_args[1]['data'], b'{"sum":10.10}')
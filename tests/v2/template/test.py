@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from komtet_kassa_sdk.v2 import (Check, CheckTemplate, Client, CorrectionCheck, CorrectionType,
+                                 Intent, MeasureTypes, PaymentMethod, PaymentObject, PaymentType,
+                                 Position, TaxSystem, VatRate)
+from mock import patch
+
+from ...helpers.mock import ResponseMock
+
+
+def make_position(price, quantity=1):
+    return Position(name='Товар', price=price, quantity=quantity, measure=MeasureTypes.PIECE,
+                    payment_method=PaymentMethod.FULL_PAYMENT,
+                    payment_object=PaymentObject.PRODUCT, vat=VatRate.RATE_20)
+
+
+def make_check(oid, email, prices, payments):
+    check = Check(oid=oid, intent=Intent.SELL)
+    check.set_company(payment_address='shop.com', tax_system=TaxSystem.COMMON)
+    check.set_cashier(name='Кассир')
+    check.set_client(email=email)
+    for price in prices:
+        check.add_position(make_position(price))
+    for amount, method in payments:
+        check.add_payment(amount, method)
+    return check
+
+
+class TestCheckTemplate(TestCase):
+    def setUp(self):
+        self.prototype = make_check('proto', 'proto@shop.com', [100, 50],
+                                    [(100, PaymentType.CARD), (50, PaymentType.CASH)])
+        self.template = CheckTemplate(self.prototype)
+
+    def test_same_as_builder(self):
+        check = self.template.create('2', client={'email': 'client@client.ru'},
+                                     positions=[{'price': 200, 'total': 200}, None],
+                                     payments=[200, 50])
+        expected = make_check('2', 'client@client.ru', [200, 50],
+                              [(200, PaymentType.CARD), (50, PaymentType.CASH)])
+        self.assertEqual(dict(check), dict(expected))
+        self.assertEqual(check['external_id'], '2')
+
+    def test_defaults(self):
+        check = self.template.create('3')
+        expected = dict(self.prototype)
+        expected['external_id'] = '3'
+        self.assertEqual(dict(check), expected)
+
+    def test_replace_position(self):
+        check = self.template.create('4', positions=[make_position(10, 3), {}])
+        self.assertEqual(check['positions'][0], dict(make_position(10, 3)))
+        self.assertEqual(check['positions'][1]['price'], 50)
+
+    def test_checks_are_independent(self):
+        first = self.template.create('1', positions=[{'price': 1}, {}], payments=[1, 2])
+        second = self.template.create('2')
+        self.assertEqual(first['positions'][0]['price'], 1)
+        self.assertEqual(second['positions'][0]['price'], 100)
+        self.assertEqual(second['payments'][0]['sum'], 100)
+        self.assertEqual(first['external_id'], '1')
+
+    def test_prototype_is_frozen(self):
+        self.prototype.add_position(make_position(1))
+        self.prototype.set_client(phone='+79990000000')
+        check = self.template.create('5')
+        self.assertEqual(len(check['positions']), 2)
+        self.assertEqual(check['client'], {'email': 'proto@shop.com'})
+
+    def test_invalid_length(self):
+        with self.assertRaises(ValueError):
+            self.template.create('6', positions=[{}])
+        with self.assertRaises(ValueError):
+            self.template.create('6', payments=[1, 2, 3])
+
+    def test_correction_check(self):
+        prototype = CorrectionCheck(oid='1', intent=Intent.SELL_CORRECTION)
+        prototype.set_correction_info(CorrectionType.SELF, '01.01.2023', '1')
+        prototype.add_position(make_position(10))
+        prototype.add_payment(10)
+        check = CheckTemplate(prototype).create('7', payments=[20])
+        self.assertEqual(check['payments'], [{'sum': 20, 'type': PaymentType.CARD}])
+        self.assertEqual(check['correction_info'], prototype['correction_info'])
+
+    def test_create_task(self):
+        client = Client('shop-id', 'secret-key')
+        check = self.template.create('8')
+        with patch('komtet_kassa_sdk.v2.client.requests.Session') as Session:
+            session = Session.return_value
+            session.post.return_value = ResponseMock(id=1, external_id='8', state='new')
+            client.create_task(check, 'queue-id')
+            self.assertIn(b'"external_id":"8"', session.post.call_args[1]['data'])
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+from decimal import Decimal
+from unittest import TestCase
+
+from komtet_kassa_sdk.v2 import (Check, Client, Intent, MeasureTypes, PaymentMethod,
+                                 PaymentObject, Position, RequestEvent, TaskInfo, VatRate)
+from mock import patch
+from requests.exceptions import ConnectionError, HTTPError
+
+from ..retry.test import StatusResponseMock
+
+
+class TestRequestObserver(TestCase):
+    def setUp(self):
+        self.events = []
+        self.client = Client('shop-id', 'secret-key').set_observer(self.events.append)
+        patcher = patch('komtet_kassa_sdk.v2.client.requests.Session')
+        self.session = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def make_check(self):
+        check = Check(oid=1, intent=Intent.SELL)
+        check.add_position(Position(name='Товар', price=Decimal('10.00'), quantity=1,
+                                    measure=MeasureTypes.PIECE, vat=VatRate.RATE_20,
+                                    payment_method=PaymentMethod.FULL_PAYMENT,
+                                    payment_object=PaymentObject.PRODUCT))
+        return check
+
+    def test_event(self):
+        self.session.post.return_value = StatusResponseMock(200, {'id': 1, 'external_id': '1'})
+        task = self.client.create_task(self.make_check(), 3)
+        self.assertEqual(task.id, 1)
+
+        event, = self.events
+        self.assertIsInstance(event, RequestEvent)
+        self.assertEqual(event.method, 'POST')
+        self.assertEqual(event.route, '/api/shop/v2/queues/{qid}/task')
+        self.assertEqual(event.url, 'https://kassa.komtet.ru/api/shop/v2/queues/3/task')
+        self.assertEqual(event.payload_bytes, len(self.session.post.call_args[1]['data']))
+        self.assertEqual(event.status, 200)
+        self.assertIsNone(event.error)
+        self.assertEqual(sorted(event.phases), sorted(RequestEvent.PHASES))
+        for name in RequestEvent.PHASES:
+            self.assertGreaterEqual(getattr(event, name), 0)
+        self.assertGreater(event.encode, 0)
+        self.assertAlmostEqual(event.total, sum(event.phases.values()))
+
+    def test_same_request_as_without_observer(self):
+        self.session.post.return_value = StatusResponseMock(200, {'id': 1})
+        self.client.create_task(self.make_check(), 3)
+        observed = self.session.post.call_args
+
+        self.client.set_observer(None)
+        self.client.create_task(self.make_check(), 3)
+        self.assertEqual(self.session.post.call_args, observed)
+        self.assertEqual(len(self.events), 1)
+
+    def test_get_and_delete(self):
+        self.session.get.return_value = StatusResponseMock(200, {'id': 5, 'state': 'done'})
+        self.session.delete.return_value = StatusResponseMock(204)
+        self.assertIsInstance(self.client.get_task_info(5), TaskInfo)
+        self.assertTrue(self.client.delete_order(7))
+        self.assertEqual(self.session.get.call_args[1]['url'],
+                         'https://kassa.komtet.ru/api/shop/v2/tasks/5')
+        self.assertTrue(self.session.get.call_args[1]['allow_redirects'])
+
+        self.assertEqual([(event.method, event.route, event.status, event.payload_bytes)
+                          for event in self.events],
+                         [('GET', '/api/shop/v2/tasks/{task_id}', 200, 0),
+                          ('DELETE', '/api/shop/v2/orders/{oid}', 204, 0)])
+        self.assertEqual(self.events[0].encode, 0)
+
+    def test_http_error(self):
+        self.session.get.return_value = StatusResponseMock(500)
+        with self.assertRaises(HTTPError):
+            self.client.get_order_info(1)
+        event, = self.events
+        self.assertEqual(event.route, '/api/shop/v2/orders/{oid}')
+        self.assertEqual(event.status, 500)
+        self.assertIsInstance(event.error, HTTPError)
+
+    def test_connection_error(self):
+        self.session.get.side_effect = ConnectionError('refused')
+        with self.assertRaises(ConnectionError):
+            self.client.is_queue_active(1)
+        event, = self.events
+        self.assertIsNone(event.status)
+        self.assertIsInstance(event.error, ConnectionError)
+        self.assertGreater(event.send, 0)
+        self.assertEqual(event.parse, 0)
+
+    def test_observer_error_is_logged(self):
+        def observer(event):
+            raise RuntimeError('observer')
+
+        self.client.set_observer(observer)
+        self.session.get.return_value = StatusResponseMock(200, {'state': 'active'})
+        with patch('komtet_kassa_sdk.v2.client.logger') as logger:
+            self.assertTrue(self.client.is_queue_active(1))
+        logger.exception.assert_called_once_with('Request observer failed')
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from unittest import TestCase
+
+from komtet_kassa_sdk.v2 import TaskInfo, TaskTracker
+from mock import Mock
+from requests.exceptions import ConnectionError, HTTPError
+
+
+class ClientMock(object):
+    """Клиент, задачи которого завершаются после заданного количества проверок"""
+
+    def __init__(self, checks_to_complete):
+        self.checks_to_complete = checks_to_complete
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get_task_info(self, task_id):
+        with self.lock:
+            self.calls.append((task_id, time.time()))
+            count = sum(1 for called_id, _ in self.calls if called_id == task_id)
+        left = self.checks_to_complete[task_id]
+        if left == 'fail':
+            self.checks_to_complete[task_id] = 1
+            raise ConnectionError('connection reset')
+        if left == 'broken':
+            self.checks_to_complete[task_id] = 1
+            raise KeyError('state')
+        if isinstance(left, HTTPError):
+            raise left
+        state = 'done' if count >= left else 'processing'
+        return TaskInfo(id=task_id, state=state)
+
+
+class TestTaskTracker(TestCase):
+    def test_iter_completed(self):
+        client = ClientMock({1: 1, 2: 3, 3: 2})
+        tracker = TaskTracker(client, initial_delay=0.01, backoff=2, max_rate=None)
+        for task_id in (1, 2, 3):
+            tracker.track(task_id)
+        tracker.track(1)
+        self.assertEqual(len(tracker), 3)
+
+        completed = list(tracker.iter_completed(timeout=5))
+        self.assertEqual([info.id for info in completed], [1, 3, 2])
+        self.assertEqual(len(tracker), 0)
+        self.assertEqual(len(client.calls), 6)
+
+        times = [called_at for task_id, called_at in client.calls if task_id == 2]
+        self.assertGreaterEqual(times[1] - times[0], 0.02)
+        self.assertGreaterEqual(times[2] - times[1], 0.04)
+
+    def test_callbacks_and_errors(self):
+        client = ClientMock({1: 'fail', 2: 1})
+        default, specific = [], []
+        tracker = TaskTracker(client, initial_delay=0.01, max_rate=None,
+                              callback=default.append)
+        tracker.track(1).track(2, callback=specific.append)
+        tracker.run(timeout=5)
+        self.assertEqual([info.id for info in default], [1])
+        self.assertEqual([info.id for info in specific], [2])
+
+    def test_rate_limit(self):
+        client = ClientMock({task_id: 1 for task_id in range(5)})
+        tracker = TaskTracker(client, initial_delay=0, max_rate=50)
+        for task_id in range(5):
+            tracker.track(task_id)
+        tracker.run(timeout=5)
+        times = [called_at for _, called_at in client.calls]
+        self.assertGreaterEqual(times[-1] - times[0], 4 * 0.02 * 0.9)
+
+    def test_timeout(self):
+        client = ClientMock({1: 1000})
+        tracker = TaskTracker(client, initial_delay=0.01, max_rate=None)
+        tracker.track(1)
+        self.assertEqual(list(tracker.iter_completed(timeout=0.05)), [])
+        self.assertEqual(len(tracker), 1)
+
+    def test_background(self):
+        client = ClientMock({1: 2, 2: 1})
+        done = threading.Event()
+        completed = []
+
+        def callback(task_info):
+            completed.append(task_info.id)
+            if len(completed) == 2:
+                done.set()
+
+        tracker = TaskTracker(client, initial_delay=0.01, max_rate=None, callback=callback)
+        tracker.start()
+        try:
+            tracker.track(1)
+            tracker.track(2)
+            self.assertTrue(done.wait(5))
+        finally:
+            tracker.stop(timeout=5)
+        self.assertEqual(sorted(completed), [1, 2])
+
+    def test_permanent_error(self):
+        not_found = HTTPError('404 Client Error', response=Mock(status_code=404))
+        too_many = HTTPError('429 Client Error', response=Mock(status_code=429))
+        client = ClientMock({1: not_found, 2: 1, 3: not_found})
+        errors, default_errors = [], []
+        tracker = TaskTracker(client, initial_delay=0.01, max_rate=None,
+                              error_callback=lambda *args: default_errors.append(args))
+        tracker.track(1, error_callback=lambda *args: errors.append(args)).track(2).track(3)
+        completed = list(tracker.iter_completed(timeout=5))
+        self.assertEqual([info.id for info in completed], [2])
+        self.assertEqual(errors, [(1, not_found)])
+        self.assertEqual(default_errors, [(3, not_found)])
+        self.assertEqual(len(tracker), 0)
+        self.assertEqual(len(client.calls), 3)
+
+        # 429 - временная ошибка, задача проверяется повторно
+        client = ClientMock({1: too_many})
+        tracker = TaskTracker(client, initial_delay=0.01, max_rate=None)
+        tracker.track(1)
+        self.assertEqual(list(tracker.iter_completed(timeout=0.1)), [])
+        self.assertGreater(len(client.calls), 1)
+        self.assertEqual(len(tracker), 1)
+
+    def test_unexpected_error(self):
+        client = ClientMock({1: 'broken'})
+        tracker = TaskTracker(client, initial_delay=0.01, max_rate=None)
+        tracker.track(1)
+        with self.assertRaises(KeyError):
+            list(tracker.iter_completed(timeout=5))
+
+        # Задача осталась в очереди и проверяется повторно
+        self.assertEqual(len(tracker), 1)
+        self.assertEqual([info.id for info in tracker.iter_completed(timeout=5)], [1])
+        self.assertEqual(len(tracker), 0)
+
+    def test_background_errors(self):
+        client = ClientMock({1: 'broken', 2: 1})
+        done = threading.Event()
+        completed = []
+
+        def callback(task_info):
+            completed.append(task_info.id)
+            if len(completed) == 2:
+                done.set()
+            raise RuntimeError('callback failed')
+
+        tracker = TaskTracker(client, initial_delay=0.01, max_rate=None, callback=callback)
+        tracker.start()
+        try:
+            tracker.track(1)
+            tracker.track(2)
+            self.assertTrue(done.wait(5))
+        finally:
+            tracker.stop(timeout=5)
+        self.assertEqual(sorted(completed), [1, 2])
+        self.assertEqual(len(tracker), 0)